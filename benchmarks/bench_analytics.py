@@ -0,0 +1,90 @@
+"""Finance analytics on the pandas and Arrow engines at growing ledger sizes.
+
+For each --rows size, fills a fresh database with one user's ledger and times:
+
+- rows: the old load, get_finance_since() row tuples into a DataFrame
+- load: get_finance_columns() into each engine's table (FinanceFrame.refresh)
+- aggregate: totals, expenses by category, invested per day and the monthly
+  flows, as the finance page reads them
+
+Run from the repository root:
+
+    python -m benchmarks.bench_analytics --rows 10000,1000000,10000000
+"""
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from modules import analytics
+from modules import database as db
+from modules import finance_cache
+
+USER = "default"
+CATEGORIES = ["Income: Dad", "Income: Other", "Expense: Food", "Expense: Travel", "Expense: Other",
+              "Invest: Nifty 50", "Invest: Gold"]
+CHUNK = 100_000
+
+
+def build(path: Path, rows: int) -> None:
+    db.configure(path)
+    db.init_db()
+    rng = random.Random(11)
+    today = db.today_day()
+    conn = db.get_conn()
+    # Seed rows are history, not changes to sync; keep them out of the change log
+    conn.execute("INSERT INTO sync_state (key, value) VALUES ('suspended', '1')")
+    for start in range(0, rows, CHUNK):
+        conn.executemany(
+            "INSERT INTO finance (user_id, day, category, amount, note) VALUES (?, ?, ?, ?, '')",
+            ((USER, today - (rows - i) * 3650 // rows, rng.choice(CATEGORIES), round(rng.uniform(10, 2000), 2))
+             for i in range(start, min(start + CHUNK, rows))),
+        )
+    conn.execute("DELETE FROM sync_state WHERE key='suspended'")
+    conn.commit()
+    conn.close()
+
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return 1000 * (time.perf_counter() - t0)
+
+
+def aggregate(frame: finance_cache.FinanceFrame) -> None:
+    frame.totals
+    frame.expenses_by_category
+    frame.invested_cumulative
+    frame.monthly
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", default="10000,1000000,10000000", help="comma-separated ledger sizes")
+    parser.add_argument("--skip-rows", action="store_true", help="skip the row-tuple baseline")
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    for rows in (int(n) for n in args.rows.split(",")):
+        t0 = time.perf_counter()
+        build(tmp / f"ledger_{rows}.db", rows)
+        print(f"{rows:,} rows (built in {time.perf_counter() - t0:.1f} s)")
+        if not args.skip_rows:
+            columns = ("id", "day", "category", "amount")
+            load = timed(lambda: pd.DataFrame.from_records(db.get_finance_since(0, columns=columns, user_id=USER),
+                                                           columns=columns))
+            print(f"  {'rows':<7} load {load:9.1f} ms")
+        for engine in analytics.ENGINES:
+            frame = finance_cache.FinanceFrame(USER, engine)
+            load = timed(frame.refresh)
+            agg = timed(lambda: aggregate(frame))
+            print(f"  {engine:<7} load {load:9.1f} ms   aggregate {agg:9.1f} ms   "
+                  f"total {frame.totals['Invest']:,.0f} invested")
+        (tmp / f"ledger_{rows}.db").unlink()
+
+
+if __name__ == "__main__":
+    main()
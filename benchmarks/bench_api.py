@@ -0,0 +1,141 @@
+"""Requests per second and latency of the JSON API against a Streamlit rerun.
+
+Starts the API in a child process on a temporary database and drives it with
+--concurrency keep-alive connections issuing a mix of habit toggles, task
+toggles and reads. Then times the Streamlit path for the same tap: a habit
+checkbox change on the health page, run through AppTest.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_api --requests 20000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from modules import api
+from modules import database as db
+
+HABITS = ["Peanut Butter", "Venusia Max", "Bisleri Rinse", "Night Cream", "Workout"]
+USERS = 50
+# Every request authenticates as its user
+TOKENS = {f"token{u}": f"user{u}" for u in range(USERS)}
+
+
+def run_server(db_path: Path, port: int) -> None:
+    db.configure(db_path)
+    api.API_TOKENS = TOKENS
+    asyncio.run(api.serve("127.0.0.1", port))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def request_bytes(i: int) -> bytes:
+    auth = f"Authorization: Bearer token{i % USERS}"
+    kind = i % 3
+    if kind == 0:
+        body = json.dumps({"habit": HABITS[i % len(HABITS)], "status": i % 2}).encode()
+        head = f"POST /habits/status HTTP/1.1\r\n{auth}\r\nContent-Length: {len(body)}\r\n\r\n"
+        return head.encode() + body
+    if kind == 1:
+        body = json.dumps({"task_name": "Maths: Jacobians", "category": "Academics", "status": i % 2}).encode()
+        head = f"POST /tasks/status HTTP/1.1\r\n{auth}\r\nContent-Length: {len(body)}\r\n\r\n"
+        return head.encode() + body
+    return f"GET /habits HTTP/1.1\r\n{auth}\r\n\r\n".encode()
+
+
+async def client(port: int, ids: range, timings: list) -> None:
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    for i in ids:
+        t0 = time.perf_counter()
+        writer.write(request_bytes(i))
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        await reader.readexactly(length)
+        timings.append(1000 * (time.perf_counter() - t0))
+    writer.close()
+
+
+async def drive(port: int, requests: int, concurrency: int) -> list:
+    timings: list = []
+    per = requests // concurrency
+    await asyncio.gather(*(client(port, range(c * per, (c + 1) * per), timings) for c in range(concurrency)))
+    return timings
+
+
+def report(label: str, timings: list, elapsed: float) -> None:
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<22} {len(timings) / elapsed:9.0f} req/s   p50 {statistics.median(timings):7.2f} ms   p99 {p99:7.2f} ms")
+
+
+def streamlit_taps(samples: int) -> list:
+    from streamlit.testing.v1 import AppTest
+
+    root = Path(__file__).resolve().parent.parent
+    at = AppTest.from_file(str(root / "main.py"), default_timeout=60)
+    at.run()
+    radio = at.sidebar.radio[0]
+    radio.set_value([o for o in radio.options if "Health" in o][0]).run()
+    timings = []
+    for i in range(samples):
+        box = at.checkbox[i % len(HABITS)]
+        t0 = time.perf_counter()
+        (box.uncheck() if box.value else box.check()).run()
+        timings.append(1000 * (time.perf_counter() - t0))
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--streamlit-samples", type=int, default=50)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "bench_api.db")
+    db.init_db()
+    today = db.today_day()
+    for u in range(USERS):
+        db.upsert_task(today, "Maths: Jacobians", "Academics", user_id=f"user{u}")
+
+    port = free_port()
+    server = multiprocessing.Process(target=run_server, args=(db.DB_PATH, port), daemon=True)
+    server.start()
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.05)
+
+    try:
+        t0 = time.perf_counter()
+        timings = asyncio.run(drive(port, args.requests, args.concurrency))
+        report("JSON API", timings, time.perf_counter() - t0)
+    finally:
+        server.terminate()
+
+    t0 = time.perf_counter()
+    timings = streamlit_taps(args.streamlit_samples)
+    report("Streamlit tap (serial)", timings, time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    main()
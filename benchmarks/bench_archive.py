@@ -0,0 +1,60 @@
+"""Hot database size and page latency before and after yearly archival.
+
+Seeds --users users with --years of history ending today, times the queries
+behind one page load, archives every closed year, runs maintenance and times
+the same queries again.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_archive --users 300 --years 4
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from benchmarks.bench_tenancy import page_load, seed_users
+from modules import archive
+from modules import database as db
+
+
+def measure(label: str, users: int, today: int, samples: int) -> None:
+    timings = []
+    for _ in range(samples):
+        user_id = f"user{random.randrange(users)}"
+        t0 = time.perf_counter()
+        page_load(user_id, today)
+        timings.append(1000 * (time.perf_counter() - t0))
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    size = db.DB_PATH.stat().st_size
+    print(f"{label:<16} hot db {size / 1e6:8.1f} MB   p50 {statistics.median(timings):6.2f} ms   p99 {p99:6.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--years", type=int, default=4)
+    parser.add_argument("--samples", type=int, default=300)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "bench_archive.db")
+    db.init_db()
+    today = db.today_day()
+    first = db.to_day(date(date.today().year - args.years + 1, 1, 1))
+    for start in range(0, args.users, 50):
+        seed_users(start, min(start + 50, args.users), today - first + 1, today)
+
+    measure("before archival", args.users, today, args.samples)
+    t0 = time.perf_counter()
+    moved = archive.archive_closed_years()
+    archive.run_maintenance()
+    print(f"archived {len(moved)} years in {time.perf_counter() - t0:.1f} s")
+    measure("after archival", args.users, today, args.samples)
+
+
+if __name__ == "__main__":
+    main()
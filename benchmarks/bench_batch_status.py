@@ -0,0 +1,54 @@
+"""Cost of a week of habit review: one set_habit_status per toggle versus one set_habit_statuses batch.
+
+Seeds --days of history for 5 habits, then flips --toggles (day, habit)
+statuses within the last week both ways and reports time and commits
+(each commit is a transaction and, in the app, a rerun).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_batch_status --toggles 35
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from modules import database as db
+
+HABITS = ["Peanut Butter", "Venusia Max", "Bisleri Rinse", "Night Cream", "Workout"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--toggles", type=int, default=35)
+    parser.add_argument("--samples", type=int, default=10)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "batch.db")
+    db.init_db()
+    today = db.today_day()
+    rng = random.Random(5)
+    db.set_habit_statuses([(day, h, rng.random() < 0.7) for day in range(today - args.days + 1, today + 1)
+                           for h in HABITS])
+    week = [(day, h) for day in range(today - 6, today + 1) for h in HABITS]
+
+    serial, batch = [], []
+    for n in range(args.samples):
+        toggles = [(day, h, (n + i) % 2 == 0) for i, (day, h) in enumerate(rng.sample(week, min(args.toggles, len(week))))]
+        t0 = time.perf_counter()
+        for day, h, status in toggles:
+            db.set_habit_status(day, h, status)
+        serial.append(1000 * (time.perf_counter() - t0))
+        toggles = [(day, h, not status) for day, h, status in toggles]
+        t0 = time.perf_counter()
+        db.set_habit_statuses(toggles)
+        batch.append(1000 * (time.perf_counter() - t0))
+    print(f"{args.toggles} toggles one at a time: {statistics.median(serial):7.2f} ms, {args.toggles} commits")
+    print(f"{args.toggles} toggles as one batch:  {statistics.median(batch):7.2f} ms, 1 commit")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Page read latency with the reads run one after another versus db.fetch_many().
+
+Seeds --users users with --days of history and times the independent reads
+behind the timer, health and finance pages both ways for random users. Caches
+are bypassed (a fresh calendar and ledger frame per sample) so every read
+reaches SQLite.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_fetch_many --users 200 --days 730
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from functools import partial
+from pathlib import Path
+
+from benchmarks.bench_tenancy import HABITS, seed_users
+from modules import database as db
+from modules import finance_cache, habit_calendar
+
+
+def page_reads(page: str, user_id: str, today: int) -> dict:
+    if page == "timer":
+        return {
+            "stats": partial(db.get_timer_stats, today, user_id=user_id),
+            "streak": partial(db.get_focus_streak, user_id=user_id),
+            "sessions": partial(db.get_timer_sessions, today, user_id=user_id),
+            "active": partial(db.get_active_session, user_id=user_id),
+        }
+    if page == "health":
+        return {
+            "today": partial(db.get_habits, today, columns=("habit", "status"), user_id=user_id),
+            "calendar": partial(habit_calendar.HabitCalendar.load, user_id, HABITS),
+        }
+    return {
+        "ledger": finance_cache.FinanceFrame(user_id).refresh,
+        "recent": partial(db.get_recent_finance, limit=5, user_id=user_id),
+    }
+
+
+def measure(page: str, users: int, today: int, samples: int) -> None:
+    results = {}
+    for mode in ("sequential", "fetch_many"):
+        timings = []
+        for _ in range(samples):
+            calls = page_reads(page, f"user{random.randrange(users)}", today)
+            t0 = time.perf_counter()
+            if mode == "sequential":
+                {name: fn() for name, fn in calls.items()}
+            else:
+                db.fetch_many(calls)
+            timings.append(1000 * (time.perf_counter() - t0))
+        timings.sort()
+        results[mode] = (statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.99))])
+    (seq50, seq99), (par50, par99) = results["sequential"], results["fetch_many"]
+    print(f"{page:<8} sequential p50 {seq50:7.2f} ms p99 {seq99:7.2f} ms   fetch_many p50 {par50:7.2f} ms p99 {par99:7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--samples", type=int, default=100)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "bench_fetch_many.db")
+    db.init_db()
+    today = db.today_day()
+    for start in range(0, args.users, 50):
+        seed_users(start, min(start + 50, args.users), args.days, today)
+
+    for page in ("timer", "health", "finance"):
+        measure(page, args.users, today, args.samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Habit calendar load and heatmap render time over several years of history.
+
+Seeds --years of daily rows for --habits habits, then times the one-query
+calendar load and the vectorized streaks, weekly rates, rolling average and
+heatmap images for every habit over the full range.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_heatmap --years 5 --habits 5
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from modules import database as db
+from modules import habit_calendar
+
+
+def seed(habits: list, years: int) -> None:
+    today = db.today_day()
+    first = db.to_day(date(date.today().year - years + 1, 1, 1))
+    conn = db.get_conn()
+    conn.executemany(
+        "INSERT INTO habits (user_id, day, habit, status) VALUES (?, ?, ?, ?)",
+        ((db.DEFAULT_USER, day, h, int(random.random() < 0.75)) for day in range(first, today + 1) for h in habits),
+    )
+    conn.commit()
+    conn.close()
+
+
+def render_all(calendar: habit_calendar.HabitCalendar, years: int) -> None:
+    calendar.current_streaks()
+    calendar.longest_streaks()
+    calendar.weekly_rates()
+    calendar.rolling_average(30)
+    for habit in calendar.habits:
+        calendar.heatmap(habit, years=years)
+
+
+def report(label: str, timings: list) -> None:
+    timings.sort()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{label:<22} p50 {statistics.median(timings):7.2f} ms   p99 {p99:7.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--habits", type=int, default=5)
+    parser.add_argument("--samples", type=int, default=100)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "bench_heatmap.db")
+    db.init_db()
+    habits = [f"Habit {i}" for i in range(args.habits)]
+    seed(habits, args.years)
+
+    loads, renders, toggles = [], [], []
+    for _ in range(args.samples):
+        t0 = time.perf_counter()
+        calendar = habit_calendar.HabitCalendar.load(db.DEFAULT_USER, habits, years=args.years)
+        loads.append(1000 * (time.perf_counter() - t0))
+        t0 = time.perf_counter()
+        render_all(calendar, args.years)
+        renders.append(1000 * (time.perf_counter() - t0))
+        t0 = time.perf_counter()
+        calendar.set(random.choice(habits), db.today_day() - random.randrange(365), True)
+        toggles.append(1000 * (time.perf_counter() - t0))
+
+    print(f"{args.habits} habits x {calendar.done.shape[1]} days ({calendar.done.nbytes / 1024:.1f} KiB)")
+    report("load (one query)", loads)
+    report("stats + heatmaps", renders)
+    report("incremental toggle", toggles)
+
+
+if __name__ == "__main__":
+    main()
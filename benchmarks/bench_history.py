@@ -0,0 +1,106 @@
+"""Event log costs: replaying a year of status events, and the extra bytes each write commits.
+
+Replay: fills a fresh database with --days of one user's habit and task
+changes through set_habit_statuses / set_task_statuses (one grid save per
+day, some cells toggled back later), then times history.state() replaying the
+whole log from an empty start, and again from a snapshot plus a tail of
+--tail events.
+
+Write amplification: toggles --toggles statuses one at a time with the event
+log off and on (database.EVENT_LOG) and reports the bytes each commit appends
+to the WAL, against the direct UPDATE that was the whole write before.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_history --days 365 --toggles 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from modules import database as db
+from modules import history
+
+HABITS = ["Peanut Butter", "Venusia Max", "Bisleri Rinse", "Night Cream", "Workout"]
+TASKS = [f"Task {i}" for i in range(8)]
+
+
+def fill(days: int, rng: random.Random) -> int:
+    today = db.today_day()
+    for day in range(today - days + 1, today + 1):
+        db.set_habit_statuses([(day, h, rng.random() < 0.7) for h in HABITS])
+        db.set_task_statuses([(day, t, "Academics", rng.random() < 0.6) for t in TASKS])
+        if day > today - days + 7:
+            # Corrections a few days later, as accidental taps get fixed
+            back = day - rng.randrange(1, 7)
+            db.set_habit_status(back, rng.choice(HABITS), rng.random() < 0.5)
+    conn = db.get_conn()
+    count = conn.execute("SELECT COUNT(*) FROM status_events").fetchone()[0]
+    conn.close()
+    return count
+
+
+def timed(fn, samples: int = 20) -> float:
+    timings = []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(1000 * (time.perf_counter() - t0))
+    return statistics.median(timings)
+
+
+def wal_bytes_per_toggle(toggles: int, event_log: bool, rng: random.Random) -> float:
+    path = Path(tempfile.mkdtemp()) / "amp.db"
+    db.configure(path, {"journal_mode": "WAL", "wal_autocheckpoint": "0"})
+    db.EVENT_LOG = event_log
+    db.init_db()
+    today = db.today_day()
+    # Warm up so both runs start from rows and pages that already exist
+    for h in HABITS:
+        db.set_habit_status(today, h, True)
+    # Held open so the WAL is not checkpointed away when each write's connection closes
+    keeper = db.get_conn()
+    wal = Path(f"{path}-wal")
+    before = os.path.getsize(wal)
+    for _ in range(toggles):
+        db.set_habit_status(today - rng.randrange(30), rng.choice(HABITS), rng.random() < 0.5)
+    written = os.path.getsize(wal) - before
+    keeper.close()
+    return written / toggles
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--tail", type=int, default=200)
+    parser.add_argument("--toggles", type=int, default=2000)
+    args = parser.parse_args()
+    rng = random.Random(3)
+
+    db.configure(Path(tempfile.mkdtemp()) / "history.db")
+    db.init_db()
+    events = fill(args.days, rng)
+    head = db.get_status_events(after=0)[-1].seq
+    full = timed(lambda: history.state(upto=head))
+    print(f"replay {events:,} events ({args.days} days) from empty:  {full:7.2f} ms")
+    snapshot_seq = history.snapshot()
+    conn = db.get_conn()
+    size = conn.execute("SELECT length(state) FROM status_snapshots WHERE seq=?", (snapshot_seq,)).fetchone()[0]
+    conn.close()
+    for _ in range(args.tail):
+        db.set_habit_status(db.today_day() - rng.randrange(args.days), rng.choice(HABITS), rng.random() < 0.5)
+    tail = timed(lambda: history.state(upto=head + 10 ** 9))
+    print(f"replay from a snapshot ({size:,} bytes) + {args.tail} events:  {tail:7.2f} ms")
+
+    direct = wal_bytes_per_toggle(args.toggles, False, rng)
+    logged = wal_bytes_per_toggle(args.toggles, True, rng)
+    print(f"WAL bytes per toggle: {direct:,.0f} direct, {logged:,.0f} with the event log "
+          f"({logged / direct:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
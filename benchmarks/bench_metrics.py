@@ -0,0 +1,141 @@
+"""Cost of the metrics instrumentation (modules/metrics.py) against the reruns it measures.
+
+Seeds --users users with --days of history, then for each page of main.py
+reruns it --reruns times through Streamlit's AppTest as user0 and counts, from
+the metrics themselves, the statements, commits and connections a rerun makes.
+Separately it times what each of those costs the instrumentation:
+
+- a statement: the timing and observation _MeteredConnection adds around it
+  (a primary-key SELECT on a plain and a metered connection is printed too)
+- a connection opened: one counter increment
+- a rerun: one histogram observation (metrics.Timed in main.py)
+
+and reports the estimated overhead per rerun as a share of the rerun's median
+time, which should stay under 1%. The same reruns with metrics.ENABLED off and
+on, interleaved, are printed too; that difference is within the noise of a rerun.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_metrics --reruns 30
+"""
+import argparse
+import sqlite3
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_tenancy import seed_users
+from modules import database as db
+from modules import metrics
+
+ROOT = Path(__file__).resolve().parent.parent
+VIEWS = ("Today", "Academics", "Finance", "Health", "Timer", "Search")
+
+
+def per_call(fn, n: int, repeats: int = 5) -> float:
+    """Best-of-`repeats` microseconds per call of fn over n calls."""
+    best = float("inf")
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        best = min(best, (time.perf_counter() - t0) / n)
+    return 1e6 * best
+
+
+def statement_cost(n: int, rounds: int = 21) -> float:
+    """Microseconds the metering adds to one statement. The difference between the two connections
+    is within their noise, so this is the work added around the statement: a perf_counter() and an
+    observation, an upper bound."""
+    sql = "SELECT user_id, subject FROM timer_sessions WHERE id=?"
+    costs = {}
+    for name, factory in (("plain", sqlite3.Connection), ("metered", db._MeteredConnection)):
+        conn = db._connect(factory=factory)
+        costs[name] = (conn, [])
+    for _ in range(rounds):
+        for conn, timings in costs.values():
+            timings.append(per_call(lambda: conn.execute(sql, (1,)).fetchone(), n // rounds, repeats=1))
+    (plain, plain_us), (metered, metered_us) = costs["plain"], costs["metered"]
+    plain.close()
+    metered.close()
+    plain_us, metered_us = statistics.median(plain_us), statistics.median(metered_us)
+    print(f"statement        plain {plain_us:6.2f} us   metered {metered_us:6.2f} us")
+    return per_call(lambda: db._observe_query(sql, time.perf_counter()), n)
+
+
+def totals() -> tuple:
+    """(statements, commits, connections opened) so far."""
+    statements = commits = 0
+    for (op,), child in list(db.QUERY_SECONDS._children.items()):
+        count = sum(child.counts)
+        statements += count
+        if op == "commit":
+            commits += count
+    opened = sum(c.value for c in list(db.CONNECTIONS_OPENED._children.values()))
+    return statements, commits, opened
+
+
+def open_view(view: str, user_id: str):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(ROOT / "main.py"), default_timeout=60)
+    at.query_params["user"] = user_id
+    at.run()
+    radio = at.sidebar.radio[0]
+    radio.set_value(next(o for o in radio.options if view in o)).run()
+    return at
+
+
+def rerun(at) -> float:
+    t0 = time.perf_counter()
+    at.run()
+    assert not at.exception, at.exception
+    return 1000 * (time.perf_counter() - t0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--reruns", type=int, default=30)
+    parser.add_argument("--calls", type=int, default=100000, help="calls per micro-benchmark")
+    args = parser.parse_args()
+
+    # open_view() picks the user through ?user=, taken on trust (see main.py)
+    db.TRUST_CLIENT_USER = True
+    db.configure(Path(tempfile.mkdtemp()) / "bench_metrics.db")
+    db.init_db()
+    seed_users(0, args.users, args.days, db.today_day())
+
+    statement = statement_cost(args.calls)
+    counter = per_call(db._OPENED[False].inc, args.calls)
+    histogram = metrics.Histogram("bench_rerun_seconds", "", ("view",))
+    timed = per_call(lambda: metrics.Timed(histogram, histogram.labels("today")).__enter__().__exit__(), args.calls)
+    print(f"overhead         statement {statement:5.2f} us   connection {counter:5.2f} us   rerun {timed:5.2f} us\n")
+
+    for view in VIEWS:
+        at = open_view(view, "user0")
+        before = totals()
+        on = [rerun(at) for _ in range(args.reruns)]
+        statements, commits, opened = (a - b for a, b in zip(totals(), before))
+        statements /= args.reruns
+        commits /= args.reruns
+        opened /= args.reruns
+        cost = ((statements + commits) * statement + opened * counter + timed) / 1000
+        rerun_ms = statistics.median(on)
+
+        # Interleaved so drift in the machine hits both sides alike
+        plain, metered = [], []
+        for _ in range(args.reruns):
+            metrics.ENABLED = False
+            plain.append(rerun(at))
+            metrics.ENABLED = True
+            metered.append(rerun(at))
+        print(f"{view:<10} {statements:5.1f} statements {commits:4.1f} commits {opened:4.1f} connections per rerun   "
+              f"rerun {rerun_ms:7.2f} ms   overhead {cost:6.3f} ms = {100 * cost / rerun_ms:5.2f}%   "
+              f"(off {statistics.median(plain):7.2f} ms, on {statistics.median(metered):7.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
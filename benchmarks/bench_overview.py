@@ -0,0 +1,64 @@
+"""Latency of the Today overview query against the per-page reads it replaces.
+
+Seeds --users users with --days of history and, for random users, times
+database.get_day_overview() (one UNION ALL statement) against the separate
+reads the Academics, Health, Timer and Finance pages issue for the same
+numbers. Both sides open their own connections, as the views do.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_overview --users 100 --days 365
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_tenancy import seed_users
+from modules import database as db
+from modules import recurrence
+
+
+def separate(user_id: str, today: int) -> None:
+    recurrence.day_tasks(user_id, today, "Academics")
+    recurrence.day_habits(user_id, today)
+    db.get_streaks("habit", today, user_id=user_id)
+    db.get_timer_stats(today, user_id=user_id)
+    db.get_focus_streak(user_id=user_id)
+    db.get_recent_finance(limit=20, columns=("day", "category", "amount"), user_id=user_id)
+
+
+def timed(fn, users: int, samples: int) -> list:
+    timings = []
+    for _ in range(samples):
+        user_id = f"user{random.randrange(users)}"
+        t0 = time.perf_counter()
+        fn(user_id)
+        timings.append(1000 * (time.perf_counter() - t0))
+    return sorted(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--samples", type=int, default=500)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "overview.db")
+    db.init_db()
+    today = db.today_day()
+    for start in range(0, args.users, 50):
+        seed_users(start, min(start + 50, args.users), args.days, today)
+
+    for name, fn in (("overview", lambda u: db.get_day_overview(today, user_id=u)),
+                     ("separate", lambda u: separate(u, today))):
+        timings = timed(fn, args.users, args.samples)
+        print(f"{name:<9} p50 {statistics.median(timings):6.2f} ms   "
+              f"p99 {timings[int(0.99 * (len(timings) - 1))]:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""Time of the Monte Carlo investment projection (modules/projection.py).
+
+Seeds one user with --days of ledger history, fits the monthly flows and
+times a cold --paths x --years simulation, then the same call again, which
+is answered from the input-hash cache.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_projection --paths 100000 --years 30
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_tenancy import seed_users
+from modules import database as db
+from modules import finance_cache
+from modules import projection
+
+USER = "user0"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--paths", type=int, default=100_000)
+    parser.add_argument("--years", type=int, default=30)
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "projection.db")
+    db.init_db()
+    seed_users(0, 1, args.days, db.today_day() - 1)
+    ledger = finance_cache.get_frame(USER)
+    t0 = time.perf_counter()
+    flows = projection.observed_flows(ledger.monthly, ledger.totals["Invest"])
+    print(f"flows from {ledger.rows:,} entries in {1000 * (time.perf_counter() - t0):.1f} ms: "
+          f"income {flows.income_mean:,.0f}/month, invest rate {100 * flows.invest_rate:.1f}%")
+
+    goal = 10 * (flows.balance + 12 * flows.income_mean)
+    cold = []
+    for seed in range(args.samples):
+        t0 = time.perf_counter()
+        result = projection.simulate(flows, args.years, goals=(goal,), paths=args.paths, seed=seed)
+        cold.append(1000 * (time.perf_counter() - t0))
+    t0 = time.perf_counter()
+    projection.simulate(flows, args.years, goals=(goal,), paths=args.paths, seed=args.samples - 1)
+    hit = 1000 * (time.perf_counter() - t0)
+    print(f"{args.paths:,} paths x {args.years} years: median {statistics.median(cold):.0f} ms, "
+          f"max {max(cold):.0f} ms; cached {hit:.3f} ms")
+    print(f"median after {args.years} years {result.bands[50][-1]:,.0f}, "
+          f"P(>= {goal:,.0f}) {100 * result.goal_probability(goal):.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Table size and query time with every occurrence stored versus recurrence rules.
+
+Builds two databases holding the same --days of history for --users users,
+each with 5 daily habits and 3 weekday tasks of which about --done are ticked:
+
+- materialised: a row per occurrence per day, as upsert_task/upsert_habit wrote
+- lazy: the rules once, plus rows only for the occurrences that were ticked
+
+and reports row counts, sizes, and the time to compute a user's completion
+over the whole range and to list one day. "data" is the pages held by the
+tasks, habits and recurring_rules tables with their indexes and the tasks FTS
+index (from dbstat); the file size also counts the ~0.2 MB an empty database
+takes for the rest of the schema, which hides the difference at small sizes.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_recurrence --users 50 --days 365
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from modules import database as db
+from modules import recurrence
+
+HABITS = ["Peanut Butter", "Venusia Max", "Bisleri Rinse", "Night Cream", "Workout"]
+TASKS = ["Review notes", "Practice problems", "Flashcards"]
+
+
+def build(path: Path, users: int, days: int, done: float, lazy: bool) -> None:
+    db.configure(path)
+    db.init_db()
+    today = db.today_day()
+    first = today - days + 1
+    rng = random.Random(7)
+    tasks, habits, rules = [], [], []
+    for n in range(users):
+        user_id = f"user{n}"
+        for name in HABITS:
+            rules.append((user_id, "habit", name, "", "daily", first))
+        for name in TASKS:
+            rules.append((user_id, "task", name, "Academics", "weekdays", first))
+        for day in range(first, today + 1):
+            for name in HABITS:
+                status = int(rng.random() < done)
+                if status or not lazy:
+                    habits.append((user_id, day, name, status))
+            if recurrence.weekday(day) < 5:
+                for name in TASKS:
+                    status = int(rng.random() < done)
+                    if status or not lazy:
+                        tasks.append((user_id, day, name, "Academics", status))
+    conn = db.get_conn()
+    # Seed rows are history, not changes to sync; keep them out of the change log
+    conn.execute("INSERT INTO sync_state (key, value) VALUES ('suspended', '1')")
+    if lazy:
+        conn.executemany(
+            "INSERT INTO recurring_rules (user_id, kind, name, category, freq, start_day) VALUES (?, ?, ?, ?, ?, ?)",
+            rules,
+        )
+    conn.executemany("INSERT INTO tasks (user_id, day, task_name, category, status) VALUES (?, ?, ?, ?, ?)", tasks)
+    conn.executemany("INSERT INTO habits (user_id, day, habit, status) VALUES (?, ?, ?, ?)", habits)
+    conn.execute("DELETE FROM sync_state WHERE key='suspended'")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+_DATA_SQL = (
+    "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+    "(SELECT name FROM sqlite_master WHERE tbl_name IN ('tasks', 'habits', 'recurring_rules')) "
+    "OR name LIKE 'tasks_fts%'"
+)
+
+
+def data_bytes() -> int:
+    conn = db.get_conn()
+    size = conn.execute(_DATA_SQL).fetchone()[0]
+    conn.close()
+    return size
+
+
+_COMPLETION_SQL = (
+    "SELECT SUM(status), COUNT(*) FROM (SELECT status FROM habits WHERE user_id=? AND day BETWEEN ? AND ? "
+    "UNION ALL SELECT status FROM tasks WHERE user_id=? AND day BETWEEN ? AND ?)"
+)
+
+
+def completion(user_id: str, first: int, last: int, lazy: bool) -> float:
+    conn = db.get_conn()
+    done, total = conn.execute(_COMPLETION_SQL, (user_id, first, last) * 2).fetchone()
+    conn.close()
+    if lazy:
+        # Stored rows are only the ticked occurrences; the denominator comes from the rules
+        total = recurrence.count(recurrence.get_rules(user_id, "habit"), first, last)
+        total += recurrence.count(recurrence.get_rules(user_id, "task"), first, last)
+    return done / total
+
+
+def timed(fn, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(1000 * (time.perf_counter() - t0))
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--done", type=float, default=0.1, help="share of occurrences ticked")
+    parser.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    for lazy in (False, True):
+        path = tmp / ("lazy.db" if lazy else "materialised.db")
+        build(path, args.users, args.days, args.done, lazy)
+        db.configure(path)
+        recurrence.forget()
+        conn = db.get_conn()
+        rows = sum(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in ("tasks", "habits"))
+        conn.close()
+        today = db.today_day()
+        first = today - args.days + 1
+        # Rules are cached per process in the app; time the steady state
+        for n in range(args.users):
+            for kind in ("habit", "task"):
+                recurrence.get_rules(f"user{n}", kind)
+        year_ms = timed(lambda: completion(f"user{random.randrange(args.users)}", first, today, lazy), args.samples)
+        if lazy:
+            day_ms = timed(lambda: (recurrence.day_habits("user0", today),
+                                    recurrence.day_tasks("user0", today, "Academics")), args.samples)
+        else:
+            day_ms = timed(lambda: (db.get_habits(today, user_id="user0"),
+                                    db.get_tasks(today, category="Academics", user_id="user0")), args.samples)
+        rate = completion("user0", first, today, lazy)
+        print(f"{path.stem:<13} {rows:>9,} rows   data {data_bytes() / 1e6:7.2f} MB   "
+              f"file {path.stat().st_size / 1e6:7.2f} MB   "
+              f"completion {rate:.3f} in {year_ms:6.2f} ms   one day {day_ms:5.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare SELECT * + sqlite3.Row against projected namedtuple rows.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rows --rows 200000
+"""
+import argparse
+import random
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from modules import database as db
+from views.finance import CATEGORIES
+
+# What the ledger table once read from get_finance()
+LEDGER_COLUMNS = ("day", "category", "amount")
+
+
+def seed(rows: int) -> None:
+    start = db.to_day(date(2020, 1, 1))
+    conn = db.get_conn()
+    conn.executemany(
+        "INSERT INTO finance (day, category, amount, note) VALUES (?, ?, ?, ?)",
+        (
+            (
+                start + i // 20,
+                random.choice(CATEGORIES),
+                round(random.uniform(10, 5000), 2),
+                f"note {i}",
+            )
+            for i in range(rows)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_fetch(limit: int) -> list:
+    conn = db.get_conn()
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute("SELECT * FROM finance ORDER BY day ASC, id ASC LIMIT ?", (limit,)).fetchall()
+    conn.close()
+    return rows
+
+
+def measure(label: str, fetch, to_frame) -> None:
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    rows = fetch()
+    t1 = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    t2 = time.perf_counter()
+    to_frame(rows)
+    t3 = time.perf_counter()
+    print(
+        f"{label:<28} fetch {1000 * (t1 - t0):8.1f} ms   "
+        f"{peak / max(len(rows), 1):6.0f} B/row   DataFrame {1000 * (t3 - t2):8.1f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "bench_rows.db")
+    db.init_db()
+    seed(args.rows)
+    print(f"finance rows: {args.rows}")
+
+    measure(
+        "SELECT * / sqlite3.Row",
+        lambda: legacy_fetch(args.rows),
+        lambda rows: pd.DataFrame(rows, columns=rows[0].keys() if rows else None),
+    )
+    measure(
+        "projected namedtuple",
+        lambda: db.get_finance(limit=args.rows, columns=LEDGER_COLUMNS),
+        lambda rows: pd.DataFrame.from_records(rows, columns=LEDGER_COLUMNS),
+    )
+    measure(
+        "streamed namedtuple",
+        lambda: list(db.iter_finance(columns=LEDGER_COLUMNS)),
+        lambda rows: pd.DataFrame.from_records(rows, columns=LEDGER_COLUMNS),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Search latency over a large FTS5-indexed history.
+
+Seeds --rows rows split between tasks and finance across --users users, with
+names and notes drawn from a realistic vocabulary, then times search() for a
+mix of exact, prefix and multi-word queries.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_search --rows 1000000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from modules import database as db
+from modules import search
+
+SUBJECTS = ["Maths", "Mech", "Chem", "Python", "Physics", "English"]
+TOPICS = [
+    "Maclaurin Series", "Radius of Curvature", "Jacobians", "Lagrange", "TIG vs MIG", "Welding Diagrams",
+    "Robot Configurations", "Wiener Index", "Zagreb Indices", "File Handling", "Numpy Basics", "Pandas read_csv",
+    "Eigenvalues", "Stress Strain", "IC Engine", "BHP IHP Numericals", "Polymers", "Regression Mode",
+]
+MERCHANTS = ["Swiggy", "Zomato", "Blinkit", "Uber", "Ola", "Amazon", "Flipkart", "Metro", "Canteen", "Chai"]
+CATEGORIES = ["Expense: Food", "Expense: Travel", "Expense: Other", "Income: Dad", "Invest: Nifty 50"]
+QUERIES = ["tig", "swiggy", "maclaurin series", "welding diag", "zom", "robot config", "chai canteen", "numpy"]
+
+
+def seed(rows: int, users: int) -> None:
+    today = db.today_day()
+    conn = db.get_conn()
+    half = rows // 2
+    conn.executemany(
+        "INSERT INTO tasks (user_id, day, task_name, category, status) VALUES (?, ?, ?, ?, ?)",
+        (
+            (f"user{i % users}", today - i // users, f"{random.choice(SUBJECTS)}: {random.choice(TOPICS)}",
+             "Academics", random.randint(0, 1))
+            for i in range(half)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO finance (user_id, day, category, amount, note) VALUES (?, ?, ?, ?, ?)",
+        (
+            (f"user{i % users}", today - i // users, random.choice(CATEGORIES), round(random.uniform(10, 900), 2),
+             f"{random.choice(MERCHANTS)} {random.choice(['order', 'ride', 'snacks', 'lunch', 'refill'])}")
+            for i in range(rows - half)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "bench_search.db")
+    db.init_db()
+    t0 = time.perf_counter()
+    seed(args.rows, args.users)
+    print(f"seeded {args.rows:,} rows (FTS maintained by triggers) in {time.perf_counter() - t0:.1f} s")
+
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.samples):
+            user_id = f"user{random.randrange(args.users)}"
+            t0 = time.perf_counter()
+            results = search.search(query, user_id=user_id)
+            timings.append(1000 * (time.perf_counter() - t0))
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"{query!r:<22} p50 {statistics.median(timings):7.2f} ms   p99 {p99:7.2f} ms   first page {len(results.hits)} hits")
+
+
+if __name__ == "__main__":
+    main()
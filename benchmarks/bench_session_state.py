@@ -0,0 +1,60 @@
+"""Session-state growth over a long-lived session, per-date keys versus scoped keys.
+
+Simulates --days days of a dashboard left open: each day the health page
+renders one checkbox per habit and the user browses --dates dates of the
+academics plan. Reports the number of keys and their deep size (as in
+modules/session_state.size) kept by
+
+- unscoped: a new f"acad_{date}_{idx}" / f"habit_{day}_{idx}" key per widget, never removed
+- scoped: modules/session_state.key(), which keeps MAX_SCOPES dates per namespace
+
+Run from the repository root:
+
+    python -m benchmarks.bench_session_state --days 60 --dates 10
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from modules import session_state
+
+HABITS = 5
+TASKS = 3
+
+
+def browse(state: dict, days: int, dates: int, scoped: bool) -> float:
+    rng = random.Random(3)
+    start = date(2026, 1, 1)
+    t0 = time.perf_counter()
+    for n in range(days):
+        today = (start + timedelta(days=n)).isoformat()
+        for idx in range(HABITS):
+            k = session_state.key(state, "habit", today, idx) if scoped else f"habit_{today}_{idx}"
+            state[k] = rng.random() < 0.5
+        for _ in range(dates):
+            shown = (start + timedelta(days=rng.randrange(60))).isoformat()
+            for idx in range(TASKS):
+                k = session_state.key(state, "acad", shown, idx) if scoped else f"acad_{shown}_{idx}"
+                state.setdefault(k, False)
+    return 1000 * (time.perf_counter() - t0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--dates", type=int, default=10, help="academics dates browsed per day")
+    args = parser.parse_args()
+
+    for scoped in (False, True):
+        state: dict = {}
+        for days in (1, args.days // 4, args.days):
+            state.clear()
+            elapsed = browse(state, days, args.dates, scoped)
+            footprint = session_state.size(state)
+            print(f"{'scoped' if scoped else 'unscoped':<9} after {days:>4} days: {footprint.keys:>6} keys "
+                  f"{footprint.bytes / 1024:8.1f} KB   ({elapsed:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Streak reads and writes with streak_state versus recomputing from rows.
+
+For each --days size, seeds one user with that much habit and focus history
+(80% of days done) in a fresh database, then times:
+
+- reading every habit's streak plus the focus streak, recomputed from the
+  rows per key as the views used to, against the streak_state lookup. "query"
+  runs both on one open connection; "call" goes through get_streaks(), which
+  opens a connection per kind, about 0.5 ms each, as the views do
+- ticking today (the O(1) path) and editing a day a month back (which
+  recomputes that habit from its runs)
+
+A recompute reads every completed day of every key, so it grows with the
+history while the lookup stays flat. As queries the lookup is far cheaper at
+any size. With a month of history, though, both are small next to opening a
+connection, so through get_streaks() the table only pays off from about a
+year of history on.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_streaks --days 30,365,3650
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_tenancy import HABITS, seed_users
+from modules import database as db
+
+USER = "user0"
+
+
+def recomputed(today: int, conn=None) -> dict:
+    own = conn is None
+    conn = conn or db.get_conn()
+    streaks = {}
+    for habit in HABITS:
+        streaks[habit] = conn.execute(
+            db._STREAK_SQL.format(days="SELECT DISTINCT day FROM habits WHERE user_id=? AND habit=? AND status=1 AND day<=?"),
+            (USER, habit, today, today + 1),
+        ).fetchone()[0]
+    streaks[""] = conn.execute(
+        db._STREAK_SQL.format(days="SELECT DISTINCT day FROM timer_sessions WHERE user_id=? AND completed=1 AND day<=?"),
+        (USER, today, today + 1),
+    ).fetchone()[0]
+    if own:
+        conn.close()
+    return streaks
+
+
+def stored_query(today: int, conn) -> dict:
+    """The lookup get_streaks() makes, for both kinds, on an open connection."""
+    return {key: current if last_day == today else 0 for key, current, last_day in conn.execute(
+        "SELECT key, current, last_day FROM streak_state WHERE user_id=? AND kind IN ('habit', 'focus')", (USER,))}
+
+
+def stored(today: int) -> dict:
+    streaks = {key: s.current for key, s in db.get_streaks("habit", today, user_id=USER).items()}
+    streaks[""] = db.get_streaks("focus", today, user_id=USER)[""].current
+    return streaks
+
+
+def timed(fn, samples: int) -> float:
+    timings = []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(1000 * (time.perf_counter() - t0))
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", default="30,365,3650", help="comma-separated history lengths")
+    parser.add_argument("--samples", type=int, default=50)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    for days in (int(d) for d in args.days.split(",")):
+        db.configure(tmp / f"streaks_{days}.db")
+        db.init_db()
+        today = db.today_day()
+        seed_users(0, 1, days, today)
+        t0 = time.perf_counter()
+        rows = db.rebuild_streaks()
+        print(f"{days:,} days: rebuild {rows} streaks in {1000 * (time.perf_counter() - t0):.1f} ms")
+
+        assert recomputed(today) == stored(today), "streak_state disagrees with the rows"
+        conn = db.get_conn()
+        query = (timed(lambda: recomputed(today, conn), args.samples), timed(lambda: stored_query(today, conn), args.samples))
+        conn.close()
+        call = (timed(lambda: recomputed(today), args.samples), timed(lambda: stored(today), args.samples))
+        print(f"  read all streaks  query: recomputed {query[0]:6.2f} ms, streak_state {query[1]:.3f} ms   "
+              f"call: recomputed {call[0]:6.2f} ms, streak_state {call[1]:.3f} ms")
+
+        toggle = iter(range(10 ** 9))
+        tick = timed(lambda: db.set_habit_status(today, HABITS[0], next(toggle) % 2 == 0, user_id=USER), args.samples)
+        edit = timed(lambda: db.set_habit_status(today - 30, HABITS[1], next(toggle) % 2 == 0, user_id=USER), args.samples)
+        assert recomputed(today) == stored(today), "streak_state drifted"
+        print(f"  write: tick today {tick:.2f} ms, edit 30 days back {edit:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
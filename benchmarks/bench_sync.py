@@ -0,0 +1,93 @@
+"""Bytes exchanged by modules/sync.py after a day of use on two devices.
+
+Seeds one user with --days of history, copies the database to a second
+"device" and syncs them once. Then both copies are used for a day: each
+materialises the day's tasks and habits, ticks some of them (including the
+same habit both ways), logs expenses and focus sessions. The report gives
+the size of each delta against the database file and checks that both
+copies end up with the same rows.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sync --days 365
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_tenancy import CATEGORIES, HABITS, SUBJECTS, seed_users
+from modules import database as db
+from modules import sync
+
+USER = "user0"
+
+
+def use_for_a_day(path: Path, day: int, rng: random.Random) -> None:
+    db.configure(path)
+    for i in range(3):
+        db.upsert_task(day, f"Task {i}", "Academics", user_id=USER)
+    for habit in HABITS:
+        db.upsert_habit(day, habit, user_id=USER)
+    db.set_task_status(day, f"Task {rng.randrange(3)}", "Academics", True, user_id=USER)
+    for habit in rng.sample(HABITS, 3):
+        db.set_habit_status(day, habit, True, user_id=USER)
+    # Same habit ticked on one device and unticked on the other; the later toggle wins
+    db.set_habit_status(day, HABITS[0], path.stem == "a", user_id=USER)
+    for _ in range(3):
+        db.add_finance_entry(day, rng.choice(CATEGORIES), round(rng.uniform(10, 500), 2), "bench", user_id=USER)
+    start = day * 86400 + 14 * 3600
+    for i in range(2):
+        db.add_timer_session(day, start + i * 3600, 25, subject=rng.choice(SUBJECTS), end=start + i * 3600 + 1500,
+                             user_id=USER)
+
+
+def snapshot(path: Path) -> dict:
+    db.configure(path)
+    conn = db.get_conn()
+    rows = {table: sorted(tuple(r) for r in conn.execute(f"SELECT {', '.join(columns)} FROM {table}"))
+            for table, columns in db.SYNC_COLUMNS.items()}
+    conn.close()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    a, b = tmp / "a.db", tmp / "b.db"
+    db.configure(a)
+    db.init_db()
+    today = db.today_day()
+    seed_users(0, 1, args.days, today - 1)
+    shutil.copy(a, b)
+    db.configure(b)
+    sync.reset_device()
+
+    t0 = time.perf_counter()
+    first = sync.sync_files(a)
+    print(f"first sync: pull {first['pull']['bytes']:,} B, push {first['push']['bytes']:,} B "
+          f"in {1000 * (time.perf_counter() - t0):.1f} ms")
+
+    use_for_a_day(a, today, random.Random(1))
+    time.sleep(0.01)
+    use_for_a_day(b, today, random.Random(2))
+
+    db.configure(b)
+    t0 = time.perf_counter()
+    result = sync.sync_files(a)
+    elapsed = 1000 * (time.perf_counter() - t0)
+    size = b.stat().st_size
+    for direction, stats in result.items():
+        print(f"{direction}: {stats['applied']} applied, {stats['skipped']} skipped, {stats['bytes']:,} B "
+              f"({100 * stats['bytes'] / size:.3f}% of the {size:,} B database)")
+    print(f"day sync: {elapsed:.1f} ms")
+    print("converged" if snapshot(a) == snapshot(b) else "DIVERGED")
+
+
+if __name__ == "__main__":
+    main()
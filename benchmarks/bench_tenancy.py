@@ -0,0 +1,105 @@
+"""Per-user query latency as the number of users on one database grows.
+
+Users are added in steps (1, 10, 100, ... up to --users), each with --days of
+history in every table. After each step, the queries behind one page load are
+timed for randomly chosen users. With user-leading indexes the p50/p99 should
+stay flat while total rows grow by orders of magnitude.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_tenancy --users 10000 --days 30
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from modules import database as db
+
+HABITS = ["Peanut Butter", "Venusia Max", "Bisleri Rinse", "Night Cream", "Workout"]
+CATEGORIES = ["Income: Dad", "Expense: Food", "Expense: Travel", "Invest: Nifty 50"]
+SUBJECTS = ["Maths", "Mech", "Chem", "Python"]
+
+
+def seed_users(first: int, last: int, days: int, today: int) -> None:
+    tasks, habits, finance, sessions = [], [], [], []
+    for n in range(first, last):
+        user_id = f"user{n}"
+        for day in range(today - days + 1, today + 1):
+            for i in range(3):
+                tasks.append((user_id, day, f"Task {i}", "Academics", random.randint(0, 1)))
+            for habit in HABITS:
+                habits.append((user_id, day, habit, int(random.random() < 0.8)))
+            for _ in range(2):
+                finance.append((user_id, day, random.choice(CATEGORIES), round(random.uniform(10, 2000), 2), "seed"))
+            start = (day * 86400) + 9 * 3600
+            for i in range(2):
+                sessions.append((user_id, day, start + i * 3600, start + i * 3600 + 1500, 25, 1, random.choice(SUBJECTS)))
+    conn = db.get_conn()
+    conn.executemany("INSERT INTO tasks (user_id, day, task_name, category, status) VALUES (?, ?, ?, ?, ?)", tasks)
+    conn.executemany("INSERT INTO habits (user_id, day, habit, status) VALUES (?, ?, ?, ?)", habits)
+    conn.executemany("INSERT INTO finance (user_id, day, category, amount, note) VALUES (?, ?, ?, ?, ?)", finance)
+    conn.executemany(
+        "INSERT INTO timer_sessions (user_id, day, start_ts, end_ts, duration_minutes, completed, subject) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        sessions,
+    )
+    conn.commit()
+    conn.close()
+    # Raw inserts skip the streak bookkeeping in set_habit_status/add_timer_session
+    for n in range(first, last):
+        db.rebuild_streaks(f"user{n}")
+
+
+def page_load(user_id: str, today: int) -> None:
+    """The reads the four views issue for one user on one rerun each."""
+    db.get_tasks(today, category="Academics", user_id=user_id)
+    db.get_habits(today, columns=("habit", "status"), user_id=user_id)
+    db.get_streaks("habit", user_id=user_id)
+    db.get_finance(limit=500, columns=("day", "category", "amount"), user_id=user_id)
+    db.get_recent_finance(limit=5, user_id=user_id)
+    db.get_timer_stats(today, user_id=user_id)
+    db.get_focus_streak(user_id=user_id)
+    db.get_timer_sessions(today, user_id=user_id)
+
+
+def measure(users: int, today: int, samples: int) -> None:
+    timings = []
+    for _ in range(samples):
+        user_id = f"user{random.randrange(users)}"
+        t0 = time.perf_counter()
+        page_load(user_id, today)
+        timings.append(1000 * (time.perf_counter() - t0))
+    timings.sort()
+    conn = db.get_conn()
+    rows = sum(conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in db.USER_TABLES)
+    conn.close()
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+    print(f"{users:>7} users {rows:>11,} rows   p50 {statistics.median(timings):6.2f} ms   p99 {p99:6.2f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--samples", type=int, default=200)
+    args = parser.parse_args()
+
+    db.configure(Path(tempfile.mkdtemp()) / "bench_tenancy.db")
+    db.init_db()
+    today = db.today_day()
+
+    seeded = 0
+    step = 1
+    while seeded < args.users:
+        target = min(step, args.users)
+        seed_users(seeded, target, args.days, today)
+        seeded = target
+        measure(seeded, today, args.samples)
+        step *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""What the active_sessions journal costs a running focus timer.
+
+Runs --sessions timers through start, pause, resume and stop with --ticks
+timer-page reruns in between, and reports the read each rerun does (the
+journal row plus the remaining time derived from its stamps), the latency of
+each event, and the write transactions per session: one per event, however
+long the timer ran.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_timer_journal --sessions 50 --ticks 200
+"""
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from modules import database as db
+from modules import focus_timer
+
+
+def timed(fn) -> float:
+    t0 = time.perf_counter()
+    fn()
+    return 1000 * (time.perf_counter() - t0)
+
+
+def commits(path: Path) -> int:
+    """SQLite's file change counter: bumped by every write transaction (rollback journal mode)."""
+    with open(path, "rb") as f:
+        f.seek(24)
+        return int.from_bytes(f.read(4), "big")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=200, help="reruns between two events")
+    args = parser.parse_args()
+
+    path = Path(tempfile.mkdtemp()) / "timer.db"
+    db.configure(path, {"journal_mode": "DELETE"})
+    db.init_db()
+    events = {name: [] for name in ("start", "pause", "resume", "stop")}
+    ticks = []
+    tick_commits = 0
+
+    def rerun() -> None:
+        session = db.get_active_session()
+        focus_timer.remaining(session)
+
+    def run_ticks() -> None:
+        nonlocal tick_commits
+        before = commits(path)
+        for _ in range(args.ticks):
+            ticks.append(timed(rerun))
+        tick_commits += commits(path) - before
+
+    first = commits(path)
+    for _ in range(args.sessions):
+        events["start"].append(timed(lambda: focus_timer.start("General", 25)))
+        run_ticks()
+        events["pause"].append(timed(focus_timer.pause))
+        run_ticks()
+        events["resume"].append(timed(focus_timer.resume))
+        run_ticks()
+        events["stop"].append(timed(lambda: focus_timer.stop(False)))
+    total = commits(path) - first
+
+    print(f"rerun read   p50 {statistics.median(ticks):6.3f} ms   {len(ticks)} reruns, {tick_commits} commits")
+    for name, timings in events.items():
+        print(f"{name:<12} p50 {statistics.median(timings):6.3f} ms")
+    print(f"commits per session: {total / args.sessions:.1f} over {args.ticks * 3} reruns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""Many simultaneous headless sessions of main.py against one database.
+
+Each session is a separate process driving main.py through Streamlit's AppTest
+as its own user (?user=load<N>). Every round it ticks a task in Academics,
+ticks a habit in Health, submits an expense in Finance, and in Timer starts a
+focus session and finishes it with the Finish button. Every AppTest.run()
+counts as one rerun, and the first one (imports, cold caches) is reported
+separately as "open".
+
+Per run the harness records:
+- rerun latency percentiles, overall and per action
+- time in the statements that take SQLite's write lock (BEGIN, INSERT,
+  UPDATE, DELETE, COMMIT), which is where writers wait out busy_timeout for
+  each other, from the metered connections' life_os_db_query_seconds
+  histogram: per rerun, and the share of those statements that took over
+  10 ms; compare against a one-session run for the time spent waiting
+- "database is locked" errors, for waits that ran out of busy_timeout
+- CPU seconds per session
+
+The result can be written as JSON. Earlier results can be compared side by side:
+
+    python -m benchmarks.load_sessions --sessions 8 --rounds 10 --out load_8.json
+    python -m benchmarks.load_sessions --sessions 32 --rounds 10 --out load_32.json
+    python -m benchmarks.load_sessions --compare load_8.json load_32.json
+
+Run from the repository root. By default the sessions share a copy of
+data/life_os.db, and the original is never written.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+ACTIONS = ("open", "academics", "health", "finance", "timer")
+# life_os_db_query_seconds series of the statements that take or hold the write lock
+WRITE_OPS = ("begin", "insert", "update", "delete", "commit")
+# Uncontended writes finish well below this; slower ones mostly sat in busy_timeout
+SLOW_WRITE_SECONDS = 0.01
+
+
+def write_totals() -> List[float]:
+    """[statements, seconds, statements over SLOW_WRITE_SECONDS] for WRITE_OPS so far, from the metered connections."""
+    from modules import database as db
+
+    # counts[i] holds the observations up to bounds[i]
+    slow_from = db.QUERY_SECONDS.bounds.index(SLOW_WRITE_SECONDS) + 1
+    totals = [0, 0.0, 0]
+    for op in WRITE_OPS:
+        child = db.QUERY_SECONDS.labels(op)
+        totals[0] += sum(child.counts)
+        totals[1] += child.sum
+        totals[2] += sum(child.counts[slow_from:])
+    return totals
+
+
+class Session:
+    def __init__(self, index: int):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(str(ROOT / "main.py"), default_timeout=120)
+        self.user_id = f"load{index}"
+        self.at.query_params["user"] = self.user_id
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.locked = 0
+        self.errors = 0
+
+    def step(self, action: str, change=None) -> None:
+        t0 = time.perf_counter()
+        (change() if change else self.at).run()
+        self.latencies[action].append(1000 * (time.perf_counter() - t0))
+        for exc in self.at.exception:
+            if "database is locked" in exc.message:
+                self.locked += 1
+            else:
+                self.errors += 1
+
+    def goto(self, label: str) -> None:
+        radio = self.at.sidebar.radio[0]
+        self.step(label.lower(), lambda: radio.set_value([o for o in radio.options if label in o][0]))
+
+    def round(self, n: int) -> None:
+        at = self.at
+        self.goto("Academics")
+        if at.checkbox:
+            box = at.checkbox[n % len(at.checkbox)]
+            self.step("academics", box.uncheck if box.value else box.check)
+
+        self.goto("Health")
+        if at.checkbox:
+            box = at.checkbox[n % len(at.checkbox)]
+            self.step("health", box.uncheck if box.value else box.check)
+
+        self.goto("Finance")
+        at.number_input(key="expense_amount").set_value(50.0 + n)
+        at.text_input(key="expense_note").set_value(f"load round {n}")
+        submit = [b for b in at.button if "Add Expense" in b.label][0]
+        self.step("finance", submit.click)
+
+        # Started and finished through the timer's buttons; a running timer redraws in a fragment,
+        # so each click is one rerun
+        self.goto("Timer")
+        self.step("timer", at.button(key="start_timer").click)
+        self.step("timer", at.button(key="finish_timer").click)
+
+
+def run_session(args) -> Dict:
+    index, db_path, rounds = args
+    from modules import database as db
+    from modules import metrics
+
+    # Keep per-rerun widget warnings out of the report
+    logging.disable(logging.WARNING)
+
+    # Lock waits are read from the metered connections
+    metrics.ENABLED = True
+    db.configure(Path(db_path))
+    # main.py reads --db from the command line; this benchmark's own flags are not meant for it
+    sys.argv[1:] = []
+    cpu0 = time.process_time()
+    t0 = time.perf_counter()
+    session = Session(index)
+    session.step("open")
+    # The first rerun's migrations and seeding are not part of the load
+    before = write_totals()
+    for n in range(rounds):
+        session.round(n)
+    writes, write_seconds, slow_writes = (a - b for a, b in zip(write_totals(), before))
+    return {
+        "latencies": dict(session.latencies),
+        "writes": writes,
+        "write_seconds": write_seconds,
+        "slow_writes": slow_writes,
+        "locked": session.locked,
+        "errors": session.errors,
+        "cpu_seconds": time.process_time() - cpu0,
+        "wall_seconds": time.perf_counter() - t0,
+    }
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    values = sorted(values)
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+    def at(q: float) -> float:
+        return values[min(len(values) - 1, int(len(values) * q))]
+
+    return {"p50": statistics.median(values), "p95": at(0.95), "p99": at(0.99)}
+
+
+def run(sessions: int, rounds: int, db_path: Path) -> Dict:
+    t0 = time.perf_counter()
+    with multiprocessing.get_context("spawn").Pool(sessions) as pool:
+        results = pool.map(run_session, [(i, str(db_path), rounds) for i in range(sessions)])
+    wall = time.perf_counter() - t0
+
+    by_action: Dict[str, List[float]] = defaultdict(list)
+    for result in results:
+        for action, values in result["latencies"].items():
+            by_action[action].extend(values)
+    # The first rerun of a session pays for imports; it is reported on its own
+    every = [v for action, values in by_action.items() if action != "open" for v in values]
+    cpu = [r["cpu_seconds"] for r in results]
+    return {
+        "sessions": sessions,
+        "rounds": rounds,
+        "reruns": len(every),
+        "wall_seconds": wall,
+        "reruns_per_second": len(every) / wall,
+        "latency_ms": percentiles(every),
+        "latency_ms_by_action": {a: percentiles(by_action[a]) for a in ACTIONS if a in by_action},
+        "write_ms_per_rerun": 1000 * sum(r["write_seconds"] for r in results) / max(1, len(every)),
+        "slow_write_share": sum(r["slow_writes"] for r in results) / max(1, sum(r["writes"] for r in results)),
+        "locked_errors": sum(r["locked"] for r in results),
+        "other_errors": sum(r["errors"] for r in results),
+        "cpu_seconds_per_session": statistics.mean(cpu),
+        "cpu_seconds_per_rerun": sum(cpu) / max(1, sum(len(values) for values in by_action.values())),
+    }
+
+
+def print_report(reports: List[Dict], labels: List[str]) -> None:
+    rows = [
+        ("sessions", lambda r: f"{r['sessions']}"),
+        ("reruns", lambda r: f"{r['reruns']}"),
+        ("reruns/s", lambda r: f"{r['reruns_per_second']:.1f}"),
+        ("p50 ms", lambda r: f"{r['latency_ms']['p50']:.0f}"),
+        ("p95 ms", lambda r: f"{r['latency_ms']['p95']:.0f}"),
+        ("p99 ms", lambda r: f"{r['latency_ms']['p99']:.0f}"),
+    ]
+    for action in ACTIONS:
+        rows.append((f"  {action} p95", lambda r, a=action: f"{r['latency_ms_by_action'].get(a, {}).get('p95', 0):.0f}"))
+    rows += [
+        # Reports saved before these were measured lack them
+        ("write ms/rerun", lambda r: f"{r.get('write_ms_per_rerun', 0):.1f}"),
+        ("writes >10 ms", lambda r: f"{100 * r.get('slow_write_share', 0):.1f}%"),
+        ("db locked", lambda r: f"{r['locked_errors']}"),
+        ("other errors", lambda r: f"{r['other_errors']}"),
+        ("cpu s/session", lambda r: f"{r['cpu_seconds_per_session']:.2f}"),
+        ("cpu ms/rerun", lambda r: f"{1000 * r['cpu_seconds_per_rerun']:.1f}"),
+    ]
+    width = max(14, *(len(label) for label in labels))
+    print(f"{'':<16}" + "".join(f"{label:>{width + 2}}" for label in labels))
+    for name, cell in rows:
+        print(f"{name:<16}" + "".join(f"{cell(r):>{width + 2}}" for r in reports))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--db", type=Path, default=ROOT / "data" / "life_os.db", help="database to copy for the run")
+    parser.add_argument("--out", type=Path, help="write the report as JSON")
+    parser.add_argument("--compare", type=Path, nargs="+", help="print saved reports side by side and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        reports = [json.loads(path.read_text()) for path in args.compare]
+        print_report(reports, [path.stem for path in args.compare])
+        return
+
+    db_path = Path(tempfile.mkdtemp()) / "life_os.db"
+    if args.db.exists():
+        shutil.copy(args.db, db_path)
+    # Each session acts as the user its ?user= names, taken on trust (see main.py)
+    os.environ["LIFE_OS_TRUST_CLIENT_USER"] = "1"
+    # Migrate once up front rather than in every session's first rerun
+    from modules import database as db
+
+    db.configure(db_path)
+    db.init_db()
+    os.environ.setdefault("STREAMLIT_BROWSER_GATHER_USAGE_STATS", "false")
+    report = run(args.sessions, args.rounds, db_path)
+    print_report([report], [f"{args.sessions} sessions"])
+    if args.out:
+        args.out.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,18 @@
+import argparse
+import os
+import time
 import streamlit as st
 from datetime import date
+from modules import api
+from modules import focus_timer
 from modules import database as db
-from views import academics, finance, health, timer
+from modules import metrics
+from modules import session_state
+from views import academics, finance, health, overview, search, timer
+
+rerun_started = time.perf_counter()
+# LIFE_OS_DEBUG=1 adds diagnostics to the sidebar (or the page in mobile mode)
+DEBUG = os.environ.get("LIFE_OS_DEBUG", "0") == "1"
 
 # Version: 1.3 - Added focus mode toggle (with/without rev meter)
 # Page config
@@ -163,8 +174,57 @@ div[data-baseweb="input"] > div,
 
 st.markdown(css_base, unsafe_allow_html=True)
 
-# Initialize DB
-db.init_db()
+# Database location and PRAGMAs: `streamlit run main.py -- --db PATH --pragma journal_mode=WAL`,
+# or LIFE_OS_DB / LIFE_OS_PRAGMAS
+parser = argparse.ArgumentParser()
+db.add_arguments(parser)
+db.configure_from_args(parser.parse_known_args()[0])
+
+# Initialize DB (the schema once per process and database)
+db.init_db_once()
+# Once per process: timers left running when the app last went down resume or are closed
+focus_timer.recover_once()
+
+# Optional JSON API for phones, served from this process when LIFE_OS_API_PORT is set
+if api.API_PORT:
+    api.start_in_background()
+
+
+# Metrics: rerun time per view here, queries and connections in modules/database.py. Exported on
+# LIFE_OS_METRICS_PORT and/or to LIFE_OS_METRICS_FILE when set (see modules/metrics.py)
+RERUN_SECONDS = metrics.histogram("life_os_rerun_seconds", "Script reruns by view and time to run", ("view",))
+metrics.gauge("life_os_streamlit_sessions", "Browser sessions whose state this server holds",
+              fn=session_state.live_sessions)
+metrics.start_exporter()
+session_state.track(st.session_state)
+
+# Resolve the active user; views only read and write that user's rows. With st.login() configured in
+# secrets.toml it is the logged-in account, otherwise the default user. ?user=<id> is only taken on
+# trust with LIFE_OS_TRUST_CLIENT_USER=1
+if "is_logged_in" in st.user:
+    if not st.user.is_logged_in:
+        if st.button("Log in"):
+            st.login()
+        st.stop()
+    try:
+        st.session_state.user_id = db.normalize_user_id(st.user.get("email") or st.user.get("sub"))
+    except ValueError:
+        st.error("This account has no email usable as a Life OS user id")
+        st.stop()
+elif 'user_id' not in st.session_state:
+    try:
+        claimed = st.query_params.get("user") if db.TRUST_CLIENT_USER else None
+        st.session_state.user_id = db.normalize_user_id(claimed)
+    except ValueError:
+        st.session_state.user_id = db.DEFAULT_USER
+user_id = st.session_state.user_id
+
+# The built-in schedules are stored as the user's recurrence rules, which every page's due counts come
+# from; once per session and user, whichever page opens first
+if st.session_state.get("rules_seeded") != user_id:
+    academics.seed_rules(user_id)
+    health.seed_rules(user_id)
+    st.session_state.rules_seeded = user_id
 
 # Mobile toggle at the top
 col1, col2 = st.columns([3, 1])
@@ -181,7 +241,7 @@ st.write("")
 # Conditional navigation based on mode
 if st.session_state.mobile_mode:
     # Mobile: Use horizontal tabs instead of sidebar
-    view = st.radio("", ["📚 Academics", "💰 Finance", "💪 Health", "⏱️ Timer"], horizontal=True, label_visibility="collapsed")
+    view = st.radio("", ["🏠 Today", "📚 Academics", "💰 Finance", "💪 Health", "⏱️ Timer", "🔎 Search"], horizontal=True, label_visibility="collapsed")
     st.write("---")
 else:
     # Desktop: Use sidebar
@@ -190,24 +250,41 @@ else:
     st.sidebar.markdown("<hr style='margin: 20px 0; border: none; border-top: 1px solid #e5e5ea;'>", unsafe_allow_html=True)
     st.sidebar.markdown("<p style='text-align: center; font-weight: 600; margin-bottom: 12px; color: #86868b;'>NAVIGATE</p>", unsafe_allow_html=True)
 
-    view = st.sidebar.radio("Navigation", ["📚 Academics", "💰 Finance", "💪 Health", "⏱️ Timer"], label_visibility="collapsed")
+    view = st.sidebar.radio("Navigation", ["🏠 Today", "📚 Academics", "💰 Finance", "💪 Health", "⏱️ Timer", "🔎 Search"], label_visibility="collapsed")
 
     st.sidebar.markdown("<hr style='margin: 20px 0; border: none; border-top: 1px solid #e5e5ea;'>", unsafe_allow_html=True)
     st.sidebar.markdown("<p style='text-align: center; font-size: 12px; color: #86868b; margin-top: 40px;'>Life OS Dashboard v1.3<br>Track • Analyze • Achieve</p>", unsafe_allow_html=True)
 
-if "Academics" in view:
-    st.markdown('<div class="apple-card">', unsafe_allow_html=True)
-    academics.render()
-    st.markdown('</div>', unsafe_allow_html=True)
-elif "Finance" in view:
-    st.markdown('<div class="apple-card">', unsafe_allow_html=True)
-    finance.render()
-    st.markdown('</div>', unsafe_allow_html=True)
-elif "Health" in view:
-    st.markdown('<div class="apple-card">', unsafe_allow_html=True)
-    health.render()
-    st.markdown('</div>', unsafe_allow_html=True)
-else:
-    st.markdown('<div class="apple-card">', unsafe_allow_html=True)
-    timer.render()
-    st.markdown('</div>', unsafe_allow_html=True)
+# Timed from the top of the script; a view leaving through st.rerun() counts too
+with metrics.Timed(RERUN_SECONDS, RERUN_SECONDS.labels(view.split(" ", 1)[-1].lower()), start=rerun_started):
+    if "Today" in view:
+        st.markdown('<div class="apple-card">', unsafe_allow_html=True)
+        overview.render(user_id)
+        st.markdown('</div>', unsafe_allow_html=True)
+    elif "Academics" in view:
+        st.markdown('<div class="apple-card">', unsafe_allow_html=True)
+        academics.render(user_id)
+        st.markdown('</div>', unsafe_allow_html=True)
+    elif "Finance" in view:
+        st.markdown('<div class="apple-card">', unsafe_allow_html=True)
+        finance.render(user_id)
+        st.markdown('</div>', unsafe_allow_html=True)
+    elif "Health" in view:
+        st.markdown('<div class="apple-card">', unsafe_allow_html=True)
+        health.render(user_id)
+        st.markdown('</div>', unsafe_allow_html=True)
+    elif "Search" in view:
+        st.markdown('<div class="apple-card">', unsafe_allow_html=True)
+        search.render(user_id)
+        st.markdown('</div>', unsafe_allow_html=True)
+    else:
+        st.markdown('<div class="apple-card">', unsafe_allow_html=True)
+        timer.render(user_id)
+        st.markdown('</div>', unsafe_allow_html=True)
+
+# Per-session footprint, measured on request: the walk over the whole session state is not free
+if DEBUG:
+    area = st if st.session_state.mobile_mode else st.sidebar
+    if area.button("Measure session state", key="debug_state_size"):
+        footprint = session_state.size(st.session_state)
+        area.caption(f"Session state: {footprint.keys} keys • {footprint.bytes / 1024:.1f} KB")
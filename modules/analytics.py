@@ -0,0 +1,161 @@
+"""Analytics engines for the finance ledger: the same aggregations on pandas or on Arrow.
+
+An engine turns database.FinanceColumns (the ledger loaded column-wise) into
+its own table type and answers the finance page's questions about it:
+
+- totals by kind (Income / Expense / Invest)
+- expenses by category
+- invested amount per day
+- amounts per calendar month and kind (for modules/projection.py)
+
+Each answer comes back as a small pandas Series or DataFrame, whatever engine
+computed it, so callers do not care which one ran. The engine is chosen with
+LIFE_OS_ANALYTICS=pandas|arrow (default pandas). The Arrow engine needs only
+pyarrow, which Streamlit already depends on; its aggregations run in Arrow's
+compute kernels on dictionary-encoded columns and never build a DataFrame of
+the ledger.
+"""
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from modules import database as db
+
+ENGINE = os.environ.get("LIFE_OS_ANALYTICS", "pandas")
+KINDS = ("Income", "Expense", "Invest")
+
+
+def _kinds(categories: List[str]) -> Tuple[List[str], np.ndarray]:
+    """Kind names (KINDS first) and the kind code of each category: "Expense: Food" -> "Expense"."""
+    of_category = [c.split(":", 1)[0] for c in categories]
+    names = list(KINDS) + sorted(set(of_category) - set(KINDS))
+    return names, np.array([names.index(k) for k in of_category], dtype=np.int32)
+
+
+def _month_index(months: np.ndarray) -> pd.PeriodIndex:
+    return pd.PeriodIndex(months.astype("datetime64[M]"), freq="M")
+
+
+class PandasEngine:
+    name = "pandas"
+
+    def table(self, columns: db.FinanceColumns) -> pd.DataFrame:
+        kinds, kind_of = _kinds(columns.categories)
+        return pd.DataFrame({
+            "id": columns.ids,
+            "day": columns.days.astype("datetime64[D]").astype("datetime64[ns]"),
+            "category": pd.Categorical.from_codes(columns.category_codes, columns.categories),
+            "kind": pd.Categorical.from_codes(kind_of[columns.category_codes], kinds),
+            "amount": columns.amounts,
+        })
+
+    def concat(self, tables: List[pd.DataFrame]) -> pd.DataFrame:
+        if len(tables) == 1:
+            return tables[0]
+        # Keep the categorical columns categorical when batches bring different values
+        for column in ("category", "kind"):
+            merged = tables[0][column].cat.categories
+            for t in tables[1:]:
+                merged = merged.union(t[column].cat.categories)
+            for t in tables:
+                t[column] = t[column].cat.set_categories(merged)
+        return pd.concat(tables, ignore_index=True)
+
+    def rows(self, t: pd.DataFrame) -> int:
+        return len(t)
+
+    def totals(self, t: pd.DataFrame) -> Dict[str, float]:
+        return {str(k): float(v) for k, v in t.groupby("kind", observed=True)["amount"].sum().items()}
+
+    def expenses_by_category(self, t: pd.DataFrame) -> pd.Series:
+        expenses = t[t["kind"] == "Expense"]
+        return expenses.groupby("category", observed=True)["amount"].sum().rename(index=str)
+
+    def invested_by_day(self, t: pd.DataFrame) -> pd.Series:
+        return t[t["kind"] == "Invest"].groupby("day")["amount"].sum()
+
+    def monthly(self, t: pd.DataFrame) -> pd.DataFrame:
+        months = t["day"].to_numpy().astype("datetime64[M]")
+        table = t.groupby([months, "kind"], observed=True)["amount"].sum().unstack(fill_value=0.0)
+        table.index = _month_index(table.index.to_numpy())
+        table.columns = table.columns.astype(str)
+        table.columns.name = None
+        return table
+
+
+class ArrowEngine:
+    name = "arrow"
+
+    def __init__(self):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        self.pa, self.pc = pa, pc
+
+    def table(self, columns: db.FinanceColumns):
+        pa = self.pa
+        kinds, kind_of = _kinds(columns.categories)
+        codes = columns.category_codes.astype(np.int32)
+        return pa.table({
+            "id": columns.ids,
+            "day": pa.array(columns.days.astype(np.int32), pa.date32()),
+            "category": pa.DictionaryArray.from_arrays(codes, pa.array(columns.categories, pa.string())),
+            "kind": pa.DictionaryArray.from_arrays(kind_of[codes], pa.array(kinds, pa.string())),
+            "amount": columns.amounts,
+        })
+
+    def concat(self, tables: list):
+        return self.pa.concat_tables(tables).unify_dictionaries()
+
+    def rows(self, t) -> int:
+        return t.num_rows
+
+    def _sum_by(self, t, keys):
+        return t.group_by(keys, use_threads=False).aggregate([("amount", "sum")])
+
+    def _of_kind(self, t, kind: str):
+        return t.filter(self.pc.equal(self.pc.dictionary_decode(t["kind"]), kind))
+
+    def totals(self, t) -> Dict[str, float]:
+        summed = self._sum_by(t, ["kind"]).to_pydict()
+        return {str(k): float(v) for k, v in zip(summed["kind"], summed["amount_sum"])}
+
+    def expenses_by_category(self, t) -> pd.Series:
+        summed = self._sum_by(self._of_kind(t, "Expense"), ["category"]).to_pydict()
+        return pd.Series(summed["amount_sum"], index=pd.Index(summed["category"], dtype=object), dtype="float64")
+
+    def invested_by_day(self, t) -> pd.Series:
+        summed = self._sum_by(self._of_kind(t, "Invest"), ["day"]).sort_by("day")
+        return pd.Series(summed["amount_sum"].to_numpy(),
+                         index=pd.DatetimeIndex(summed["day"].to_numpy().astype("datetime64[ns]")), dtype="float64")
+
+    def monthly(self, t) -> pd.DataFrame:
+        pc = self.pc
+        dates = t["day"]
+        month = pc.add(pc.multiply(pc.subtract(pc.year(dates), 1970), 12), pc.subtract(pc.month(dates), 1))
+        summed = self._sum_by(t.select(["kind", "amount"]).append_column("month", month), ["month", "kind"])
+        long = pd.DataFrame({
+            "month": summed["month"].to_numpy(),
+            "kind": summed["kind"].cast(self.pa.string()).to_numpy(zero_copy_only=False),
+            "amount": summed["amount_sum"].to_numpy(),
+        })
+        table = long.pivot_table(index="month", columns="kind", values="amount", aggfunc="sum", fill_value=0.0)
+        table.index = _month_index(table.index.to_numpy().astype("datetime64[M]"))
+        table.columns = table.columns.astype(str)
+        table.columns.name = None
+        return table
+
+
+ENGINES = {"pandas": PandasEngine, "arrow": ArrowEngine}
+_engines: Dict[str, object] = {}
+
+
+def get_engine(name: Optional[str] = None):
+    """The named engine (default LIFE_OS_ANALYTICS); ValueError for an unknown name."""
+    name = name or ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown analytics engine {name!r}; expected one of {', '.join(ENGINES)}")
+    if name not in _engines:
+        _engines[name] = ENGINES[name]()
+    return _engines[name]
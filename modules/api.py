@@ -0,0 +1,380 @@
+"""Small JSON-over-HTTP API for quick taps from a phone, next to the Streamlit app.
+
+Built on asyncio streams only. Requests are parsed on the event loop and each
+handler runs the ordinary modules/database.py functions on a thread pool, so a
+slow write never blocks other connections. Connections are kept alive.
+
+Requests act as the user of their `Authorization: Bearer <token>` token,
+from LIFE_OS_API_TOKENS="user:token,other:token2". Without a token they act
+as the default user, unless the default user has a token of its own. An
+`X-User` header or `?user=` naming anyone else is refused (403), unless
+LIFE_OS_TRUST_CLIENT_USER=1 says to take it on trust (benchmarks, local use).
+
+    GET  /health
+    GET  /tasks?day=YYYY-MM-DD[&category=...]
+    POST /tasks/status    {"day", "task_name", "category", "status"}
+    GET  /habits?day=YYYY-MM-DD
+    POST /habits/status   {"day", "habit", "status"}
+    POST /finance         {"category", "amount", "note", "day"?}
+    GET  /timer
+    POST /timer/start     {"subject"?, "duration_minutes"?}
+    POST /timer/pause
+    POST /timer/resume
+    POST /timer/finish    {"completed"?}
+
+`day` defaults to today everywhere. Run it inside the Streamlit process by
+setting LIFE_OS_API_PORT (main.py calls start_in_background), so in-process
+caches such as the habit calendar see its writes, or on its own with:
+
+    python -m modules.api --port 8600
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+from modules import database as db
+from modules import focus_timer, metrics, recurrence
+
+API_HOST = os.environ.get("LIFE_OS_API_HOST", "127.0.0.1")
+API_PORT = int(os.environ.get("LIFE_OS_API_PORT", "0") or 0)
+API_WORKERS = int(os.environ.get("LIFE_OS_API_WORKERS", "4"))
+MAX_BODY_BYTES = 64 * 1024
+# Ledger categories are "<kind>: <name>"; the totals and projections only know these kinds
+FINANCE_KINDS = ("Income", "Expense", "Invest")
+
+
+def parse_tokens(value: str) -> Dict[str, str]:
+    """token -> user id from "user:token,user2:token2"."""
+    tokens = {}
+    for pair in filter(None, (p.strip() for p in value.split(","))):
+        user_id, sep, token = pair.partition(":")
+        if not sep or not token:
+            raise ValueError(f"Invalid API token entry {pair!r}; expected user:token")
+        tokens[token] = db.normalize_user_id(user_id)
+    return tokens
+
+
+API_TOKENS = parse_tokens(os.environ.get("LIFE_OS_API_TOKENS", ""))
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+           404: "Not Found", 405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    query: Dict[str, str]
+    body: Dict[str, Any]
+    user_id: str
+
+
+def _day(value: Optional[Any]) -> int:
+    """An ISO date string; day numbers, booleans and the like are rejected rather than read as days."""
+    if value is None or value == "":
+        return db.today_day()
+    if isinstance(value, str):
+        try:
+            return db.to_day(date.fromisoformat(value))
+        except ValueError:
+            pass
+    raise ApiError(400, "day must be a YYYY-MM-DD date")
+
+
+def _text(value: Any, name: str) -> str:
+    if not isinstance(value, str) or not value.strip():
+        raise ApiError(400, f"{name} must be a non-empty string")
+    return value
+
+
+def _flag(value: Any, name: str) -> bool:
+    """A JSON boolean or 0/1; strings such as "false" are rejected rather than read as truthy."""
+    if type(value) in (bool, int) and value in (0, 1):
+        return bool(value)
+    raise ApiError(400, f"{name} must be true, false, 0 or 1")
+
+
+def _authenticate(headers: Dict[str, str], query: Dict[str, str]) -> str:
+    """The user a request may act as; see the module docstring."""
+    named = headers.get("x-user") or query.get("user")
+    claimed = db.normalize_user_id(named) if named else None
+    scheme, _, token = headers.get("authorization", "").partition(" ")
+    if scheme:
+        token = token.strip()
+        user_id = next((u for t, u in API_TOKENS.items() if hmac.compare_digest(t, token)), None)
+        if scheme.lower() != "bearer" or user_id is None:
+            raise ApiError(401, "invalid API token")
+    elif db.TRUST_CLIENT_USER:
+        return claimed or db.DEFAULT_USER
+    elif db.DEFAULT_USER in API_TOKENS.values():
+        raise ApiError(401, "API token required")
+    else:
+        user_id = db.DEFAULT_USER
+    if claimed is not None and claimed != user_id:
+        raise ApiError(403, f"not allowed to act as {claimed}")
+    return user_id
+
+
+def _require(body: Dict[str, Any], *names: str) -> Tuple:
+    missing = [n for n in names if n not in body]
+    if missing:
+        raise ApiError(400, f"missing field(s): {', '.join(missing)}")
+    return tuple(body[n] for n in names)
+
+
+# --- Handlers (run on the worker pool) ---
+
+def _health(req: Request) -> Dict:
+    return {"ok": True, "today": date.today().isoformat()}
+
+
+def _get_tasks(req: Request) -> Dict:
+    day = _day(req.query.get("day"))
+    rows = recurrence.day_tasks(req.user_id, day, category=req.query.get("category"))
+    tasks = [{"id": r.id, "task_name": r.task_name, "category": r.category, "status": r.status} for r in rows]
+    return {"day": db.from_day(day).isoformat(), "tasks": tasks}
+
+
+def _set_task_status(req: Request) -> Dict:
+    task_name, category, status = _require(req.body, "task_name", "category", "status")
+    task_name, category = _text(task_name, "task_name"), _text(category, "category")
+    day = _day(req.body.get("day"))
+    status = _flag(status, "status")
+    db.set_task_status(day, task_name, category, status, user_id=req.user_id)
+    return {"day": db.from_day(day).isoformat(), "task_name": task_name, "status": status}
+
+
+def _get_habits(req: Request) -> Dict:
+    day = _day(req.query.get("day"))
+    rows = recurrence.day_habits(req.user_id, day)
+    return {"day": db.from_day(day).isoformat(), "habits": [{"habit": r.habit, "status": r.status} for r in rows]}
+
+
+def _set_habit_status(req: Request) -> Dict:
+    habit, status = _require(req.body, "habit", "status")
+    habit = _text(habit, "habit")
+    day = _day(req.body.get("day"))
+    status = _flag(status, "status")
+    db.set_habit_status(day, habit, status, user_id=req.user_id)
+    return {"day": db.from_day(day).isoformat(), "habit": habit, "status": status}
+
+
+def _add_finance(req: Request) -> Dict:
+    category, amount = _require(req.body, "category", "amount")
+    category = _text(category, "category")
+    if category.split(":", 1)[0] not in FINANCE_KINDS or ":" not in category:
+        raise ApiError(400, "category must start with " + ", ".join(f"{k}:" for k in FINANCE_KINDS))
+    # bool is an int to Python; float("nan") and float("inf") would poison the ledger totals
+    if type(amount) not in (int, float) or not math.isfinite(amount) or amount <= 0:
+        raise ApiError(400, "amount must be a positive number")
+    amount = float(amount)
+    note = req.body.get("note", "")
+    if not isinstance(note, str):
+        raise ApiError(400, "note must be a string")
+    day = _day(req.body.get("day"))
+    db.add_finance_entry(day, category, amount, note, user_id=req.user_id)
+    return {"day": db.from_day(day).isoformat(), "category": category, "amount": amount}
+
+
+# Timers live in the active_sessions journal (modules/focus_timer.py), shared with the app
+
+def _get_timer(req: Request) -> Dict:
+    return focus_timer.status(req.user_id)
+
+
+def _start_timer(req: Request) -> Dict:
+    subject = str(req.body.get("subject") or "General")
+    duration = int(req.body.get("duration_minutes") or focus_timer.DEFAULT_DURATION_MINUTES)
+    if duration <= 0:
+        raise ApiError(400, "duration_minutes must be positive")
+    if focus_timer.start(subject, duration, user_id=req.user_id) is None:
+        raise ApiError(409, "a timer is already running")
+    return _get_timer(req)
+
+
+def _pause_timer(req: Request) -> Dict:
+    if focus_timer.pause(user_id=req.user_id) is None:
+        raise ApiError(409, "no running timer to pause")
+    return _get_timer(req)
+
+
+def _resume_timer(req: Request) -> Dict:
+    if focus_timer.resume(user_id=req.user_id) is None:
+        raise ApiError(409, "no paused timer to resume")
+    return _get_timer(req)
+
+
+def _finish_timer(req: Request) -> Dict:
+    recorded = focus_timer.stop(_flag(req.body.get("completed", True), "completed"), user_id=req.user_id)
+    if recorded is None:
+        raise ApiError(409, "no timer is running")
+    return {"subject": recorded.subject, "duration_minutes": recorded.duration_minutes,
+            "completed": bool(recorded.completed)}
+
+
+ROUTES: Dict[Tuple[str, str], Callable[[Request], Dict]] = {
+    ("GET", "/health"): _health,
+    ("GET", "/tasks"): _get_tasks,
+    ("POST", "/tasks/status"): _set_task_status,
+    ("GET", "/habits"): _get_habits,
+    ("POST", "/habits/status"): _set_habit_status,
+    ("POST", "/finance"): _add_finance,
+    ("GET", "/timer"): _get_timer,
+    ("POST", "/timer/start"): _start_timer,
+    ("POST", "/timer/pause"): _pause_timer,
+    ("POST", "/timer/resume"): _resume_timer,
+    ("POST", "/timer/finish"): _finish_timer,
+}
+# Routes that add a row answer 201; the rest update or read and answer 200
+CREATING_ROUTES = {("POST", "/finance"), ("POST", "/timer/start")}
+
+
+# --- HTTP ---
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str], bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise ApiError(400, "malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = headers.get("content-length") or "0"
+    if not length.isdigit():
+        raise ApiError(400, "invalid Content-Length")
+    length = int(length)
+    if length > MAX_BODY_BYTES:
+        raise ApiError(413, "body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _response(status: int, payload: Dict, keep_alive: bool) -> bytes:
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+        "Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+class ApiServer:
+    def __init__(self, workers: int = API_WORKERS):
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="life-os-api")
+
+    async def _dispatch(self, method: str, target: str, headers: Dict[str, str], raw: bytes) -> Tuple[int, Dict]:
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        handler = ROUTES.get((method, url.path))
+        if handler is None:
+            known = any(path == url.path for _, path in ROUTES)
+            raise ApiError(405 if known else 404, f"{method} {url.path} not supported")
+        try:
+            user_id = _authenticate(headers, query)
+            body = json.loads(raw) if raw else {}
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        if not isinstance(body, dict):
+            raise ApiError(400, "body must be a JSON object")
+        req = Request(method, url.path, query, body, user_id)
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, handler, req)
+        except (ValueError, TypeError) as e:
+            raise ApiError(400, str(e))
+        return (201 if (method, url.path) in CREATING_ROUTES else 200), result
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                keep_alive = True
+                request = None
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, raw = request
+                    keep_alive = headers.get("connection", "").lower() != "close"
+                    status, payload = await self._dispatch(method, target, headers, raw)
+                except ApiError as e:
+                    status, payload = e.status, {"error": str(e)}
+                    # Rejected while reading the request: the rest of the stream cannot be trusted
+                    keep_alive = keep_alive and request is not None
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    status, payload = 500, {"error": type(e).__name__}
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = API_HOST, port: int = API_PORT) -> asyncio.base_events.Server:
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def serve(host: str = API_HOST, port: int = API_PORT) -> None:
+    server = await ApiServer().start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Life OS API on http://{address[0]}:{address[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+_thread: Optional[threading.Thread] = None
+_thread_lock = threading.Lock()
+
+
+def start_in_background(host: str = API_HOST, port: int = API_PORT) -> None:
+    """Serve from a daemon thread of the current process; later calls are no-ops."""
+    global _thread
+    with _thread_lock:
+        if _thread is None:
+            _thread = threading.Thread(target=asyncio.run, args=(serve(host, port),), name="life-os-api", daemon=True)
+            _thread.start()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Life OS JSON API")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT or 8600)
+    db.add_arguments(parser)
+    args = parser.parse_args()
+    db.configure_from_args(args)
+    db.init_db()
+    focus_timer.recover_once()
+    metrics.start_exporter()
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
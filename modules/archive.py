@@ -0,0 +1,244 @@
+"""Tiered archival of closed years into per-year SQLite files.
+
+Rows of tasks, habits and timer_sessions for a closed year are copied into
+data/archive/life_os_<year>.db, summarised into archive_rollups and deleted
+from the hot tables. Reads of archived days ATTACH the year file read-only
+(see database._attach_archive). Streaks that reach back across the cutoff
+continue from the rollups' tail_streak.
+
+Usage:
+
+    python -m modules.archive archive [--before-year 2026]
+    python -m modules.archive maintain
+"""
+import argparse
+import sqlite3
+from datetime import date
+from typing import Dict, List, Optional
+
+from modules import database as db
+from modules import history, recurrence
+
+# Indexes created in each archive file; yearly files are small, one per access path is enough
+ARCHIVE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS arch.idx_tasks_user_day ON tasks (user_id, day, category)",
+    "CREATE INDEX IF NOT EXISTS arch.idx_habits_user_day ON habits (user_id, day, habit)",
+    "CREATE INDEX IF NOT EXISTS arch.idx_timer_user_day ON timer_sessions (user_id, day)",
+]
+
+# Completed-day run ending on `last`, per group, using the same day + rank trick as the live streaks
+_TAIL_SQL = """
+    WITH d AS (SELECT DISTINCT {group}, day FROM {table} WHERE {done} AND day BETWEEN ? AND ?),
+    r AS (SELECT {group}, day + ROW_NUMBER() OVER (PARTITION BY {group} ORDER BY day DESC) AS run FROM d)
+    SELECT {group}, COUNT(*) FROM r WHERE run = ? GROUP BY {group}
+"""
+
+
+def _year_bounds(year: int) -> tuple:
+    return db.to_day(date(year, 1, 1)), db.to_day(date(year, 12, 31))
+
+
+def _earliest_hot_day(cur: sqlite3.Cursor) -> Optional[int]:
+    days = [cur.execute(f"SELECT MIN(day) FROM {t}").fetchone()[0] for t in db.ARCHIVED_TABLES]
+    days = [d for d in days if d is not None]
+    return min(days) if days else None
+
+
+def _write_rollups(cur: sqlite3.Cursor, year: int, first: int, last: int) -> None:
+    cur.execute(
+        """
+        INSERT OR REPLACE INTO archive_rollups (user_id, kind, key, year, done, total, minutes, tail_streak)
+        SELECT user_id, 'habit', habit, ?, COUNT(DISTINCT CASE WHEN status=1 THEN day END), COUNT(DISTINCT day), 0, 0
+        FROM habits WHERE day BETWEEN ? AND ? GROUP BY user_id, habit
+        """,
+        (year, first, last),
+    )
+    cur.execute(
+        """
+        INSERT OR REPLACE INTO archive_rollups (user_id, kind, key, year, done, total, minutes, tail_streak)
+        SELECT user_id, 'focus', '', ?, COUNT(DISTINCT CASE WHEN completed=1 THEN day END), COUNT(*),
+               COALESCE(SUM(duration_minutes), 0), 0
+        FROM timer_sessions WHERE day BETWEEN ? AND ? GROUP BY user_id
+        """,
+        (year, first, last),
+    )
+    cur.execute(
+        """
+        INSERT OR REPLACE INTO archive_rollups (user_id, kind, key, year, done, total, minutes, tail_streak)
+        SELECT user_id, 'tasks', '', ?, COALESCE(SUM(status), 0), COUNT(*), 0, 0
+        FROM tasks WHERE day BETWEEN ? AND ? GROUP BY user_id
+        """,
+        (year, first, last),
+    )
+
+    # Recurring habits were due on days that have no row; count those too
+    due: Dict[tuple, int] = {}
+    for row in cur.execute("SELECT * FROM recurring_rules WHERE kind='habit'").fetchall():
+        rule = db.RecurringRule(*row)
+        key = (rule.user_id, rule.name)
+        due[key] = due.get(key, 0) + recurrence.occurrence_count(rule, first, last)
+    for (user_id, habit), days in due.items():
+        if days:
+            cur.execute(
+                "INSERT INTO archive_rollups (user_id, kind, key, year, done, total, minutes, tail_streak) "
+                "VALUES (?, 'habit', ?, ?, 0, ?, 0, 0) "
+                "ON CONFLICT(user_id, kind, key, year) DO UPDATE SET total = MAX(total, excluded.total)",
+                (user_id, habit, year, days),
+            )
+
+    days_in_year = last - first + 1
+    tails = [
+        ("habit", row[0], row[1], row[2])
+        for row in cur.execute(
+            _TAIL_SQL.format(group="user_id, habit", table="habits", done="status=1"), (first, last, last + 1)
+        ).fetchall()
+    ]
+    tails += [
+        ("focus", row[0], "", row[1])
+        for row in cur.execute(
+            _TAIL_SQL.format(group="user_id", table="timer_sessions", done="completed=1"), (first, last, last + 1)
+        ).fetchall()
+    ]
+    for kind, user_id, key, tail in tails:
+        if tail == days_in_year:
+            # Completed every day of the year: the run keeps going into the previous year
+            prev = cur.execute(
+                "SELECT tail_streak FROM archive_rollups WHERE user_id=? AND kind=? AND key=? AND year=?",
+                (user_id, kind, key, year - 1),
+            ).fetchone()
+            tail += prev[0] if prev else 0
+        cur.execute(
+            "UPDATE archive_rollups SET tail_streak=? WHERE user_id=? AND kind=? AND key=? AND year=?",
+            (tail, user_id, kind, key, year),
+        )
+
+
+def archive_year(year: int) -> Dict[str, int]:
+    """Move one closed year out of the hot tables. Years must be archived oldest first."""
+    if year >= date.today().year:
+        raise ValueError(f"{year} is not a closed year")
+    first, last = _year_bounds(year)
+    path = db.archive_path(year)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    conn = db.get_conn()
+    cur = conn.cursor()
+    earliest = _earliest_hot_day(cur)
+    if earliest is not None and earliest < first:
+        conn.close()
+        raise ValueError(f"Archive {db.from_day(earliest).year} before {year}")
+
+    moved = {}
+    cur.execute("ATTACH DATABASE ? AS arch", (str(path),))
+    cur.execute("BEGIN")
+    # Moving rows out is not a change to sync; keep the deletes out of the change log
+    cur.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('suspended', '1')")
+    for table in db.ARCHIVED_TABLES:
+        cur.execute(db.TABLES[table].replace("IF NOT EXISTS ", "IF NOT EXISTS arch.", 1))
+        columns = ", ".join(r[1] for r in cur.execute(f"PRAGMA arch.table_info({table})"))
+        cur.execute(
+            f"INSERT OR IGNORE INTO arch.{table} ({columns}) SELECT {columns} FROM main.{table} WHERE day BETWEEN ? AND ?",
+            (first, last),
+        )
+    for ddl in ARCHIVE_INDEXES:
+        cur.execute(ddl)
+    _write_rollups(cur, year, first, last)
+    db.archive_streaks(cur, year, first, last)
+    for table in db.ARCHIVED_TABLES:
+        cur.execute(f"DELETE FROM main.{table} WHERE day BETWEEN ? AND ?", (first, last))
+        moved[table] = cur.rowcount
+    cur.execute(
+        "INSERT INTO archive_state (id, cutoff_day) VALUES (1, ?) "
+        "ON CONFLICT(id) DO UPDATE SET cutoff_day = MAX(cutoff_day, excluded.cutoff_day)",
+        (last + 1,),
+    )
+    # Peers skip changes to archived days, so their log entries can go too. A timer session's day is in
+    # its data; deletes logged before they carried it take the day from the session's latest other entry
+    cur.execute(
+        "DELETE FROM change_log WHERE tbl IN ('tasks', 'habits', 'timer_sessions') AND "
+        "(CASE tbl WHEN 'timer_sessions' THEN COALESCE(json_extract(data, '$.day'), "
+        "(SELECT json_extract(e.data, '$.day') FROM change_log e WHERE e.tbl = 'timer_sessions' "
+        "AND e.row_key = change_log.row_key AND e.data IS NOT NULL ORDER BY e.seq DESC LIMIT 1)) "
+        "ELSE json_extract(row_key, '$[1]') END) BETWEEN ? AND ?",
+        (first, last),
+    )
+    cur.execute("DELETE FROM sync_state WHERE key='suspended'")
+    conn.commit()
+    cur.execute("DETACH DATABASE arch")
+    conn.close()
+
+    # Year files are written once, so compact them right away
+    arch = sqlite3.connect(path)
+    arch.execute("ANALYZE")
+    arch.execute("VACUUM")
+    arch.close()
+
+    db.set_archive_cutoff(max(db.get_archive_cutoff() or 0, last + 1))
+    return moved
+
+
+def archive_closed_years(before_year: Optional[int] = None) -> Dict[int, Dict[str, int]]:
+    """Archive every year with hot rows older than `before_year` (default: the current year)."""
+    before_year = before_year or date.today().year
+    conn = db.get_conn()
+    earliest = _earliest_hot_day(conn.cursor())
+    conn.close()
+    if earliest is None:
+        return {}
+    return {year: archive_year(year) for year in range(db.from_day(earliest).year, before_year)}
+
+
+def _size(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA page_count").fetchone()[0] * conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def run_maintenance() -> Dict[str, int]:
+    """Snapshot the event log, ANALYZE and VACUUM the hot database; returns the snapshots taken and
+    its size in bytes before and after."""
+    snapshots = history.snapshot_all()
+    conn = db.get_conn()
+    before = _size(conn)
+    conn.execute("ANALYZE")
+    conn.execute("PRAGMA optimize")
+    conn.execute("VACUUM")
+    after = _size(conn)
+    conn.close()
+    return {"snapshots": snapshots, "before": before, "after": after}
+
+
+def get_rollups(user_id: str = db.DEFAULT_USER, kind: Optional[str] = None) -> List[sqlite3.Row]:
+    conn = db.get_conn()
+    cur = conn.cursor()
+    if kind:
+        cur.execute(
+            "SELECT * FROM archive_rollups WHERE user_id=? AND kind=? ORDER BY year ASC, key ASC",
+            (user_id, kind),
+        )
+    else:
+        cur.execute("SELECT * FROM archive_rollups WHERE user_id=? ORDER BY year ASC, kind ASC, key ASC", (user_id,))
+    rows = cur.fetchall()
+    conn.close()
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Archive closed years and maintain the hot database")
+    sub = parser.add_subparsers(dest="command", required=True)
+    archive_cmd = sub.add_parser("archive", help="move closed years into data/archive/")
+    archive_cmd.add_argument("--before-year", type=int, default=None)
+    sub.add_parser("maintain", help="snapshot the event log, ANALYZE and VACUUM the hot database")
+    db.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    db.configure_from_args(args)
+    db.init_db()
+    if args.command == "archive":
+        for year, moved in archive_closed_years(args.before_year).items():
+            print(f"{year}: " + ", ".join(f"{n} {table}" for table, n in moved.items()))
+    sizes = run_maintenance()
+    print(f"status snapshots: {sizes['snapshots']}")
+    print(f"hot database: {sizes['before']:,} -> {sizes['after']:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
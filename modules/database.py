@@ -1,78 +1,1518 @@
+import argparse
+import json
+import os
+import re
 import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict
+from typing import Any, Callable, Iterable, Iterator, List, NamedTuple, Sequence, Tuple, Optional, Dict, Union
 
-DB_PATH = Path(__file__).resolve().parent.parent / "data" / "life_os.db"
-DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+import numpy as np
+
+from modules import metrics
+
+# Owner of rows written before multi-user support, and of single-user deployments
+DEFAULT_USER = "default"
+USER_ID_PATTERN = re.compile(r"^(?!\.+$)[A-Za-z0-9_.@-]{1,64}$")
+# Act as whichever user a client names (?user= in the app, X-User in the API) without authenticating it.
+# For trusted local setups such as the benchmarks; otherwise the user comes from a login or an API token
+TRUST_CLIENT_USER = os.environ.get("LIFE_OS_TRUST_CLIENT_USER", "0") == "1"
+
+
+# --- Configuration ---
+# Where the database lives and the PRAGMAs every connection runs. Defaults come
+# from LIFE_OS_DB and LIFE_OS_PRAGMAS ("journal_mode=WAL,synchronous=NORMAL");
+# configure() overrides them for the process, and the command-line tools call
+# it for --db / --pragma. LIFE_OS_DB=:memory: keeps everything in one
+# shared-cache in-memory database that lives as long as the process. Nothing
+# touches the filesystem until the first connection.
+
+MEMORY = ":memory:"
+MEMORY_URI = "file::memory:?cache=shared"
+DEFAULT_DB_PATH = Path(__file__).resolve().parent.parent / "data" / "life_os.db"
+_PRAGMA_PATTERN = re.compile(r"^([a-z_]+)=([A-Za-z0-9_-]+)$")
+
+
+def parse_pragmas(spec: Union[str, Sequence[str], None]) -> Dict[str, str]:
+    """{"journal_mode": "WAL", ...} from "name=value,name=value" or a list of "name=value"."""
+    items = spec.split(",") if isinstance(spec, str) else (spec or [])
+    pragmas = {}
+    for item in (i.strip() for i in items):
+        if not item:
+            continue
+        match = _PRAGMA_PATTERN.match(item)
+        if match is None:
+            raise ValueError(f"Invalid PRAGMA {item!r}; expected name=value")
+        pragmas[match.group(1)] = match.group(2)
+    return pragmas
+
+
+DB_PATH = Path(os.environ.get("LIFE_OS_DB") or DEFAULT_DB_PATH)
+PRAGMAS: Dict[str, str] = parse_pragmas(os.environ.get("LIFE_OS_PRAGMAS"))
+
+_config_lock = threading.Lock()
+_prepared: Optional[Path] = None
+# Holds the in-memory database open between connections; SQLite frees it with its last connection
+_memory_anchor: Optional[sqlite3.Connection] = None
+
+
+def configure(path: Union[str, Path, None] = None, pragmas: Union[str, Sequence[str], Dict[str, str], None] = None) -> None:
+    """Point this process at another database (a file path or MEMORY) and/or replace the PRAGMAs.
+    Arguments left as None keep their current value."""
+    global DB_PATH, PRAGMAS
+    with _config_lock:
+        if path is not None:
+            DB_PATH = Path(path)
+        if pragmas is not None:
+            PRAGMAS = dict(pragmas) if isinstance(pragmas, dict) else parse_pragmas(pragmas)
+
+
+def is_memory() -> bool:
+    return str(DB_PATH) == MEMORY
+
+
+def add_arguments(parser: Any) -> None:
+    """--db and --pragma for an argparse parser; pass the parsed namespace to configure_from_args()."""
+    parser.add_argument("--db", default=None,
+                        help=f"database file, or {MEMORY} for an in-memory one (default: $LIFE_OS_DB or data/life_os.db)")
+    parser.add_argument("--pragma", action="append", default=None, metavar="NAME=VALUE",
+                        help="PRAGMA run on every connection; repeatable (default: $LIFE_OS_PRAGMAS)")
+
+
+def configure_from_args(args: Any) -> None:
+    configure(args.db, args.pragma)
+
+
+def _prepare() -> None:
+    """First-connection setup for the configured database: create its directory, or open the
+    connection that keeps an in-memory database alive."""
+    global _prepared, _memory_anchor
+    path = Path(DB_PATH)
+    if _prepared == path:
+        return
+    with _config_lock:
+        if _prepared == path:
+            return
+        if str(path) == MEMORY:
+            if _memory_anchor is None:
+                _memory_anchor = sqlite3.connect(MEMORY_URI, uri=True, check_same_thread=False)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        _prepared = path
+
+
+# --- Metrics ---
+# With metrics.ENABLED every connection is a _MeteredConnection: each statement
+# is counted and timed by its first keyword (for a SELECT, up to its first row),
+# whether run through the connection or one of its cursors, and so are commit()
+# and rollback().
+
+QUERY_SECONDS = metrics.histogram(
+    "life_os_db_query_seconds", "SQLite statements by kind and time to execute (a SELECT up to its first row)",
+    ("op",), buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0))
+CONNECTIONS_OPENED = metrics.counter(
+    "life_os_db_connections_opened_total", "SQLite connections opened, read-write or read-only", ("mode",))
+_QUERY_OPS = {op: QUERY_SECONDS.labels(op.lower()) for op in
+              ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA", "CREATE",
+               "ATTACH", "DETACH")}
+_QUERY_OTHER = QUERY_SECONDS.labels("other")
+_OPENED = {False: CONNECTIONS_OPENED.labels("write"), True: CONNECTIONS_OPENED.labels("read")}
+
+
+# Statement text -> its series, so the common statements skip parsing the keyword
+_query_children: Dict[str, Any] = {}
+
+
+def _observe_query(sql: str, started: float) -> None:
+    elapsed = time.perf_counter() - started
+    child = _query_children.get(sql)
+    if child is None:
+        words = sql.split(None, 1)
+        child = _QUERY_OPS.get(words[0].upper(), _QUERY_OTHER) if words else _QUERY_OTHER
+        if len(_query_children) < 1024:
+            _query_children[sql] = child
+    QUERY_SECONDS.observe(elapsed, child)
+
+
+class _MeteredCursor(sqlite3.Cursor):
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _observe_query(sql, started)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _observe_query(sql, started)
+
+    def executescript(self, sql_script: str) -> sqlite3.Cursor:
+        started = time.perf_counter()
+        try:
+            return super().executescript(sql_script)
+        finally:
+            _observe_query(sql_script, started)
+
+
+class _MeteredConnection(sqlite3.Connection):
+    # sqlite3.Connection.execute() runs its statement on the cursor's C method, bypassing _MeteredCursor;
+    # these time it themselves and hand back a _MeteredCursor for what the caller runs on it next
+    def cursor(self, factory: type = _MeteredCursor) -> sqlite3.Cursor:
+        return super().cursor(factory)
+
+    def execute(self, sql: str, parameters: Any = ()) -> sqlite3.Cursor:
+        cursor = _MeteredCursor(self)
+        # Set by Connection.cursor(), which this skips
+        cursor.row_factory = self.row_factory
+        started = time.perf_counter()
+        try:
+            return sqlite3.Cursor.execute(cursor, sql, parameters)
+        finally:
+            _observe_query(sql, started)
+
+    def executemany(self, sql: str, seq_of_parameters: Iterable[Any]) -> sqlite3.Cursor:
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def executescript(self, sql_script: str) -> sqlite3.Cursor:
+        return self.cursor().executescript(sql_script)
+
+    def commit(self) -> None:
+        started = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            _observe_query("COMMIT", started)
+
+    def rollback(self) -> None:
+        started = time.perf_counter()
+        try:
+            super().rollback()
+        finally:
+            _observe_query("ROLLBACK", started)
+
+
+def _connect(read_only: bool = False, factory: type = sqlite3.Connection) -> sqlite3.Connection:
+    _prepare()
+    if metrics.ENABLED:
+        _OPENED[read_only].inc()
+        if factory is sqlite3.Connection:
+            factory = _MeteredConnection
+        elif factory is _ReaderConnection:
+            factory = _MeteredReaderConnection
+    if is_memory():
+        conn = sqlite3.connect(MEMORY_URI, uri=True, factory=factory)
+        if read_only:
+            # Shared-cache readers take no table locks, so they never fail against a writer
+            conn.execute("PRAGMA query_only=1")
+            conn.execute("PRAGMA read_uncommitted=1")
+    else:
+        # Opened as a URI so yearly archives can be ATTACHed with mode=ro
+        uri = Path(DB_PATH).resolve().as_uri() + ("?mode=ro" if read_only else "")
+        conn = sqlite3.connect(uri, uri=True, factory=factory)
+    for name, value in PRAGMAS.items():
+        if read_only and name == "journal_mode":
+            continue
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
 
 
 # --- Connection helpers ---
 
 def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+    if getattr(_reader, "active", False):
+        return _borrow_reader_conn()
+    conn = _connect()
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def init_db() -> None:
+# --- Concurrent reads ---
+# fetch_many() runs independent getters at the same time on a small pool of
+# worker threads. Each worker keeps one read-only connection open; while a
+# getter runs there, get_conn() lends it that connection, and close() only
+# resets it (ends any open read, detaches archives) once the last borrower is done.
+
+READ_WORKERS = int(os.environ.get("LIFE_OS_READ_WORKERS", "4"))
+
+
+class _ReaderConnection(sqlite3.Connection):
+    borrowed = 0
+
+    def close(self) -> None:
+        self.borrowed -= 1
+        if self.borrowed > 0:
+            return
+        if self.in_transaction:
+            self.rollback()
+        for row in super().execute("PRAGMA database_list").fetchall():
+            if row[1] not in ("main", "temp"):
+                super().execute(f"DETACH DATABASE {row[1]}")
+
+    def dispose(self) -> None:
+        sqlite3.Connection.close(self)
+
+
+class _MeteredReaderConnection(_ReaderConnection, _MeteredConnection):
+    pass
+
+
+_reader = threading.local()
+_read_executor: Optional[ThreadPoolExecutor] = None
+_read_executor_lock = threading.Lock()
+
+
+def _borrow_reader_conn() -> sqlite3.Connection:
+    config = (Path(DB_PATH).resolve() if not is_memory() else MEMORY, tuple(PRAGMAS.items()), metrics.ENABLED)
+    conn = getattr(_reader, "conn", None)
+    if conn is None or _reader.config != config:
+        if conn is not None:
+            conn.dispose()
+        conn = _connect(read_only=True, factory=_ReaderConnection)
+        _reader.conn, _reader.config = conn, config
+    conn.borrowed += 1
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def _run_as_reader(fn: Callable[[], Any]) -> Any:
+    _reader.active = True
+    try:
+        return fn()
+    finally:
+        _reader.active = False
+
+
+def fetch_many(calls: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+    """Run independent read-only getters concurrently and return {name: result}.
+
+    Each value is a zero-argument callable, e.g. partial(get_timer_stats, day, user_id=user_id),
+    that returns materialized rows (get_*, not the iter_* generators) and does not write.
+    The batch takes about as long as its slowest call; the first exception is re-raised.
+    """
+    global _read_executor
+    if len(calls) <= 1 or getattr(_reader, "active", False):
+        return {name: fn() for name, fn in calls.items()}
+    with _read_executor_lock:
+        if _read_executor is None:
+            _read_executor = ThreadPoolExecutor(max_workers=max(1, READ_WORKERS), thread_name_prefix="life-os-read")
+    futures = {name: _read_executor.submit(_run_as_reader, fn) for name, fn in calls.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
+# --- Yearly archives ---
+# Closed years of tasks, habits and timer_sessions can be moved out of the hot
+# tables into data/archive/life_os_<year>.db (see modules/archive.py). Reads for
+# a day before the archive cutoff ATTACH that year's file read-only on demand;
+# archived days are closed and no longer accept writes.
+
+ARCHIVED_TABLES = ("tasks", "habits", "timer_sessions")
+
+# First day still held by the hot tables; refreshed by init_db() and archival
+_archive_cutoff: Optional[int] = None
+
+
+def archive_path(year: int) -> Path:
+    if is_memory():
+        raise ValueError("An in-memory database has no yearly archives")
+    return Path(DB_PATH).parent / "archive" / f"life_os_{year}.db"
+
+
+def get_archive_cutoff() -> Optional[int]:
+    return _archive_cutoff
+
+
+def set_archive_cutoff(day: Optional[int]) -> None:
+    global _archive_cutoff
+    _archive_cutoff = day
+
+
+def is_archived(day: int) -> bool:
+    return _archive_cutoff is not None and day < _archive_cutoff
+
+
+def _check_open(day: int) -> None:
+    """Writers of ARCHIVED_TABLES call this: a hot row for an archived day would never be read."""
+    if is_archived(day):
+        raise ValueError(f"{from_day(day).isoformat()} is archived and read-only")
+
+
+def _archive_year(table: str, day: int) -> Optional[int]:
+    if _archive_cutoff is None or day >= _archive_cutoff or table not in ARCHIVED_TABLES:
+        return None
+    return from_day(day).year
+
+
+def _attach_archive(conn: sqlite3.Connection, year: int) -> Optional[str]:
+    """ATTACH a year's archive read-only; returns its schema name, or None if that year has no archive."""
+    path = archive_path(year)
+    if not path.exists():
+        return None
+    schema = f"archive_{year}"
+    if any(row[1] == schema for row in conn.execute("PRAGMA database_list")):
+        return schema
+    conn.execute(f"ATTACH DATABASE ? AS {schema}", (path.resolve().as_uri() + "?mode=ro",))
+    return schema
+
+
+def range_sources(conn: sqlite3.Connection, table: str, first: int, last: int) -> List[str]:
+    """Table names holding `table`'s rows for days first..last: the hot table plus each
+    archived year in range, ATTACHed on `conn`. UNION ALL them to read the whole range."""
+    sources = [table]
+    if _archive_cutoff is not None and first < _archive_cutoff and table in ARCHIVED_TABLES:
+        for year in range(from_day(first).year, from_day(min(last, _archive_cutoff - 1)).year + 1):
+            schema = _attach_archive(conn, year)
+            if schema:
+                sources.append(f"{schema}.{table}")
+    return sources
+
+
+def normalize_user_id(value: Optional[str]) -> str:
+    """Validate a user id taken from outside (URL, API request); blank means DEFAULT_USER."""
+    value = (value or "").strip()
+    if not value:
+        return DEFAULT_USER
+    if not USER_ID_PATTERN.match(value):
+        raise ValueError(f"Invalid user id: {value!r}")
+    return value
+
+
+# --- Day / timestamp adapters ---
+# Dates are stored as integer day numbers (days since 1970-01-01) and session
+# times as integer epoch seconds. Public functions accept ISO strings, date or
+# datetime objects and convert at the boundary, so every table holds exactly
+# one representation and lookups, ranges and gaps are plain integer arithmetic.
+
+DayLike = Union[str, date, datetime, int]
+TimestampLike = Union[datetime, float, int]
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def to_day(value: DayLike) -> int:
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.toordinal() - EPOCH_ORDINAL
+    if isinstance(value, int):
+        return value
+    return date.fromisoformat(value[:10]).toordinal() - EPOCH_ORDINAL
+
+
+def from_day(day: int) -> date:
+    return date.fromordinal(day + EPOCH_ORDINAL)
+
+
+def today_day() -> int:
+    return to_day(date.today())
+
+
+def to_epoch(value: TimestampLike) -> int:
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    return int(value)
+
+
+# --- Row types ---
+# Getters return these instead of sqlite3.Row: plain tuples with named fields and
+# no per-row dict. Passing `columns=` selects only those columns and returns a
+# narrower namedtuple with the same field names. The properties adapt stored
+# integers back to the strings the views display.
+
+class Task(NamedTuple):
+    id: int
+    day: int
+    task_name: str
+    category: str
+    status: int
+
+    @property
+    def date(self) -> str:
+        return from_day(self.day).isoformat()
+
+
+class FinanceEntry(NamedTuple):
+    id: int
+    day: int
+    category: str
+    amount: float
+    note: Optional[str]
+
+    @property
+    def date(self) -> str:
+        return from_day(self.day).isoformat()
+
+
+class Habit(NamedTuple):
+    id: int
+    day: int
+    habit: str
+    status: int
+
+    @property
+    def date(self) -> str:
+        return from_day(self.day).isoformat()
+
+
+class TimerSession(NamedTuple):
+    id: int
+    day: int
+    start_ts: int
+    end_ts: int
+    duration_minutes: int
+    completed: int
+    subject: str
+
+    @property
+    def date(self) -> str:
+        return from_day(self.day).isoformat()
+
+    @property
+    def start_time(self) -> str:
+        return datetime.fromtimestamp(self.start_ts).strftime("%H:%M")
+
+
+class ActiveSession(NamedTuple):
+    user_id: str
+    subject: str
+    duration_minutes: int
+    start_ts: float               # epoch seconds when the session was started
+    elapsed: float                # seconds run before the current stretch
+    resumed_ts: Optional[float]   # epoch / monotonic seconds when the current stretch began;
+    resumed_mono: Optional[float]  # both None while paused
+    clock: str                    # identifies the monotonic clock resumed_mono was read from
+    updated_ts: float             # epoch seconds of the last start / pause / resume
+
+    @property
+    def paused(self) -> bool:
+        return self.resumed_ts is None
+
+
+class RecurringRule(NamedTuple):
+    id: int
+    user_id: str
+    kind: str
+    name: str
+    category: str
+    freq: str
+    interval: int
+    start_day: int
+    until_day: Optional[int]
+
+
+class DayOverview(NamedTuple):
+    tasks_due: int
+    tasks_done: int
+    habits_due: int
+    habits_done: int
+    focus_minutes: int
+    focus_sessions: int
+    focus_completed: int
+    spent: float
+    earned: float
+    invested: float
+    focus_streak: int
+    best_habit_streak: int
+
+
+class Streak(NamedTuple):
+    key: str
+    current: int
+    longest: int
+    last_day: Optional[int]
+
+
+# The column each row property reads; projections only carry properties whose column they hold
+PROPERTY_SOURCES = {"date": "day", "start_time": "start_ts", "paused": "resumed_ts"}
+
+ROW_TYPES = {
+    "tasks": Task,
+    "finance": FinanceEntry,
+    "habits": Habit,
+    "timer_sessions": TimerSession,
+    "active_sessions": ActiveSession,
+    "recurring_rules": RecurringRule,
+}
+
+
+@lru_cache(maxsize=None)
+def row_type(table: str, columns: Optional[Tuple[str, ...]] = None) -> type:
+    """Row class for `table`, or a projection of it holding only `columns`."""
+    full = ROW_TYPES[table]
+    if columns is None or columns == full._fields:
+        return full
+    unknown = [c for c in columns if c not in full._fields]
+    if unknown:
+        raise ValueError(f"Unknown {table} columns: {', '.join(unknown)}")
+    base = namedtuple(f"{full.__name__}Row", columns)
+    adapters = {k: v for k, v in vars(full).items()
+                if isinstance(v, property) and k not in columns and PROPERTY_SOURCES.get(k) in columns}
+    return type(base.__name__, (base,), {"__slots__": (), **adapters})
+
+
+def _select(table: str, columns: Optional[Sequence[str]], where: str, order: str,
+            archive_year: Optional[int] = None) -> Tuple[type, str]:
+    cls = row_type(table, tuple(columns) if columns is not None else None)
+    source = f"archive_{archive_year}.{table}" if archive_year is not None else table
+    # Column names are validated by row_type, so they are safe to interpolate
+    sql = f"SELECT {', '.join(cls._fields)} FROM {source}{where} ORDER BY {order}"
+    return cls, sql
+
+
+def _open_for(archive_year: Optional[int]) -> Optional[sqlite3.Connection]:
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute(
-        """
+    conn.row_factory = None
+    if archive_year is not None and _attach_archive(conn, archive_year) is None:
+        conn.close()
+        return None
+    return conn
+
+
+def _fetch_rows(cls: type, sql: str, params: tuple, archive_year: Optional[int] = None) -> list:
+    conn = _open_for(archive_year)
+    if conn is None:
+        return []
+    try:
+        return list(map(cls._make, conn.execute(sql, params)))
+    finally:
+        conn.close()
+
+
+def _iter_rows(cls: type, sql: str, params: tuple, archive_year: Optional[int] = None) -> Iterator:
+    """Stream rows from the cursor; the connection stays open until the generator is exhausted or closed."""
+    conn = _open_for(archive_year)
+    if conn is None:
+        return
+    try:
+        for row in conn.execute(sql, params):
+            yield cls._make(row)
+    finally:
+        conn.close()
+
+
+# --- Schema ---
+# Every user-owned table leads with user_id, and so does every index on it, so
+# a user's queries only ever touch that user's slice of each B-tree.
+
+TABLES = {
+    "tasks": """
         CREATE TABLE IF NOT EXISTS tasks (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            day INTEGER NOT NULL,
             task_name TEXT NOT NULL,
             category TEXT NOT NULL,
             status INTEGER DEFAULT 0
         )
-        """
-    )
-    cur.execute(
-        """
+        """,
+    "finance": """
         CREATE TABLE IF NOT EXISTS finance (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            day INTEGER NOT NULL,
             category TEXT NOT NULL,
             amount REAL NOT NULL,
-            note TEXT
+            note TEXT,
+            sync_key TEXT
         )
-        """
-    )
-    cur.execute(
-        """
+        """,
+    "habits": """
         CREATE TABLE IF NOT EXISTS habits (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            day INTEGER NOT NULL,
             habit TEXT NOT NULL,
             status INTEGER DEFAULT 0
         )
-        """
-    )
-    cur.execute(
-        """
+        """,
+    "timer_sessions": """
         CREATE TABLE IF NOT EXISTS timer_sessions (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            date TEXT NOT NULL,
-            start_time TEXT NOT NULL,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            day INTEGER NOT NULL,
+            start_ts INTEGER NOT NULL,
+            end_ts INTEGER NOT NULL,
             duration_minutes INTEGER NOT NULL,
             completed INTEGER DEFAULT 0,
-            subject TEXT DEFAULT 'General'
+            subject TEXT DEFAULT 'General',
+            sync_key TEXT
+        )
+        """,
+    # Running focus timers (modules/focus_timer.py), one per user. Written only on start,
+    # pause, resume and stop; a stopped session moves to timer_sessions in the same
+    # transaction that deletes it here. Local to this database, like reminder_schedule.
+    "active_sessions": """
+        CREATE TABLE IF NOT EXISTS active_sessions (
+            user_id TEXT PRIMARY KEY,
+            subject TEXT NOT NULL DEFAULT 'General',
+            duration_minutes INTEGER NOT NULL,
+            start_ts REAL NOT NULL,
+            elapsed REAL NOT NULL DEFAULT 0,
+            resumed_ts REAL,
+            resumed_mono REAL,
+            clock TEXT NOT NULL DEFAULT '',
+            updated_ts REAL NOT NULL
+        )
+        """,
+    "reminder_schedule": """
+        CREATE TABLE IF NOT EXISTS reminder_schedule (
+            user_id TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            next_fire_ts INTEGER NOT NULL,
+            PRIMARY KEY (user_id, slot)
+        )
+        """,
+    "archive_state": """
+        CREATE TABLE IF NOT EXISTS archive_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            cutoff_day INTEGER NOT NULL
+        )
+        """,
+    # Per-year summaries of archived rows. kind is 'habit' (key = habit name),
+    # 'focus' or 'tasks' (key = ''); tail_streak is the run of completed days
+    # ending on Dec 31 of that year, chained through fully completed years.
+    "archive_rollups": """
+        CREATE TABLE IF NOT EXISTS archive_rollups (
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            year INTEGER NOT NULL,
+            done INTEGER NOT NULL DEFAULT 0,
+            total INTEGER NOT NULL DEFAULT 0,
+            minutes INTEGER NOT NULL DEFAULT 0,
+            tail_streak INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, kind, key, year)
+        )
+        """,
+    # Bumped by triggers whenever a user's finance rows are edited or deleted, so
+    # caches that only append new ids (modules/finance_cache.py) know to rebuild
+    "finance_version": """
+        CREATE TABLE IF NOT EXISTS finance_version (
+            user_id TEXT PRIMARY KEY,
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    # Recurring tasks and habits (modules/recurrence.py). Occurrences are expanded on
+    # demand; tasks/habits rows only exist where an occurrence's status was changed.
+    # kind: 'task' or 'habit'; freq: 'daily', 'weekdays' or 'every' (every `interval` days)
+    "recurring_rules": """
+        CREATE TABLE IF NOT EXISTS recurring_rules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT 'default',
+            kind TEXT NOT NULL,
+            name TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT '',
+            freq TEXT NOT NULL,
+            interval INTEGER NOT NULL DEFAULT 1,
+            start_day INTEGER NOT NULL,
+            until_day INTEGER,
+            UNIQUE (user_id, kind, category, name, start_day)
+        )
+        """,
+    # Streaks kept up to date by every status write, so reads are one lookup. kind is
+    # 'habit' (key = habit name) or 'focus' (key = ''); current is the run of completed
+    # days ending on last_day, the latest completed day. archived_longest is the longest
+    # run within archived years, which a recompute from the hot tables cannot see.
+    "streak_state": """
+        CREATE TABLE IF NOT EXISTS streak_state (
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            key TEXT NOT NULL,
+            current INTEGER NOT NULL DEFAULT 0,
+            longest INTEGER NOT NULL DEFAULT 0,
+            last_day INTEGER,
+            archived_longest INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, kind, key)
+        )
+        """,
+    # Event log (modules/history.py): every task / habit status change made through the
+    # set_*_status functions, appended in the transaction that makes it. An event is
+    # integers only; event_refs holds each (user, kind, category, name) once. grp is the
+    # seq of the first event of a multi-row write (NULL when the write changed one row),
+    # undoes the grp/seq of the write an undo or redo reverts.
+    "event_refs": """
+        CREATE TABLE IF NOT EXISTS event_refs (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT '',
+            name TEXT NOT NULL,
+            UNIQUE (user_id, kind, category, name)
+        )
+        """,
+    # No index besides seq: replay and undo read a range of recent seqs, and every index
+    # would be one more page written per status change.
+    "status_events": """
+        CREATE TABLE IF NOT EXISTS status_events (
+            seq INTEGER PRIMARY KEY,
+            ref INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            status INTEGER NOT NULL,
+            ts INTEGER NOT NULL,
+            grp INTEGER,
+            undoes INTEGER
+        )
+        """,
+    # A user's completed (ref, day) pairs as of event `seq`, packed by encode_state()
+    "status_snapshots": """
+        CREATE TABLE IF NOT EXISTS status_snapshots (
+            user_id TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            state BLOB NOT NULL,
+            PRIMARY KEY (user_id, seq)
+        )
+        """,
+    # Device sync (modules/sync.py): every change to the user tables, in order
+    "change_log": """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            tbl TEXT NOT NULL,
+            op TEXT NOT NULL,
+            row_key TEXT NOT NULL,
+            data TEXT,
+            origin TEXT NOT NULL,
+            ts INTEGER NOT NULL
+        )
+        """,
+    # 'device' = this database's id; 'peer:<device>' = last change_log seq applied from that
+    # peer; 'apply_origin'/'apply_ts'/'suspended' only exist inside sync and archive transactions
+    "sync_state": """
+        CREATE TABLE IF NOT EXISTS sync_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )
+        """,
+}
+
+USER_TABLES = ("tasks", "finance", "habits", "timer_sessions")
+
+CHANGE_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS finance_version_au AFTER UPDATE OF user_id, day, category, amount, note ON finance BEGIN
+        INSERT INTO finance_version (user_id, version) VALUES (old.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+        INSERT INTO finance_version (user_id, version) VALUES (new.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS finance_version_ad AFTER DELETE ON finance BEGIN
+        INSERT INTO finance_version (user_id, version) VALUES (old.user_id, 1)
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1;
+    END""",
+]
+
+# --- Change log ---
+# Triggers append every insert, status toggle, edit and delete on the user tables
+# to change_log, tagged with the device it came from and a millisecond timestamp.
+# tasks and habits rows are identified across devices by their natural key;
+# finance and timer_sessions rows have none, so each gets a sync_key of
+# "<device>:<local id>" when it is first inserted.
+
+SYNC_COLUMNS = {
+    "tasks": ("user_id", "day", "task_name", "category", "status"),
+    "habits": ("user_id", "day", "habit", "status"),
+    "finance": ("user_id", "day", "category", "amount", "note", "sync_key"),
+    "timer_sessions": ("user_id", "day", "start_ts", "end_ts", "duration_minutes", "completed", "subject", "sync_key"),
+}
+SYNC_NATURAL_KEYS = {
+    "tasks": ("user_id", "day", "task_name", "category"),
+    "habits": ("user_id", "day", "habit"),
+}
+
+_SYNC_DEVICE = "(SELECT value FROM sync_state WHERE key='device')"
+_SYNC_TS = "CAST((julianday('now') - 2440587.5) * 86400000 AS INTEGER)"
+# Who and when to record for a change: one row normally, none while logging is suspended.
+# The triggers read it instead of repeating the expressions, which keeps the schema every
+# new connection parses small.
+SYNC_CONTEXT_VIEW = f"""
+    CREATE VIEW IF NOT EXISTS sync_context AS
+    SELECT COALESCE((SELECT value FROM sync_state WHERE key='apply_origin'), {_SYNC_DEVICE}) AS origin,
+           COALESCE((SELECT CAST(value AS INTEGER) FROM sync_state WHERE key='apply_ts'), {_SYNC_TS}) AS ts
+    WHERE NOT EXISTS (SELECT 1 FROM sync_state WHERE key='suspended')
+    """
+
+
+def _sync_key_sql(table: str, ref: str) -> str:
+    if table in SYNC_NATURAL_KEYS:
+        return "json_array(" + ", ".join(f"{ref}.{c}" for c in SYNC_NATURAL_KEYS[table]) + ")"
+    return f"{ref}.sync_key"
+
+
+def _sync_data_sql(ref: str, columns: Sequence[str]) -> str:
+    return "json_object(" + ", ".join(f"'{c}', {ref}.{c}" for c in columns) + ")"
+
+
+def _sync_log_sql(table: str, op: str, ref: str, data: str, source: str = "") -> str:
+    return (f"INSERT INTO change_log (tbl, op, row_key, data, origin, ts) "
+            f"SELECT '{table}', '{op}', {_sync_key_sql(table, ref)}, {data}, c.origin, c.ts FROM sync_context c{source};")
+
+
+def _sync_triggers() -> List[str]:
+    triggers = []
+    for table, columns in SYNC_COLUMNS.items():
+        name = f"{table}_sync"
+        if table in SYNC_NATURAL_KEYS:
+            keys = ", ".join(SYNC_NATURAL_KEYS[table])
+            triggers += [
+                f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {table} BEGIN "
+                f"{_sync_log_sql(table, 'I', 'new', _sync_data_sql('new', columns))} END",
+                f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF status ON {table} "
+                f"WHEN old.status IS NOT new.status BEGIN "
+                f"{_sync_log_sql(table, 'U', 'new', _sync_data_sql('new', ('status',)))} END",
+                # A changed natural key is a different row as far as peers are concerned
+                f"CREATE TRIGGER IF NOT EXISTS {name}_ak AFTER UPDATE OF {keys} ON {table} BEGIN "
+                f"{_sync_log_sql(table, 'D', 'old', 'NULL')} "
+                f"{_sync_log_sql(table, 'I', 'new', _sync_data_sql('new', columns))} END",
+            ]
+        else:
+            edited = ", ".join(c for c in columns if c != "sync_key")
+            triggers += [
+                f"CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON {table} BEGIN "
+                f"UPDATE {table} SET sync_key = {_SYNC_DEVICE} || ':' || new.id WHERE id = new.id AND sync_key IS NULL; "
+                f"{_sync_log_sql(table, 'I', 'r', _sync_data_sql('r', columns), f', {table} r WHERE r.id = new.id')} END",
+                f"CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF {edited} ON {table} BEGIN "
+                f"{_sync_log_sql(table, 'U', 'new', _sync_data_sql('new', columns))} END",
+            ]
+        # A sync_key says nothing about the row, so those deletes keep its day for archival to go by
+        deleted = "NULL" if table in SYNC_NATURAL_KEYS else "json_object('day', old.day)"
+        triggers.append(
+            f"CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON {table} BEGIN "
+            f"{_sync_log_sql(table, 'D', 'old', deleted)} END"
+        )
+    return triggers
+
+
+SYNC_TRIGGERS = _sync_triggers()
+
+INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_tasks_user_day ON tasks (user_id, day, category)",
+    "CREATE INDEX IF NOT EXISTS idx_finance_user_day ON finance (user_id, day)",
+    # Lets get_finance_since() seek straight past the rows a cache already holds
+    "CREATE INDEX IF NOT EXISTS idx_finance_user_id ON finance (user_id, id)",
+    "CREATE INDEX IF NOT EXISTS idx_habits_user_day ON habits (user_id, day, habit)",
+    "CREATE INDEX IF NOT EXISTS idx_habits_user_habit_day ON habits (user_id, habit, day)",
+    "CREATE INDEX IF NOT EXISTS idx_timer_user_day ON timer_sessions (user_id, day)",
+    "CREATE INDEX IF NOT EXISTS idx_timer_user_start ON timer_sessions (user_id, start_ts)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_finance_sync_key ON finance (sync_key)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_timer_sync_key ON timer_sessions (sync_key)",
+    "CREATE INDEX IF NOT EXISTS idx_change_log_row ON change_log (tbl, row_key, seq)",
+]
+
+# Full-text indexes over task names and finance notes (searched by modules/search.py).
+# They are external-content FTS5 tables: the text lives only in tasks/finance and
+# the triggers below keep the index in step with every insert, update and delete.
+# user_id is indexed too, so a search intersects the term with the owner's
+# postings instead of ranking every user's matches and filtering afterwards.
+FTS_TABLES = {
+    "tasks_fts": """
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+            task_name, user_id, content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+    "finance_fts": """
+        CREATE VIRTUAL TABLE IF NOT EXISTS finance_fts USING fts5(
+            note, category, user_id, content='finance', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+        """,
+}
+
+FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts (rowid, task_name, user_id) VALUES (new.id, new.task_name, new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, task_name, user_id) VALUES ('delete', old.id, old.task_name, old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF task_name, user_id ON tasks BEGIN
+        INSERT INTO tasks_fts (tasks_fts, rowid, task_name, user_id) VALUES ('delete', old.id, old.task_name, old.user_id);
+        INSERT INTO tasks_fts (rowid, task_name, user_id) VALUES (new.id, new.task_name, new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS finance_fts_ai AFTER INSERT ON finance BEGIN
+        INSERT INTO finance_fts (rowid, note, category, user_id) VALUES (new.id, new.note, new.category, new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS finance_fts_ad AFTER DELETE ON finance BEGIN
+        INSERT INTO finance_fts (finance_fts, rowid, note, category, user_id) VALUES ('delete', old.id, old.note, old.category, old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS finance_fts_au AFTER UPDATE OF note, category, user_id ON finance BEGIN
+        INSERT INTO finance_fts (finance_fts, rowid, note, category, user_id) VALUES ('delete', old.id, old.note, old.category, old.user_id);
+        INSERT INTO finance_fts (rowid, note, category, user_id) VALUES (new.id, new.note, new.category, new.user_id);
+    END""",
+]
+
+# Single-tenant indexes superseded by the user-leading ones above
+DROPPED_INDEXES = [
+    "idx_tasks_day",
+    "idx_finance_day",
+    "idx_habits_day",
+    "idx_habits_habit_day",
+    "idx_timer_day",
+    "idx_timer_start",
+]
+
+# Copy statements for databases created before the integer-day migration.
+# Older rows hold ISO text dates and "HH:MM" local start times.
+_ISO_TO_DAY = "CAST(julianday(substr(date, 1, 10)) - 2440587.5 AS INTEGER)"
+_LEGACY_START_TS = "CAST(strftime('%s', substr(date, 1, 10) || ' ' || start_time, 'utc') AS INTEGER)"
+LEGACY_COPIES = {
+    "tasks": f"INSERT INTO tasks (id, day, task_name, category, status) "
+             f"SELECT id, {_ISO_TO_DAY}, task_name, category, status FROM legacy_tasks",
+    "finance": f"INSERT INTO finance (id, day, category, amount, note) "
+               f"SELECT id, {_ISO_TO_DAY}, category, amount, note FROM legacy_finance",
+    "habits": f"INSERT INTO habits (id, day, habit, status) "
+              f"SELECT id, {_ISO_TO_DAY}, habit, status FROM legacy_habits",
+    "timer_sessions": f"INSERT INTO timer_sessions (id, day, start_ts, end_ts, duration_minutes, completed, subject) "
+                      f"SELECT id, {_ISO_TO_DAY}, {_LEGACY_START_TS}, {_LEGACY_START_TS} + duration_minutes * 60, "
+                      f"duration_minutes, completed, subject FROM legacy_timer_sessions",
+}
+
+
+def _table_columns(cur: sqlite3.Cursor, table: str) -> List[str]:
+    return [r[1] for r in cur.execute(f"PRAGMA table_info({table})")]
+
+
+def _migrate_legacy_dates(cur: sqlite3.Cursor) -> None:
+    """Rewrite tables that still have a TEXT `date` column into the integer layout."""
+    for table, copy_sql in LEGACY_COPIES.items():
+        if "date" not in _table_columns(cur, table):
+            continue
+        cur.execute(f"ALTER TABLE {table} RENAME TO legacy_{table}")
+        cur.execute(TABLES[table])
+        cur.execute(copy_sql)
+        cur.execute(f"DROP TABLE legacy_{table}")
+
+
+def _migrate_single_user(cur: sqlite3.Cursor) -> None:
+    """Give pre-tenancy tables a user_id column; their rows belong to DEFAULT_USER."""
+    for table in USER_TABLES:
+        columns = _table_columns(cur, table)
+        if columns and "user_id" not in columns:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER}'")
+
+
+def _migrate_sync_keys(cur: sqlite3.Cursor) -> None:
+    for table in SYNC_COLUMNS:
+        columns = _table_columns(cur, table)
+        if columns and "sync_key" in SYNC_COLUMNS[table] and "sync_key" not in columns:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN sync_key TEXT")
+
+
+def _create_sync(cur: sqlite3.Cursor, fresh_log: bool) -> None:
+    cur.execute("INSERT OR IGNORE INTO sync_state (key, value) VALUES ('device', lower(hex(randomblob(8))))")
+    for table, columns in SYNC_COLUMNS.items():
+        if "sync_key" in columns:
+            cur.execute(f"UPDATE {table} SET sync_key = {_SYNC_DEVICE} || ':' || id WHERE sync_key IS NULL")
+        if fresh_log:
+            # Rows written before the log existed enter it once, as inserts, so a new peer gets them
+            cur.execute(
+                f"INSERT INTO change_log (tbl, op, row_key, data, origin, ts) "
+                f"SELECT '{table}', 'I', {_sync_key_sql(table, 'r')}, {_sync_data_sql('r', columns)}, "
+                f"{_SYNC_DEVICE}, {_SYNC_TS} FROM {table} r ORDER BY r.id"
+            )
+    cur.execute(SYNC_CONTEXT_VIEW)
+    # Replace triggers whose definition changed since they were created
+    stored = dict(cur.execute("SELECT name, sql FROM sqlite_master WHERE type='trigger'"))
+    for ddl in SYNC_TRIGGERS:
+        name = ddl.split()[5]
+        if name in stored and stored[name] != ddl.replace(" IF NOT EXISTS", "", 1):
+            cur.execute(f"DROP TRIGGER {name}")
+        cur.execute(ddl)
+
+
+def _create_fts(cur: sqlite3.Cursor) -> None:
+    existing = {r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    for name, ddl in FTS_TABLES.items():
+        cur.execute(ddl)
+        if name not in existing:
+            # Index rows written before the FTS table existed
+            cur.execute(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+    for ddl in FTS_TRIGGERS:
+        cur.execute(ddl)
+
+
+def init_db() -> None:
+    conn = get_conn()
+    cur = conn.cursor()
+    # IMMEDIATE: a deferred transaction that reads the schema and then writes cannot wait for another
+    # process doing the same (SQLite answers "database is locked" at once), so take the write lock first
+    cur.execute("BEGIN IMMEDIATE")
+    existing = {r[0] for r in cur.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    fresh_log = "change_log" not in existing
+    _migrate_legacy_dates(cur)
+    _migrate_single_user(cur)
+    _migrate_sync_keys(cur)
+    for ddl in TABLES.values():
+        cur.execute(ddl)
+    for name in DROPPED_INDEXES:
+        cur.execute(f"DROP INDEX IF EXISTS {name}")
+    for ddl in INDEXES:
+        cur.execute(ddl)
+    for ddl in CHANGE_TRIGGERS:
+        cur.execute(ddl)
+    _create_fts(cur)
+    _create_sync(cur, fresh_log)
+    if "status_events" not in existing:
+        _snapshot_genesis(cur)
+    conn.commit()
+    row = cur.execute("SELECT cutoff_day FROM archive_state WHERE id=1").fetchone()
+    set_archive_cutoff(row[0] if row else None)
+    conn.close()
+    if "streak_state" not in existing:
+        # Needs the archive cutoff, and ATTACHes archives, so it runs after the schema commit
+        rebuild_streaks()
+
+
+_initialized: set = set()
+_init_lock = threading.Lock()
+
+
+def init_db_once() -> None:
+    """init_db() the first time this process sees the configured database; after that only re-read
+    the archive cutoff, which archival in another process may have moved. For main.py's reruns."""
+    with _init_lock:
+        key = str(DB_PATH)
+        if key not in _initialized:
+            init_db()
+            _initialized.add(key)
+            return
+    conn = get_conn()
+    try:
+        row = conn.execute("SELECT cutoff_day FROM archive_state WHERE id=1").fetchone()
+    finally:
+        conn.close()
+    set_archive_cutoff(row[0] if row else None)
+
+
+# --- Changes made by other processes ---
+# The task and habit listeners hear about this process's writes as they commit.
+# catch_up() tells them about everyone else's (the sync CLI, a standalone API,
+# another server) by replaying the change_log entries past the last seq it saw,
+# and re-reads the archive cutoff. When nothing changed it is one small query,
+# so caches call it before serving.
+
+_seen_seq: Dict[str, int] = {}
+_catch_up_lock = threading.Lock()
+
+
+def catch_up() -> None:
+    key = str(DB_PATH)
+    with _catch_up_lock:
+        conn = get_conn()
+        try:
+            cutoff, last = conn.execute(
+                "SELECT (SELECT cutoff_day FROM archive_state WHERE id=1), (SELECT MAX(seq) FROM change_log)"
+            ).fetchone()
+            last = last or 0
+            seen = _seen_seq.setdefault(key, last)
+            # Filtered in Python: a condition on tbl would let the planner leave the seq range for idx_change_log_row
+            rows = [r for r in conn.execute(
+                "SELECT tbl, row_key, data FROM change_log WHERE seq > ? AND seq <= ? ORDER BY seq", (seen, last)
+            ) if r[0] in ("tasks", "habits")] if last > seen else []
+        finally:
+            conn.close()
+        set_archive_cutoff(cutoff)
+        _seen_seq[key] = last
+        for tbl, row_key, data in rows:
+            # Deletes carry no data: the row is gone, which reads as not done
+            status = bool(json.loads(data).get("status")) if data else False
+            if tbl == "tasks":
+                user_id, day, task_name, category = json.loads(row_key)
+                for listener in _task_listeners:
+                    listener(user_id, day, task_name, category, status)
+            else:
+                user_id, day, habit = json.loads(row_key)
+                for listener in _habit_listeners:
+                    listener(user_id, day, habit, status)
+
+
+def get_archived_tail(kind: str, key: str, user_id: str = DEFAULT_USER) -> int:
+    """Completed-day run ending on the last archived day, from the rollups."""
+    if _archive_cutoff is None:
+        return 0
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT tail_streak FROM archive_rollups WHERE user_id=? AND kind=? AND key=? AND year=?",
+        (user_id, kind, key, from_day(_archive_cutoff - 1).year),
+    )
+    row = cur.fetchone()
+    conn.close()
+    return row[0] if row else 0
+
+
+# --- Streaks ---
+# streak_state is updated inside the transaction of each write that completes or
+# un-completes a day. Writes at or after a key's last_day (the normal case:
+# ticking today) are O(1) on the stored row; edits further back recompute that
+# one key from its runs in the hot tables plus the archived tail. To repair the
+# table from the stored days:
+#
+#     python -m modules.database rebuild-streaks [--user ID]
+
+# What makes a day count, per streak kind: (table, key column, condition)
+STREAK_SOURCES = {
+    "habit": ("habits", "habit", "status=1"),
+    "focus": ("timer_sessions", "''", "completed=1"),
+}
+
+# Runs of consecutive completed days: consecutive days share one value of day - rank
+_RUNS_SQL = """
+    WITH d AS ({days}),
+    g AS (SELECT user_id, key, day, day - ROW_NUMBER() OVER (PARTITION BY user_id, key ORDER BY day) AS grp FROM d)
+    SELECT user_id, key, MIN(day), COUNT(*) FROM g GROUP BY user_id, key, grp ORDER BY user_id, key, 3
+"""
+
+
+def _runs_sql(kind: str, sources: Sequence[str], where: str) -> str:
+    _table, key, done = STREAK_SOURCES[kind]
+    # DISTINCT and UNION, not UNION ALL: several rows (or sessions) on one day count once
+    return _RUNS_SQL.format(days=" UNION ".join(
+        f"SELECT DISTINCT user_id, {key} AS key, day FROM {source} WHERE {done}{where}" for source in sources
+    ))
+
+
+def _fold_runs(runs: Sequence[Tuple[int, int]], cutoff: Optional[int], tail: int = 0,
+               archived_longest: int = 0) -> Tuple[int, int, Optional[int], int]:
+    """(current, longest, last_day, archived_longest) from (first day, length) runs in day order.
+    `tail` is the archived run ending the day before `cutoff`, which the first hot run continues."""
+    current, last_day, longest = tail, (cutoff - 1 if tail else None), max(archived_longest, tail)
+    for first, n in runs:
+        end = first + n - 1
+        if cutoff is not None and first < cutoff:
+            archived_longest = max(archived_longest, min(end, cutoff - 1) - first + 1)
+        if last_day is not None and first == last_day + 1:
+            n += current
+        current, last_day = n, end
+        longest = max(longest, n)
+    return current, max(longest, archived_longest), last_day, archived_longest
+
+
+def _save_streak(cur: sqlite3.Cursor, user_id: str, kind: str, key: str, current: int, longest: int,
+                 last_day: Optional[int], archived_longest: Optional[int] = None) -> None:
+    cur.execute(
+        "INSERT INTO streak_state (user_id, kind, key, current, longest, last_day, archived_longest) "
+        "VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, 0)) ON CONFLICT(user_id, kind, key) DO UPDATE SET "
+        "current=excluded.current, longest=excluded.longest, last_day=excluded.last_day, "
+        "archived_longest=COALESCE(?, archived_longest)",
+        (user_id, kind, key, current, longest, last_day, archived_longest, archived_longest),
+    )
+
+
+def _recompute_streak(cur: sqlite3.Cursor, user_id: str, kind: str, key: str, cutoff: Optional[int]) -> None:
+    """Rebuild one key's row from the hot table; archived years are closed, so the stored
+    archived_longest and the rollups' tail stand in for them. `cutoff` is the archive cutoff of the
+    database `cur` writes to."""
+    table, key_column, _done = STREAK_SOURCES[kind]
+    runs = [(first, n) for _u, _k, first, n in cur.execute(
+        _runs_sql(kind, [table], f" AND user_id=? AND {key_column}=?"), (user_id, key))]
+    tail = 0
+    if cutoff is not None:
+        row = cur.execute(
+            "SELECT tail_streak FROM archive_rollups WHERE user_id=? AND kind=? AND key=? AND year=?",
+            (user_id, kind, key, from_day(cutoff - 1).year),
+        ).fetchone()
+        tail = row[0] if row else 0
+    row = cur.execute("SELECT archived_longest FROM streak_state WHERE user_id=? AND kind=? AND key=?",
+                      (user_id, kind, key)).fetchone()
+    current, longest, last_day, _archived = _fold_runs(runs, cutoff, tail, row[0] if row else 0)
+    _save_streak(cur, user_id, kind, key, current, longest, last_day)
+
+
+def _streak_completed(cur: sqlite3.Cursor, user_id: str, kind: str, key: str, day: int) -> None:
+    """`day` just became a completed day for the key."""
+    row = cur.execute("SELECT current, longest, last_day FROM streak_state WHERE user_id=? AND kind=? AND key=?",
+                      (user_id, kind, key)).fetchone()
+    if row is None:
+        _save_streak(cur, user_id, kind, key, 1, 1, day)
+        return
+    current, longest, last_day = row
+    if last_day is None or day < last_day:
+        _recompute_streak(cur, user_id, kind, key, _archive_cutoff)
+    elif day > last_day:
+        current = current + 1 if day == last_day + 1 else 1
+        _save_streak(cur, user_id, kind, key, current, max(longest, current), day)
+
+
+def _streak_missed(cur: sqlite3.Cursor, user_id: str, kind: str, key: str, day: int) -> None:
+    """`day` is no longer a completed day for the key."""
+    row = cur.execute("SELECT current, longest, last_day FROM streak_state WHERE user_id=? AND kind=? AND key=?",
+                      (user_id, kind, key)).fetchone()
+    if row is None or row[2] is None or day > row[2]:
+        return
+    current, longest, last_day = row
+    # Unticking the latest day of a run that is not the longest only shortens that run
+    if day == last_day and longest > current > 1:
+        _save_streak(cur, user_id, kind, key, current - 1, longest, last_day - 1)
+    else:
+        _recompute_streak(cur, user_id, kind, key, _archive_cutoff)
+
+
+def refresh_streaks(cur: sqlite3.Cursor, keys: Iterable[Tuple[str, str, str]], cutoff: Optional[int]) -> None:
+    """Recompute (user_id, kind, key) rows after writes that bypassed the helpers above (sync).
+    `cur` may belong to another copy of the database, so its archive cutoff is passed in."""
+    for user_id, kind, key in set(keys):
+        _recompute_streak(cur, user_id, kind, key, cutoff)
+
+
+def rebuild_streaks(user_id: Optional[str] = None) -> int:
+    """Recompute streak_state from every stored day, archived years included; returns rows written."""
+    conn = get_conn()
+    conn.row_factory = None
+    cur = conn.cursor()
+    first = _archive_cutoff
+    if _archive_cutoff is not None:
+        row = cur.execute("SELECT MIN(year) FROM archive_rollups").fetchone()
+        first = to_day(date(row[0], 1, 1)) if row[0] is not None else _archive_cutoff
+    where, params = (" AND user_id=?", (user_id,)) if user_id is not None else ("", ())
+    rows = []
+    for kind, (table, _key, _done) in STREAK_SOURCES.items():
+        # ATTACH is not allowed inside a transaction, so the archives are attached up front
+        sources = range_sources(conn, table, first, today_day()) if first is not None else [table]
+        runs: Dict[Tuple[str, str], List[Tuple[int, int]]] = {}
+        for owner, key, start, n in cur.execute(_runs_sql(kind, sources, where), params * len(sources)):
+            runs.setdefault((owner, key), []).append((start, n))
+        rows += [(owner, kind, key, *_fold_runs(key_runs, _archive_cutoff)) for (owner, key), key_runs in runs.items()]
+    cur.execute("BEGIN")
+    cur.execute("DELETE FROM streak_state" + (" WHERE user_id=?" if user_id is not None else ""), params)
+    for row in rows:
+        _save_streak(cur, *row)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def archive_streaks(cur: sqlite3.Cursor, year: int, first: int, last: int) -> None:
+    """Fold a year about to be archived into archived_longest (run inside archive_year's transaction,
+    after its rollups are written)."""
+    for kind in STREAK_SOURCES:
+        best: Dict[Tuple[str, str], int] = {}
+        for owner, key, start, n in cur.execute(_runs_sql(kind, ["main." + STREAK_SOURCES[kind][0]],
+                                                          " AND day BETWEEN ? AND ?"), (first, last)).fetchall():
+            if start == first:
+                # Continues the previous archived year's tail
+                row = cur.execute(
+                    "SELECT tail_streak FROM archive_rollups WHERE user_id=? AND kind=? AND key=? AND year=?",
+                    (owner, kind, key, year - 1),
+                ).fetchone()
+                n += row[0] if row else 0
+            best[(owner, key)] = max(best.get((owner, key), 0), n)
+        cur.executemany(
+            "UPDATE streak_state SET archived_longest = MAX(archived_longest, ?) WHERE user_id=? AND kind=? AND key=?",
+            [(n, owner, kind, key) for (owner, key), n in best.items()],
         )
-        """
+
+
+def get_streaks(kind: str, as_of: Optional[DayLike] = None, user_id: str = DEFAULT_USER) -> Dict[str, Streak]:
+    """Every stored streak of one kind for the user, keyed by habit name ('' for focus), in one
+    primary-key range read. current counts only a run ending on `as_of` (default today), which
+    must not be before the latest write."""
+    end = to_day(as_of) if as_of is not None else today_day()
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        rows = conn.execute(
+            "SELECT key, current, longest, last_day FROM streak_state WHERE user_id=? AND kind=?", (user_id, kind)
+        ).fetchall()
+    finally:
+        conn.close()
+    return {key: Streak(key, current if last_day == end else 0, longest, last_day)
+            for key, current, longest, last_day in rows}
+
+
+# --- Event log ---
+# History for undo and audit (modules/history.py). The tasks and habits tables
+# stay the state every page reads; status_events is the append-only record of
+# how they got there, one row of integers per status change. Snapshots pack a
+# user's completed (ref, day) pairs as of one event so that rebuilding any past
+# state reads the nearest snapshot and the events after it.
+
+EVENT_LOG = os.environ.get("LIFE_OS_EVENT_LOG", "1") != "0"
+# Days since the epoch fit in the low bits of a state key; the ref id takes the rest
+STATE_DAY_BITS = 20
+# `undoes` of changes another device made (applied by sync): they count for every state, but are
+# not undoable here, and undo skips the local changes they overwrote. Seqs start at 1.
+EXTERNAL = 0
+
+
+class StatusEvent(NamedTuple):
+    seq: int
+    ref: int
+    day: int
+    status: int
+    ts: int
+    grp: Optional[int]
+    undoes: Optional[int]
+
+
+class EventRef(NamedTuple):
+    id: int
+    user_id: str
+    kind: str       # 'task' or 'habit'
+    category: str   # '' for habits
+    name: str
+
+
+def state_key(ref: int, day: int) -> int:
+    return (ref << STATE_DAY_BITS) | day
+
+
+def encode_state(keys: Iterable[int]) -> bytes:
+    """Sorted keys, delta-encoded and deflated: a year of daily statuses is a few hundred bytes."""
+    packed = np.sort(np.fromiter(keys, dtype=np.int64))
+    return zlib.compress(np.diff(packed, prepend=0).tobytes())
+
+
+def decode_state(blob: bytes) -> set:
+    return set(np.cumsum(np.frombuffer(zlib.decompress(blob), dtype=np.int64)).tolist())
+
+
+def _event_ref(cur: sqlite3.Cursor, user_id: str, kind: str, category: str, name: str) -> int:
+    cur.execute("INSERT OR IGNORE INTO event_refs (user_id, kind, category, name) VALUES (?, ?, ?, ?)",
+                (user_id, kind, category, name))
+    return cur.execute("SELECT id FROM event_refs WHERE user_id=? AND kind=? AND category=? AND name=?",
+                       (user_id, kind, category, name)).fetchone()[0]
+
+
+def _log_status_events(cur: sqlite3.Cursor, user_id: str, kind: str, changes: Sequence[Tuple[int, str, str, int]],
+                       undoes: Optional[int] = None) -> None:
+    """Append (day, category, name, status) changes inside the caller's write transaction."""
+    if not EVENT_LOG or not changes:
+        return
+    refs: Dict[Tuple[str, str], int] = {}
+    for _day, category, name, _status in changes:
+        if (category, name) not in refs:
+            refs[category, name] = _event_ref(cur, user_id, kind, category, name)
+    grp = None
+    if len(changes) > 1:
+        # The write lock is held, so the next rowid is the first seq of this group
+        grp = cur.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM status_events").fetchone()[0]
+    cur.executemany(
+        "INSERT INTO status_events (ref, day, status, ts, grp, undoes) "
+        "VALUES (?, ?, ?, CAST(strftime('%s', 'now') AS INTEGER), ?, ?)",
+        [(refs[category, name], day, status, grp, undoes) for day, category, name, status in changes],
     )
+
+
+def log_external_status_events(cur: sqlite3.Cursor, user_id: str, kind: str,
+                               changes: Sequence[Tuple[int, str, str, int]]) -> None:
+    """Record status changes written outside the set_* functions (modules/sync.py) as one EXTERNAL group."""
+    _log_status_events(cur, user_id, kind, changes, undoes=EXTERNAL)
+
+
+def _snapshot_genesis(cur: sqlite3.Cursor) -> None:
+    """When the log is created, snapshot the statuses it has no events for as of seq 0."""
+    done: Dict[str, List[int]] = {}
+    for user_id, kind, category, name, day in cur.execute(
+        "SELECT user_id, 'task', category, task_name, day FROM tasks WHERE status=1 "
+        "UNION ALL SELECT user_id, 'habit', '', habit, day FROM habits WHERE status=1"
+    ).fetchall():
+        done.setdefault(user_id, []).append(state_key(_event_ref(cur, user_id, kind, category, name), day))
+    cur.executemany("INSERT OR REPLACE INTO status_snapshots (user_id, seq, state) VALUES (?, 0, ?)",
+                    [(user_id, encode_state(keys)) for user_id, keys in done.items()])
+
+
+def get_event_refs(user_id: str = DEFAULT_USER) -> Dict[int, EventRef]:
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        return {row[0]: EventRef._make(row) for row in conn.execute(
+            "SELECT id, user_id, kind, category, name FROM event_refs WHERE user_id=?", (user_id,))}
+    finally:
+        conn.close()
+
+
+def get_event_users() -> List[str]:
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        return [row[0] for row in conn.execute("SELECT DISTINCT user_id FROM event_refs")]
+    finally:
+        conn.close()
+
+
+def get_status_events(user_id: str = DEFAULT_USER, after: int = 0, upto: Optional[int] = None) -> List[StatusEvent]:
+    """The user's events with after < seq <= upto, oldest first."""
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        return list(map(StatusEvent._make, conn.execute(
+            "SELECT seq, ref, day, status, ts, grp, undoes FROM status_events "
+            "WHERE ref IN (SELECT id FROM event_refs WHERE user_id=?) AND seq > ? AND seq <= ? ORDER BY seq",
+            (user_id, after, upto if upto is not None else 2 ** 63 - 1),
+        )))
+    finally:
+        conn.close()
+
+
+def get_recent_status_events(limit: int, user_id: str = DEFAULT_USER) -> List[StatusEvent]:
+    """The user's latest `limit` events, newest first."""
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        return list(map(StatusEvent._make, conn.execute(
+            "SELECT seq, ref, day, status, ts, grp, undoes FROM status_events "
+            "WHERE ref IN (SELECT id FROM event_refs WHERE user_id=?) ORDER BY seq DESC LIMIT ?",
+            (user_id, limit),
+        )))
+    finally:
+        conn.close()
+
+
+def get_status_snapshot(upto: Optional[int] = None, user_id: str = DEFAULT_USER) -> Tuple[int, set]:
+    """(seq, state keys) of the user's latest snapshot at or before `upto`; (0, empty) if none."""
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        row = conn.execute(
+            "SELECT seq, state FROM status_snapshots WHERE user_id=? AND seq <= ? ORDER BY seq DESC LIMIT 1",
+            (user_id, upto if upto is not None else 2 ** 63 - 1),
+        ).fetchone()
+    finally:
+        conn.close()
+    return (row[0], decode_state(row[1])) if row else (0, set())
+
+
+def save_status_snapshot(seq: int, keys: Iterable[int], user_id: str = DEFAULT_USER) -> None:
+    conn = get_conn()
+    conn.execute("INSERT OR REPLACE INTO status_snapshots (user_id, seq, state) VALUES (?, ?, ?)",
+                 (user_id, seq, encode_state(keys)))
     conn.commit()
     conn.close()
 
 
 # --- Tasks (Academics / Health) ---
 
-def upsert_task(date_str: str, task_name: str, category: str, status: int = 0) -> None:
+# Called as listener(user_id, day, task_name, category, status) after each committed change to a
+# task row, so in-process caches (views/academics.py) can drop what they hold for that day
+_task_listeners: List[Callable[[str, int, str, str, bool], None]] = []
+
+
+def add_task_listener(listener: Callable[[str, int, str, str, bool], None]) -> None:
+    if listener not in _task_listeners:
+        _task_listeners.append(listener)
+
+
+def notify_task_listeners(user_id: str, changes: Iterable[Tuple[int, str, str, bool]]) -> None:
+    """Tell the listeners about (day, task_name, category, status) changes; modules/sync.py calls this too."""
+    for day, task_name, category, status in changes:
+        for listener in _task_listeners:
+            listener(user_id, day, task_name, category, bool(status))
+
+
+def upsert_task(day: DayLike, task_name: str, category: str, status: int = 0, user_id: str = DEFAULT_USER) -> None:
+    _check_open(to_day(day))
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        "SELECT id FROM tasks WHERE date=? AND task_name=? AND category=?",
-        (date_str, task_name, category),
+        "SELECT id FROM tasks WHERE user_id=? AND day=? AND task_name=? AND category=?",
+        (user_id, to_day(day), task_name, category),
     )
     row = cur.fetchone()
     if row:
@@ -81,85 +1521,209 @@ def upsert_task(date_str: str, task_name: str, category: str, status: int = 0) -
         return
     else:
         cur.execute(
-            "INSERT INTO tasks (date, task_name, category, status) VALUES (?, ?, ?, ?)",
-            (date_str, task_name, category, status),
+            "INSERT INTO tasks (user_id, day, task_name, category, status) VALUES (?, ?, ?, ?, ?)",
+            (user_id, to_day(day), task_name, category, status),
         )
+        if status:
+            _log_status_events(cur, user_id, "task", [(to_day(day), category, task_name, 1)])
     conn.commit()
     conn.close()
+    notify_task_listeners(user_id, [(to_day(day), task_name, category, status)])
 
 
-def set_task_status(date_str: str, task_name: str, category: str, status: bool) -> None:
+def set_task_status(day: DayLike, task_name: str, category: str, status: bool, user_id: str = DEFAULT_USER,
+                    undoes: Optional[int] = None) -> None:
+    day = to_day(day)
+    _check_open(day)
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        "UPDATE tasks SET status=? WHERE date=? AND task_name=? AND category=?",
-        (1 if status else 0, date_str, task_name, category),
+        "UPDATE tasks SET status=? WHERE user_id=? AND day=? AND task_name=? AND category=? AND status IS NOT ?",
+        (1 if status else 0, user_id, day, task_name, category, 1 if status else 0),
     )
+    if cur.rowcount == 0 and status:
+        # A recurring occurrence gets its row on its first change from the default
+        cur.execute(
+            "INSERT INTO tasks (user_id, day, task_name, category, status) SELECT ?, ?, ?, ?, 1 "
+            "WHERE NOT EXISTS (SELECT 1 FROM tasks WHERE user_id=? AND day=? AND task_name=? AND category=?)",
+            (user_id, day, task_name, category, user_id, day, task_name, category),
+        )
+    changed = cur.rowcount > 0
+    if changed:
+        _log_status_events(cur, user_id, "task", [(day, category, task_name, 1 if status else 0)], undoes)
     conn.commit()
     conn.close()
+    if changed:
+        notify_task_listeners(user_id, [(day, task_name, category, status)])
 
 
-def get_tasks(date_str: str, category: Optional[str] = None) -> List[sqlite3.Row]:
+def set_task_statuses(changes: Iterable[Tuple[DayLike, str, str, bool]], user_id: str = DEFAULT_USER,
+                      undoes: Optional[int] = None) -> int:
+    """set_task_status for many (day, task_name, category, status) at once: one transaction, one
+    executemany per statement. Returns how many statuses actually changed."""
+    wanted = {(to_day(day), name, category): 1 if status else 0 for day, name, category, status in changes}
+    if not wanted:
+        return 0
+    days = [day for day, _name, _category in wanted]
+    _check_open(min(days))
     conn = get_conn()
+    conn.row_factory = None
     cur = conn.cursor()
-    if category:
-        cur.execute(
-            "SELECT * FROM tasks WHERE date=? AND category=? ORDER BY id ASC",
-            (date_str, category),
-        )
-    else:
-        cur.execute(
-            "SELECT * FROM tasks WHERE date=? ORDER BY id ASC",
-            (date_str,),
-        )
-    rows = cur.fetchall()
+    # Read under the write lock so the diff cannot go stale before it is applied
+    cur.execute("BEGIN IMMEDIATE")
+    stored = {(day, name, category): status for day, name, category, status in cur.execute(
+        "SELECT day, task_name, category, status FROM tasks WHERE user_id=? AND day BETWEEN ? AND ?",
+        (user_id, min(days), max(days)),
+    )}
+    changed = [(key, status) for key, status in wanted.items() if stored.get(key, 0) != status]
+    cur.executemany(
+        "UPDATE tasks SET status=? WHERE user_id=? AND day=? AND task_name=? AND category=?",
+        [(status, user_id, *key) for key, status in changed if key in stored],
+    )
+    # A recurring occurrence gets its row on its first change from the default
+    cur.executemany(
+        "INSERT INTO tasks (user_id, day, task_name, category, status) VALUES (?, ?, ?, ?, 1)",
+        [(user_id, *key) for key, _status in changed if key not in stored],
+    )
+    _log_status_events(cur, user_id, "task", [(day, category, name, status) for (day, name, category), status in changed],
+                       undoes)
+    conn.commit()
     conn.close()
-    return rows
+    notify_task_listeners(user_id, [(day, name, category, status) for (day, name, category), status in changed])
+    return len(changed)
+
+
+def _tasks_query(day: DayLike, category: Optional[str], columns: Optional[Sequence[str]],
+                 user_id: str) -> Tuple[type, str, tuple, Optional[int]]:
+    day = to_day(day)
+    year = _archive_year("tasks", day)
+    if category:
+        cls, sql = _select("tasks", columns, " WHERE user_id=? AND day=? AND category=?", "id ASC", year)
+        return cls, sql, (user_id, day, category), year
+    cls, sql = _select("tasks", columns, " WHERE user_id=? AND day=?", "id ASC", year)
+    return cls, sql, (user_id, day), year
+
+
+def get_tasks(day: DayLike, category: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+              user_id: str = DEFAULT_USER) -> List[Task]:
+    return _fetch_rows(*_tasks_query(day, category, columns, user_id))
+
+
+def iter_tasks(day: DayLike, category: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+               user_id: str = DEFAULT_USER) -> Iterator[Task]:
+    return _iter_rows(*_tasks_query(day, category, columns, user_id))
 
 
-def add_custom_task(date_str: str, task_name: str, category: str = "Academics") -> None:
-    upsert_task(date_str, task_name, category, status=0)
+def add_custom_task(day: DayLike, task_name: str, category: str = "Academics", user_id: str = DEFAULT_USER) -> None:
+    upsert_task(day, task_name, category, status=0, user_id=user_id)
 
 
 # --- Finance ---
 
-def add_finance_entry(date_str: str, category: str, amount: float, note: str) -> None:
+def add_finance_entry(day: DayLike, category: str, amount: float, note: str, user_id: str = DEFAULT_USER) -> None:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        "INSERT INTO finance (date, category, amount, note) VALUES (?, ?, ?, ?)",
-        (date_str, category, amount, note),
+        "INSERT INTO finance (user_id, day, category, amount, note) VALUES (?, ?, ?, ?, ?)",
+        (user_id, to_day(day), category, amount, note),
     )
     conn.commit()
     conn.close()
 
 
-def get_finance(limit: int = 100) -> List[sqlite3.Row]:
+def get_finance(limit: int = 100, columns: Optional[Sequence[str]] = None, user_id: str = DEFAULT_USER) -> List[FinanceEntry]:
+    cls, sql = _select("finance", columns, " WHERE user_id=?", "day ASC, id ASC LIMIT ?")
+    return _fetch_rows(cls, sql, (user_id, limit))
+
+
+def iter_finance(limit: int = -1, columns: Optional[Sequence[str]] = None, user_id: str = DEFAULT_USER) -> Iterator[FinanceEntry]:
+    """Stream the ledger oldest first; a negative limit streams every row."""
+    cls, sql = _select("finance", columns, " WHERE user_id=?", "day ASC, id ASC LIMIT ?")
+    return _iter_rows(cls, sql, (user_id, limit))
+
+
+def get_finance_since(after_id: int, columns: Optional[Sequence[str]] = None,
+                      user_id: str = DEFAULT_USER) -> List[FinanceEntry]:
+    """Rows added after `after_id`, oldest first. Ids only grow, so this is everything new."""
+    cls, sql = _select("finance", columns, " WHERE user_id=? AND id>?", "id ASC")
+    return _fetch_rows(cls, sql, (user_id, after_id))
+
+
+class FinanceColumns(NamedTuple):
+    """Ledger rows as parallel arrays; category[i] is categories[category_codes[i]]."""
+    ids: np.ndarray
+    days: np.ndarray
+    category_codes: np.ndarray
+    amounts: np.ndarray
+    categories: List[str]
+
+
+def get_finance_columns(after_id: int = 0, user_id: str = DEFAULT_USER) -> FinanceColumns:
+    """Rows after `after_id` (as get_finance_since, id order), loaded column-wise without a Python
+    object per row: SQLite joins each category's ids, days and amounts into comma-separated strings
+    in one pass and NumPy parses them."""
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM finance ORDER BY date ASC, id ASC LIMIT ?", (limit,))
-    rows = cur.fetchall()
-    conn.close()
-    return rows
+    conn.row_factory = None
+    try:
+        groups = conn.execute(
+            "SELECT category, group_concat(id), group_concat(day), group_concat(amount) "
+            "FROM finance WHERE user_id=? AND id>? GROUP BY category ORDER BY category",
+            (user_id, after_id),
+        ).fetchall()
+    finally:
+        conn.close()
+    categories = [group[0] for group in groups]
+    # SQLite prints REALs with 15 significant digits, exact for amounts in paise
+    parsed = [[np.fromstring(text, dtype=dtype, sep=",")
+               for text, dtype in zip(group[1:], (np.int64, np.int64, np.float64))] for group in groups]
+    if not parsed:
+        empty = np.empty(0, dtype=np.int64)
+        return FinanceColumns(empty, empty, empty, np.empty(0, dtype=np.float64), [])
+    ids, days, amounts = (np.concatenate(column) for column in zip(*parsed))
+    codes = np.repeat(np.arange(len(categories)), [len(group[0]) for group in parsed])
+    order = np.argsort(ids, kind="stable")
+    return FinanceColumns(ids[order], days[order], codes[order], amounts[order], categories)
 
 
-def get_recent_finance(limit: int = 5) -> List[sqlite3.Row]:
+def get_finance_version(user_id: str = DEFAULT_USER) -> int:
+    """Counter that moves whenever one of the user's finance rows is edited or deleted."""
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM finance ORDER BY date DESC, id DESC LIMIT ?", (limit,))
-    rows = cur.fetchall()
+    row = conn.execute("SELECT version FROM finance_version WHERE user_id=?", (user_id,)).fetchone()
     conn.close()
-    return rows
+    return row[0] if row else 0
+
+
+def get_recent_finance(limit: int = 5, columns: Optional[Sequence[str]] = None, user_id: str = DEFAULT_USER) -> List[FinanceEntry]:
+    cls, sql = _select("finance", columns, " WHERE user_id=?", "day DESC, id DESC LIMIT ?")
+    return _fetch_rows(cls, sql, (user_id, limit))
 
 
 # --- Habits ---
 
-def upsert_habit(date_str: str, habit: str, status: int = 0) -> None:
+# Called as listener(user_id, day, habit, status) after each committed status change,
+# so in-process caches (modules/habit_calendar.py) can update in place
+_habit_listeners: List[Callable[[str, int, str, bool], None]] = []
+
+
+def add_habit_listener(listener: Callable[[str, int, str, bool], None]) -> None:
+    if listener not in _habit_listeners:
+        _habit_listeners.append(listener)
+
+
+def notify_habit_listeners(user_id: str, changes: Iterable[Tuple[int, str, bool]]) -> None:
+    """Tell the listeners about (day, habit, status) changes committed outside this module (modules/sync.py)."""
+    for day, habit, status in changes:
+        for listener in _habit_listeners:
+            listener(user_id, day, habit, bool(status))
+
+
+def upsert_habit(day: DayLike, habit: str, status: int = 0, user_id: str = DEFAULT_USER) -> None:
+    _check_open(to_day(day))
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        "SELECT id FROM habits WHERE date=? AND habit=?",
-        (date_str, habit),
+        "SELECT id FROM habits WHERE user_id=? AND day=? AND habit=?",
+        (user_id, to_day(day), habit),
     )
     row = cur.fetchone()
     if row:
@@ -167,84 +1731,245 @@ def upsert_habit(date_str: str, habit: str, status: int = 0) -> None:
         return
     else:
         cur.execute(
-            "INSERT INTO habits (date, habit, status) VALUES (?, ?, ?)",
-            (date_str, habit, status),
+            "INSERT INTO habits (user_id, day, habit, status) VALUES (?, ?, ?, ?)",
+            (user_id, to_day(day), habit, status),
         )
+        if status == 1:
+            _streak_completed(cur, user_id, "habit", habit, to_day(day))
+            _log_status_events(cur, user_id, "habit", [(to_day(day), "", habit, 1)])
     conn.commit()
     conn.close()
+    if status == 1:
+        for listener in _habit_listeners:
+            listener(user_id, to_day(day), habit, True)
 
 
-def set_habit_status(date_str: str, habit: str, status: bool) -> None:
+def set_habit_status(day: DayLike, habit: str, status: bool, user_id: str = DEFAULT_USER,
+                     undoes: Optional[int] = None) -> None:
+    day = to_day(day)
+    _check_open(day)
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        "UPDATE habits SET status=? WHERE date=? AND habit=?",
-        (1 if status else 0, date_str, habit),
+        "UPDATE habits SET status=? WHERE user_id=? AND day=? AND habit=? AND status IS NOT ?",
+        (1 if status else 0, user_id, day, habit, 1 if status else 0),
     )
+    if cur.rowcount == 0 and status:
+        cur.execute(
+            "INSERT INTO habits (user_id, day, habit, status) SELECT ?, ?, ?, 1 "
+            "WHERE NOT EXISTS (SELECT 1 FROM habits WHERE user_id=? AND day=? AND habit=?)",
+            (user_id, day, habit, user_id, day, habit),
+        )
+    changed = cur.rowcount > 0
+    if changed:
+        (_streak_completed if status else _streak_missed)(cur, user_id, "habit", habit, day)
+        _log_status_events(cur, user_id, "habit", [(day, "", habit, 1 if status else 0)], undoes)
     conn.commit()
     conn.close()
+    if changed:
+        for listener in _habit_listeners:
+            listener(user_id, day, habit, bool(status))
 
 
-def get_habits(date_str: str) -> List[sqlite3.Row]:
+def set_habit_statuses(changes: Iterable[Tuple[DayLike, str, bool]], user_id: str = DEFAULT_USER,
+                       undoes: Optional[int] = None) -> int:
+    """set_habit_status for many (day, habit, status) at once: one transaction, one executemany per
+    statement, and each habit's streak updated once. Returns how many statuses actually changed."""
+    wanted = {(to_day(day), habit): 1 if status else 0 for day, habit, status in changes}
+    if not wanted:
+        return 0
+    days = [day for day, _habit in wanted]
+    _check_open(min(days))
     conn = get_conn()
+    conn.row_factory = None
     cur = conn.cursor()
-    cur.execute(
-        "SELECT * FROM habits WHERE date=? ORDER BY id ASC",
-        (date_str,),
+    # Read under the write lock so the diff cannot go stale before it is applied
+    cur.execute("BEGIN IMMEDIATE")
+    stored = {(day, habit): status for day, habit, status in cur.execute(
+        "SELECT day, habit, status FROM habits WHERE user_id=? AND day BETWEEN ? AND ?",
+        (user_id, min(days), max(days)),
+    )}
+    changed = [(key, status) for key, status in wanted.items() if stored.get(key, 0) != status]
+    cur.executemany(
+        "UPDATE habits SET status=? WHERE user_id=? AND day=? AND habit=?",
+        [(status, user_id, *key) for key, status in changed if key in stored],
     )
-    rows = cur.fetchall()
+    cur.executemany(
+        "INSERT INTO habits (user_id, day, habit, status) VALUES (?, ?, ?, 1)",
+        [(user_id, *key) for key, _status in changed if key not in stored],
+    )
+    by_habit: Dict[str, List[Tuple[int, int]]] = {}
+    for (day, habit), status in changed:
+        by_habit.setdefault(habit, []).append((day, status))
+    for habit, days_changed in by_habit.items():
+        if len(days_changed) > 1:
+            _recompute_streak(cur, user_id, "habit", habit, _archive_cutoff)
+        else:
+            day, status = days_changed[0]
+            (_streak_completed if status else _streak_missed)(cur, user_id, "habit", habit, day)
+    _log_status_events(cur, user_id, "habit", [(day, "", habit, status) for (day, habit), status in changed], undoes)
+    conn.commit()
     conn.close()
-    return rows
+    for (day, habit), status in changed:
+        for listener in _habit_listeners:
+            listener(user_id, day, habit, bool(status))
+    return len(changed)
+
+
+def get_task_states(first: DayLike, last: DayLike, category: Optional[str] = None,
+                    user_id: str = DEFAULT_USER) -> List[Tuple[int, str, int]]:
+    """(day, task_name, status) for every stored task between first and last inclusive, archived years included."""
+    first, last = to_day(first), to_day(last)
+    conn = get_conn()
+    conn.row_factory = None
+    sources = range_sources(conn, "tasks", first, last)
+    where = "user_id=? AND day BETWEEN ? AND ?" + (" AND category=?" if category is not None else "")
+    params = (user_id, first, last) + ((category,) if category is not None else ())
+    sql = " UNION ALL ".join(f"SELECT day, task_name, status FROM {source} WHERE {where}" for source in sources)
+    try:
+        return conn.execute(sql + " ORDER BY 1", params * len(sources)).fetchall()
+    finally:
+        conn.close()
 
 
-def get_habit_streak(habit: str) -> int:
+def get_completed_habit_days(first: DayLike, last: DayLike, user_id: str = DEFAULT_USER) -> List[Tuple[str, int]]:
+    """(habit, day) for every completed habit between first and last inclusive, archived years included."""
+    first, last = to_day(first), to_day(last)
+    conn = get_conn()
+    conn.row_factory = None
+    sources = range_sources(conn, "habits", first, last)
+    sql = " UNION ALL ".join(
+        f"SELECT habit, day FROM {source} WHERE user_id=? AND status=1 AND day BETWEEN ? AND ?" for source in sources
+    )
+    try:
+        return conn.execute(sql, (user_id, first, last) * len(sources)).fetchall()
+    finally:
+        conn.close()
+
+
+def get_habits(day: DayLike, columns: Optional[Sequence[str]] = None, user_id: str = DEFAULT_USER) -> List[Habit]:
+    day = to_day(day)
+    year = _archive_year("habits", day)
+    cls, sql = _select("habits", columns, " WHERE user_id=? AND day=?", "id ASC", year)
+    return _fetch_rows(cls, sql, (user_id, day), year)
+
+
+def iter_habits(day: DayLike, columns: Optional[Sequence[str]] = None, user_id: str = DEFAULT_USER) -> Iterator[Habit]:
+    day = to_day(day)
+    year = _archive_year("habits", day)
+    cls, sql = _select("habits", columns, " WHERE user_id=? AND day=?", "id ASC", year)
+    return _iter_rows(cls, sql, (user_id, day), year)
+
+
+# Consecutive days share one value of `day + rank` when ranked newest first, so
+# the run ending on day D is exactly the rows where that sum equals D + 1.
+_STREAK_SQL = """
+    WITH days AS ({days}),
+    ranked AS (SELECT day + ROW_NUMBER() OVER (ORDER BY day DESC) AS run FROM days)
+    SELECT COUNT(*) FROM ranked WHERE run = ?
+"""
+
+
+def get_habit_streak(habit: str, as_of: Optional[DayLike] = None, user_id: str = DEFAULT_USER) -> int:
+    """Days in a row, ending on `as_of` (default today), the habit was completed"""
+    end = to_day(as_of) if as_of is not None else today_day()
+    streak = get_streaks("habit", end, user_id=user_id).get(habit)
+    if streak is None or streak.last_day is None or end >= streak.last_day:
+        return streak.current if streak else 0
+    # A day before the latest completion: count the run from the rows
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        "SELECT date, status FROM habits WHERE habit=? ORDER BY date DESC, id DESC",
-        (habit,),
+        _STREAK_SQL.format(days="SELECT DISTINCT day FROM habits WHERE user_id=? AND habit=? AND status=1 AND day<=?"),
+        (user_id, habit, end, end + 1),
     )
-    rows = cur.fetchall()
+    streak = cur.fetchone()[0]
     conn.close()
-    streak = 0
-    last_date = None
-    for r in rows:
-        if not r["status"]:
-            break
-        streak += 1
+    # A run that reaches back to the archive cutoff continues into the archived years
+    if streak and end - streak + 1 == _archive_cutoff:
+        streak += get_archived_tail("habit", habit, user_id=user_id)
     return streak
 
-# --- Timer Sessions ---
+# --- Recurring rules ---
 
-def add_timer_session(date_str: str, start_time: str, duration_minutes: int, subject: str = "General", completed: int = 1) -> None:
+def add_recurring_rule(kind: str, name: str, freq: str, start: DayLike, until: Optional[DayLike] = None,
+                       interval: int = 1, category: str = "", user_id: str = DEFAULT_USER) -> bool:
+    """Store a rule unless the same one (user, kind, category, name, start) exists; True if it was added."""
+    if freq not in ("daily", "weekdays", "every") or interval < 1:
+        raise ValueError(f"Invalid recurrence: {freq!r} every {interval}")
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        "INSERT INTO timer_sessions (date, start_time, duration_minutes, completed, subject) VALUES (?, ?, ?, ?, ?)",
-        (date_str, start_time, duration_minutes, completed, subject),
+        "INSERT OR IGNORE INTO recurring_rules (user_id, kind, name, category, freq, interval, start_day, until_day) "
+        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (user_id, kind, name, category, freq, interval, to_day(start), to_day(until) if until is not None else None),
     )
     conn.commit()
     conn.close()
+    return cur.rowcount > 0
+
+
+def get_recurring_rules(kind: Optional[str] = None, columns: Optional[Sequence[str]] = None,
+                        user_id: str = DEFAULT_USER) -> List[RecurringRule]:
+    if kind is None:
+        cls, sql = _select("recurring_rules", columns, " WHERE user_id=?", "id ASC")
+        return _fetch_rows(cls, sql, (user_id,))
+    cls, sql = _select("recurring_rules", columns, " WHERE user_id=? AND kind=?", "id ASC")
+    return _fetch_rows(cls, sql, (user_id, kind))
 
 
-def get_timer_sessions(date_str: str) -> List[sqlite3.Row]:
+# --- Timer Sessions ---
+
+def add_timer_session(day: DayLike, start: TimestampLike, duration_minutes: int, subject: str = "General",
+                      completed: int = 1, end: Optional[TimestampLike] = None, user_id: str = DEFAULT_USER) -> None:
+    _check_open(to_day(day))
+    start_ts = to_epoch(start)
+    end_ts = to_epoch(end) if end is not None else start_ts + duration_minutes * 60
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
-        "SELECT * FROM timer_sessions WHERE date=? ORDER BY start_time DESC",
-        (date_str,),
+        "INSERT INTO timer_sessions (user_id, day, start_ts, end_ts, duration_minutes, completed, subject) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        (user_id, to_day(day), start_ts, end_ts, duration_minutes, completed, subject),
     )
-    rows = cur.fetchall()
+    if completed:
+        _streak_completed(cur, user_id, "focus", "", to_day(day))
+    conn.commit()
     conn.close()
-    return rows
 
 
-def get_timer_stats(date_str: str) -> Dict:
+def get_timer_sessions(day: DayLike, columns: Optional[Sequence[str]] = None, user_id: str = DEFAULT_USER) -> List[TimerSession]:
+    day = to_day(day)
+    year = _archive_year("timer_sessions", day)
+    cls, sql = _select("timer_sessions", columns, " WHERE user_id=? AND day=?", "start_ts DESC", year)
+    return _fetch_rows(cls, sql, (user_id, day), year)
+
+
+def iter_timer_sessions(day: DayLike, columns: Optional[Sequence[str]] = None, user_id: str = DEFAULT_USER) -> Iterator[TimerSession]:
+    day = to_day(day)
+    year = _archive_year("timer_sessions", day)
+    cls, sql = _select("timer_sessions", columns, " WHERE user_id=? AND day=?", "start_ts DESC", year)
+    return _iter_rows(cls, sql, (user_id, day), year)
+
+
+def get_overlapping_sessions(start: TimestampLike, end: TimestampLike, columns: Optional[Sequence[str]] = None,
+                             user_id: str = DEFAULT_USER) -> List[TimerSession]:
+    """Sessions whose [start_ts, end_ts) interval intersects [start, end)"""
+    cls, sql = _select("timer_sessions", columns, " WHERE user_id=? AND start_ts < ? AND end_ts > ?", "start_ts ASC")
+    return _fetch_rows(cls, sql, (user_id, to_epoch(end), to_epoch(start)))
+
+
+def get_timer_stats(day: DayLike, user_id: str = DEFAULT_USER) -> Dict:
+    day = to_day(day)
+    year = _archive_year("timer_sessions", day)
     conn = get_conn()
+    source = "timer_sessions"
+    if year is not None:
+        schema = _attach_archive(conn, year)
+        source = f"{schema}.timer_sessions" if schema else "(SELECT * FROM timer_sessions WHERE 0)"
     cur = conn.cursor()
     cur.execute(
-        "SELECT SUM(duration_minutes) as total_minutes, COUNT(*) as total_sessions, SUM(completed) as completed_sessions FROM timer_sessions WHERE date=?",
-        (date_str,),
+        f"SELECT SUM(duration_minutes) as total_minutes, COUNT(*) as total_sessions, SUM(completed) as completed_sessions FROM {source} WHERE user_id=? AND day=?",
+        (user_id, day),
     )
     row = cur.fetchone()
     conn.close()
@@ -256,26 +1981,219 @@ def get_timer_stats(date_str: str) -> Dict:
     }
 
 
-def get_focus_streak() -> int:
+def get_focus_streak(as_of: Optional[DayLike] = None, user_id: str = DEFAULT_USER) -> int:
     """Get days in a row with at least one completed focus session"""
+    end = to_day(as_of) if as_of is not None else today_day()
+    streak = get_streaks("focus", end, user_id=user_id).get("")
+    if streak is None or streak.last_day is None or end >= streak.last_day:
+        return streak.current if streak else 0
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        _STREAK_SQL.format(days="SELECT DISTINCT day FROM timer_sessions WHERE user_id=? AND completed=1 AND day<=?"),
+        (user_id, end, end + 1),
+    )
+    streak = cur.fetchone()[0]
+    conn.close()
+    if streak and end - streak + 1 == _archive_cutoff:
+        streak += get_archived_tail("focus", "", user_id=user_id)
+    return streak
+
+
+# --- Active timers ---
+# Storage for modules/focus_timer.py. Every change is a compare-and-set on the
+# row the caller read, so two tabs (or the app and the API) pressing pause or
+# stop at once cannot both win.
+
+def get_active_session(user_id: str = DEFAULT_USER) -> Optional[ActiveSession]:
+    cls, sql = _select("active_sessions", None, " WHERE user_id=?", "user_id")
+    rows = _fetch_rows(cls, sql, (user_id,))
+    return rows[0] if rows else None
+
+
+def get_active_sessions() -> List[ActiveSession]:
+    """Every user's running timer."""
+    cls, sql = _select("active_sessions", None, "", "user_id")
+    return _fetch_rows(cls, sql, ())
+
+
+def count_active_sessions() -> Dict[bool, int]:
+    """{paused: number of timers} across all users."""
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        return dict(conn.execute(
+            "SELECT resumed_ts IS NULL, COUNT(*) FROM active_sessions GROUP BY 1").fetchall())
+    finally:
+        conn.close()
+
+
+def start_active_session(session: ActiveSession) -> bool:
+    """Insert `session`; False if the user already has a running timer."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        f"INSERT OR IGNORE INTO active_sessions ({', '.join(ActiveSession._fields)}) "
+        f"VALUES ({', '.join('?' * len(ActiveSession._fields))})",
+        session,
+    )
+    started = cur.rowcount == 1
+    conn.commit()
+    conn.close()
+    return started
+
+
+def update_active_session(current: ActiveSession, updated: ActiveSession) -> bool:
+    """Replace `current` with `updated`. False if the stored row is no longer `current`."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE active_sessions SET elapsed=?, resumed_ts=?, resumed_mono=?, clock=?, updated_ts=? "
+        "WHERE user_id=? AND start_ts=? AND updated_ts=?",
+        (updated.elapsed, updated.resumed_ts, updated.resumed_mono, updated.clock, updated.updated_ts,
+         current.user_id, current.start_ts, current.updated_ts),
+    )
+    claimed = cur.rowcount == 1
+    conn.commit()
+    conn.close()
+    return claimed
+
+
+def close_active_session(current: ActiveSession, end: TimestampLike, duration_minutes: int,
+                         completed: int) -> Optional[TimerSession]:
+    """Move `current` into timer_sessions as one session ending at `end`, returning that row.
+    None if another caller already closed or changed it."""
     conn = get_conn()
     cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
     cur.execute(
-        "SELECT DISTINCT date FROM timer_sessions WHERE completed=1 ORDER BY date DESC",
+        "DELETE FROM active_sessions WHERE user_id=? AND start_ts=? AND updated_ts=?",
+        (current.user_id, current.start_ts, current.updated_ts),
+    )
+    recorded = None
+    if cur.rowcount == 1:
+        start_ts = int(current.start_ts)
+        day = to_day(date.fromtimestamp(start_ts))
+        cur.execute(
+            "INSERT INTO timer_sessions (user_id, day, start_ts, end_ts, duration_minutes, completed, subject) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (current.user_id, day, start_ts, to_epoch(end), duration_minutes, completed, current.subject),
+        )
+        recorded = TimerSession(cur.lastrowid, day, start_ts, to_epoch(end), duration_minutes, completed,
+                                current.subject)
+        if completed:
+            _streak_completed(cur, current.user_id, "focus", "", day)
+    conn.commit()
+    conn.close()
+    return recorded
+
+
+# --- Overview ---
+# One statement for the landing page: each domain's aggregates for the day are a
+# branch of a UNION ALL over shared CTEs, so the page costs one round trip. Due
+# counts are the day's recurring occurrences (the rule test mirrors
+# recurrence.occurrences) plus stored rows no rule covers, i.e. one-off tasks.
+
+_OVERVIEW_SQL = """
+    WITH p AS (SELECT ? AS user_id, ? AS day),
+    due AS (
+        SELECT r.kind, r.name, r.category FROM recurring_rules r, p
+        WHERE r.user_id = p.user_id AND r.start_day <= p.day AND (r.until_day IS NULL OR p.day <= r.until_day)
+          AND (r.freq = 'daily' OR (r.freq = 'weekdays' AND (p.day + 3) % 7 < 5)
+               OR (r.freq = 'every' AND (p.day - r.start_day) % r.interval = 0))
+    ),
+    t AS (SELECT task_name, category, status FROM tasks, p WHERE tasks.user_id = p.user_id AND tasks.day = p.day),
+    h AS (SELECT habit, status FROM habits, p WHERE habits.user_id = p.user_id AND habits.day = p.day)
+    SELECT 'tasks',
+           (SELECT COUNT(*) FROM due WHERE kind = 'task') + (SELECT COUNT(*) FROM t WHERE NOT EXISTS
+               (SELECT 1 FROM due WHERE kind = 'task' AND name = t.task_name AND category = t.category)),
+           (SELECT COALESCE(SUM(status), 0) FROM t), NULL
+    UNION ALL
+    SELECT 'habits',
+           (SELECT COUNT(*) FROM due WHERE kind = 'habit') + (SELECT COUNT(*) FROM h WHERE NOT EXISTS
+               (SELECT 1 FROM due WHERE kind = 'habit' AND name = h.habit)),
+           (SELECT COALESCE(SUM(status), 0) FROM h), NULL
+    UNION ALL
+    SELECT 'focus', COALESCE(SUM(duration_minutes), 0), COUNT(*), COALESCE(SUM(completed), 0)
+    FROM timer_sessions, p WHERE timer_sessions.user_id = p.user_id AND timer_sessions.day = p.day
+    UNION ALL
+    SELECT 'finance',
+           COALESCE(SUM(CASE WHEN category LIKE 'Expense:%' THEN amount END), 0),
+           COALESCE(SUM(CASE WHEN category LIKE 'Income:%' THEN amount END), 0),
+           COALESCE(SUM(CASE WHEN category LIKE 'Invest:%' THEN amount END), 0)
+    FROM finance, p WHERE finance.user_id = p.user_id AND finance.day = p.day
+    UNION ALL
+    SELECT 'streaks',
+           COALESCE(MAX(CASE WHEN kind = 'focus' THEN current END), 0),
+           COALESCE(MAX(CASE WHEN kind = 'habit' THEN current END), 0), NULL
+    FROM streak_state, p WHERE streak_state.user_id = p.user_id AND streak_state.last_day = p.day
+"""
+
+
+def get_day_overview(day: Optional[DayLike] = None, user_id: str = DEFAULT_USER) -> DayOverview:
+    """Today's (or `day`'s) totals across tasks, habits, focus sessions, finance and streaks in one query."""
+    day = to_day(day) if day is not None else today_day()
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        rows = {kind: values for kind, *values in conn.execute(_OVERVIEW_SQL, (user_id, day))}
+    finally:
+        conn.close()
+    return DayOverview(*rows["tasks"][:2], *rows["habits"][:2], *rows["focus"], *rows["finance"], *rows["streaks"][:2])
+
+
+# --- Reminder Schedule ---
+
+def ensure_reminder_slots(user_id: str, first_fire: Dict[int, int]) -> None:
+    """Create schedule rows for slots the user does not have yet; existing rows keep their next fire time."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT OR IGNORE INTO reminder_schedule (user_id, slot, next_fire_ts) VALUES (?, ?, ?)",
+        [(user_id, slot, ts) for slot, ts in first_fire.items()],
+    )
+    conn.commit()
+    conn.close()
+
+
+def get_reminder_schedule(user_id: str) -> List[sqlite3.Row]:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT slot, next_fire_ts FROM reminder_schedule WHERE user_id=? ORDER BY next_fire_ts ASC",
+        (user_id,),
     )
     rows = cur.fetchall()
     conn.close()
-    
-    from datetime import date, timedelta
-    streak = 0
-    current_date = date.today()
-    
-    for row in rows:
-        session_date = date.fromisoformat(row["date"])
-        if session_date == current_date:
-            streak += 1
-            current_date -= timedelta(days=1)
-        else:
-            break
-    
-    return streak
\ No newline at end of file
+    return rows
+
+
+def advance_reminder(user_id: str, slot: int, fired_ts: int, next_ts: int) -> bool:
+    """Move a slot to its next fire time. Returns True only for the caller that claimed `fired_ts`."""
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "UPDATE reminder_schedule SET next_fire_ts=? WHERE user_id=? AND slot=? AND next_fire_ts=?",
+        (next_ts, user_id, slot, fired_ts),
+    )
+    claimed = cur.rowcount == 1
+    conn.commit()
+    conn.close()
+    return claimed
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Life OS database maintenance")
+    sub = parser.add_subparsers(dest="command", required=True)
+    streaks_cmd = sub.add_parser("rebuild-streaks", help="recompute streak_state from every stored day")
+    streaks_cmd.add_argument("--user", default=None, help="only this user (default: everyone)")
+    add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    configure_from_args(args)
+    init_db()
+    print(f"{rebuild_streaks(args.user)} streaks rebuilt")
+
+
+if __name__ == "__main__":
+    main()
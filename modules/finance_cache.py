@@ -0,0 +1,119 @@
+"""Process-wide, append-only cache of each user's finance ledger.
+
+The ledger only grows in practice, so a cached frame remembers the highest id
+it holds and each refresh fetches just the rows after it, column-wise
+(database.get_finance_columns), into the configured analytics engine's table
+type (modules/analytics.py). The running aggregates (totals, expenses by
+category, invested per day, monthly flows) are folded forward from the new
+batches alone, and only when one of them is next read. Edits and deletes bump
+finance_version (see database.CHANGE_TRIGGERS); a version change is the only
+thing that makes a frame rebuild from scratch.
+"""
+import threading
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from modules import analytics
+from modules import database as db
+
+KINDS = analytics.KINDS
+
+
+class FinanceFrame:
+    def __init__(self, user_id: str, engine: Optional[str] = None):
+        self.user_id = user_id
+        self.engine = analytics.get_engine(engine)
+        self.version: Optional[int] = None
+        self.rebuilds = 0
+        self.appends = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.max_id = 0
+        self.rows = 0
+        self._batches: List = []       # every loaded batch, concatenated on demand
+        self._pending: List = []       # batches not yet folded into the aggregates
+        self._table = None
+        self._totals: Dict[str, float] = {kind: 0.0 for kind in KINDS}
+        self._by_category = pd.Series(dtype="float64")
+        self._invested_by_day = pd.Series(dtype="float64", index=pd.DatetimeIndex([]))
+        self._monthly = pd.DataFrame(columns=list(KINDS), dtype="float64")
+
+    def refresh(self) -> "FinanceFrame":
+        with self._lock:
+            # Read the version first: an edit that lands after it is caught next time
+            version = db.get_finance_version(user_id=self.user_id)
+            if version != self.version:
+                self._reset()
+                self.version = version
+                self.rebuilds += 1
+            columns = db.get_finance_columns(self.max_id, user_id=self.user_id)
+            if len(columns.ids):
+                batch = self.engine.table(columns)
+                self._batches.append(batch)
+                self._pending.append(batch)
+                self._table = None
+                self.max_id = int(columns.ids[-1])
+                self.rows += len(columns.ids)
+                self.appends += 1
+        return self
+
+    def _fold(self) -> None:
+        """Bring the aggregates up to date with the batches loaded since they were last read."""
+        with self._lock:
+            for batch in self._pending:
+                for kind, amount in self.engine.totals(batch).items():
+                    self._totals[kind] = self._totals.get(kind, 0.0) + amount
+                self._by_category = self._by_category.add(self.engine.expenses_by_category(batch), fill_value=0.0)
+                self._invested_by_day = self._invested_by_day.add(
+                    self.engine.invested_by_day(batch), fill_value=0.0).sort_index()
+                self._monthly = self._monthly.add(self.engine.monthly(batch), fill_value=0.0).fillna(0.0)
+            self._pending = []
+
+    @property
+    def table(self):
+        """The whole ledger in the engine's table type (id, day, category, kind, amount); `day` is a date
+        column, datetime64[ns] in pandas and date32 in Arrow."""
+        with self._lock:
+            if self._table is None:
+                self._table = self.engine.concat(self._batches) if self._batches else None
+                if self._table is not None:
+                    self._batches = [self._table]
+            return self._table
+
+    @property
+    def totals(self) -> Dict[str, float]:
+        self._fold()
+        with self._lock:
+            return dict(self._totals)
+
+    @property
+    def expenses_by_category(self) -> pd.Series:
+        self._fold()
+        return self._by_category[self._by_category > 0].sort_values(ascending=False)
+
+    @property
+    def invested_cumulative(self) -> pd.Series:
+        self._fold()
+        return self._invested_by_day.cumsum()
+
+    @property
+    def monthly(self) -> pd.DataFrame:
+        """Amount per calendar month (PeriodIndex) and kind; months without entries are absent."""
+        self._fold()
+        return self._monthly.sort_index()
+
+
+_frames: Dict[str, FinanceFrame] = {}
+_frames_lock = threading.Lock()
+
+
+def get_frame(user_id: str = db.DEFAULT_USER) -> FinanceFrame:
+    """The user's ledger, brought up to date; when nothing changed that is two indexed lookups."""
+    with _frames_lock:
+        frame = _frames.get(user_id)
+        if frame is None:
+            frame = _frames[user_id] = FinanceFrame(user_id)
+    return frame.refresh()
@@ -0,0 +1,160 @@
+"""Focus timers that survive restarts: a journal of running sessions in the database.
+
+Each user's running timer is one `active_sessions` row, written only when the
+timer is started, paused, resumed or stopped. Nothing is written while it
+runs: elapsed time is derived on read from the seconds run before the current
+stretch plus how long the current stretch has lasted. That comes from the
+monotonic clock when the stretch began on this boot, so wall-clock changes do
+not move the timer, and from the epoch stamp otherwise (after a reboot the
+monotonic clock starts over).
+
+Stopping moves the session into timer_sessions, completed or not, with the
+focus time actually run. On startup recover() deals with sessions left behind
+when the app went down: they keep running unless their time ran out while it
+was down, or they sat paused for longer than STALE_HOURS, and then they are
+recorded as incomplete.
+"""
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+from modules import database as db
+from modules import metrics
+
+DEFAULT_DURATION_MINUTES = 25
+# A paused session untouched for this long is abandoned
+STALE_HOURS = float(os.environ.get("LIFE_OS_TIMER_STALE_HOURS", "12"))
+
+DEFAULT_USER = db.DEFAULT_USER
+
+
+def _timer_counts() -> Dict[tuple, int]:
+    counts = db.count_active_sessions()
+    return {("running",): counts.get(False, 0), ("paused",): counts.get(True, 0)}
+
+
+# Read from the journal at export time, so timers of every process sharing the database count
+metrics.gauge("life_os_focus_timers", "Focus timers in the active_sessions journal by state", ("state",),
+              fn=_timer_counts)
+
+
+@lru_cache(maxsize=None)
+def clock_id() -> str:
+    """Which monotonic clock this process reads: the kernel boot id where there is one, else the
+    boot time to the minute (time.monotonic() counts from boot on Linux, macOS and Windows)."""
+    try:
+        return Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+    except OSError:
+        return f"boot-{round((time.time() - time.monotonic()) / 60)}"
+
+
+def elapsed(session: db.ActiveSession) -> float:
+    """Seconds of focus run so far."""
+    if session.paused:
+        return session.elapsed
+    if session.clock == clock_id():
+        stretch = time.monotonic() - session.resumed_mono
+    else:
+        stretch = time.time() - session.resumed_ts
+    return session.elapsed + max(0.0, stretch)
+
+
+def remaining(session: db.ActiveSession) -> float:
+    return max(0.0, session.duration_minutes * 60 - elapsed(session))
+
+
+def _minutes(seconds: float) -> int:
+    return max(1, round(seconds / 60))
+
+
+def start(subject: str = "General", duration_minutes: int = DEFAULT_DURATION_MINUTES,
+          user_id: str = DEFAULT_USER) -> Optional[db.ActiveSession]:
+    """Start a timer; None if the user already has one running."""
+    now = time.time()
+    session = db.ActiveSession(user_id, subject, int(duration_minutes), now, 0.0, now, time.monotonic(),
+                               clock_id(), now)
+    return session if db.start_active_session(session) else None
+
+
+def pause(user_id: str = DEFAULT_USER) -> Optional[db.ActiveSession]:
+    """Pause the running timer; None if there is none or it is already paused."""
+    session = db.get_active_session(user_id)
+    if session is None or session.paused:
+        return None
+    paused = session._replace(elapsed=elapsed(session), resumed_ts=None, resumed_mono=None, updated_ts=time.time())
+    return paused if db.update_active_session(session, paused) else None
+
+
+def resume(user_id: str = DEFAULT_USER) -> Optional[db.ActiveSession]:
+    """Resume a paused timer; None if there is none or it is not paused."""
+    session = db.get_active_session(user_id)
+    if session is None or not session.paused:
+        return None
+    now = time.time()
+    resumed = session._replace(resumed_ts=now, resumed_mono=time.monotonic(), clock=clock_id(), updated_ts=now)
+    return resumed if db.update_active_session(session, resumed) else None
+
+
+def stop(completed: bool, user_id: str = DEFAULT_USER,
+         session: Optional[db.ActiveSession] = None) -> Optional[db.TimerSession]:
+    """Record the running timer in timer_sessions and clear it. Pass the `session` the caller
+    displayed to stop only that one. None if it was already stopped (by another tab, say)."""
+    session = session or db.get_active_session(user_id)
+    if session is None:
+        return None
+    run = min(elapsed(session), session.duration_minutes * 60)
+    return _close(session, time.time(), run, completed)
+
+
+def _close(session: db.ActiveSession, end_ts: float, run: float, completed: bool) -> Optional[db.TimerSession]:
+    return db.close_active_session(session, end_ts, _minutes(run), 1 if completed else 0)
+
+
+def status(user_id: str = DEFAULT_USER) -> Dict:
+    session = db.get_active_session(user_id)
+    if session is None:
+        return {"running": False}
+    return {"running": True, "paused": session.paused, "start_ts": int(session.start_ts),
+            "subject": session.subject, "duration_minutes": session.duration_minutes,
+            "elapsed_seconds": int(elapsed(session)), "remaining_seconds": int(remaining(session))}
+
+
+# --- Startup ---
+
+_recovered: Set[str] = set()
+_recover_lock = threading.Lock()
+
+
+def recover() -> List[db.TimerSession]:
+    """Close orphaned sessions as incomplete: those whose time ran out and those paused for over
+    STALE_HOURS. Others keep running. Returns what was closed."""
+    now = time.time()
+    closed = []
+    for session in db.get_active_sessions():
+        if session.paused:
+            if now - session.updated_ts < STALE_HOURS * 3600:
+                continue
+            end_ts, run = session.updated_ts, session.elapsed
+        else:
+            if remaining(session) > 0:
+                continue
+            # It ended when the countdown reached zero
+            run = session.duration_minutes * 60
+            end_ts = now - (elapsed(session) - run)
+        recorded = _close(session, end_ts, run, completed=False)
+        if recorded is not None:
+            closed.append(recorded)
+    return closed
+
+
+def recover_once() -> List[db.TimerSession]:
+    """recover() the first time this process sees the configured database."""
+    with _recover_lock:
+        key = str(db.DB_PATH)
+        if key in _recovered:
+            return []
+        _recovered.add(key)
+    return recover()
@@ -0,0 +1,166 @@
+"""Habit history as one boolean array per habit, for heatmaps and streak maths.
+
+A HabitCalendar holds a (habits x days) bool matrix covering the last
+CALENDAR_YEARS calendar years up to today, loaded with a single query. Built
+calendars are kept per user for the life of the process and patched in place
+through the database's habit listeners, so a rerun never goes back to SQLite for
+history. Those hear about this process's writes as they commit and about other
+processes' (sync, a standalone API) from db.catch_up(), which get_calendar()
+calls; moving the archive cutoff rebuilds the calendar. Everything below works on whole rows at once; nothing
+loops over days in Python.
+"""
+import os
+import threading
+from datetime import date
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from modules import database as db
+
+CALENDAR_YEARS = int(os.environ.get("LIFE_OS_CALENDAR_YEARS", "5"))
+
+# Heatmap colours (RGB) for padding outside the range, a missed day and a completed day
+PAD_COLOUR = (255, 255, 255)
+MISS_COLOUR = (235, 237, 240)
+DONE_COLOUR = (48, 161, 78)
+_PALETTE = np.array([PAD_COLOUR, MISS_COLOUR, DONE_COLOUR], dtype=np.uint8)
+
+
+def weekday(days: np.ndarray) -> np.ndarray:
+    """Monday=0 weekday of day numbers (1970-01-01 was a Thursday)."""
+    return (days + 3) % 7
+
+
+class HabitCalendar:
+    def __init__(self, habits: Sequence[str], first_day: int, last_day: int):
+        self.habits: List[str] = list(habits)
+        self.index: Dict[str, int] = {h: i for i, h in enumerate(self.habits)}
+        self.first_day = first_day
+        self.last_day = last_day
+        self.done = np.zeros((len(self.habits), last_day - first_day + 1), dtype=bool)
+        # The archive cutoff the rows were read under; archival elsewhere moves it
+        self.cutoff = db.get_archive_cutoff()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, user_id: str, habits: Sequence[str] = (), years: int = CALENDAR_YEARS,
+             today: Optional[int] = None) -> "HabitCalendar":
+        last = today if today is not None else db.today_day()
+        first = db.to_day(date(db.from_day(last).year - years + 1, 1, 1))
+        rows = db.get_completed_habit_days(first, last, user_id=user_id)
+        names = list(dict.fromkeys(list(habits) + sorted({habit for habit, _ in rows})))
+        calendar = cls(names, first, last)
+        if rows:
+            index = calendar.index
+            habit_idx = np.fromiter((index[habit] for habit, _ in rows), dtype=np.intp, count=len(rows))
+            day_idx = np.fromiter((day for _, day in rows), dtype=np.intp, count=len(rows)) - first
+            calendar.done[habit_idx, day_idx] = True
+        return calendar
+
+    def set(self, habit: str, day: int, status: bool) -> None:
+        if not self.first_day <= day <= self.last_day:
+            return
+        with self._lock:
+            if habit not in self.index:
+                self.index[habit] = len(self.habits)
+                self.habits.append(habit)
+                self.done = np.vstack([self.done, np.zeros((1, self.done.shape[1]), dtype=bool)])
+            self.done[self.index[habit], day - self.first_day] = status
+
+    def row(self, habit: str) -> np.ndarray:
+        return self.done[self.index[habit]]
+
+    # --- Streaks and rates ---
+
+    def current_streaks(self) -> Dict[str, int]:
+        """Completed days in a row ending on the last day, per habit."""
+        missed = ~self.done[:, ::-1]
+        streaks = np.where(missed.any(axis=1), missed.argmax(axis=1), missed.shape[1])
+        return dict(zip(self.habits, streaks.tolist()))
+
+    def longest_streaks(self) -> Dict[str, int]:
+        habits, days = self.done.shape
+        padded = np.zeros((habits, days + 2), dtype=np.int8)
+        padded[:, 1:-1] = self.done
+        edges = np.diff(padded, axis=1)
+        # Row-major order keeps each run's start paired with its own end
+        starts = np.argwhere(edges == 1)
+        ends = np.argwhere(edges == -1)
+        longest = np.zeros(habits, dtype=np.int64)
+        np.maximum.at(longest, starts[:, 0], ends[:, 1] - starts[:, 1])
+        return dict(zip(self.habits, longest.tolist()))
+
+    def weekly_rates(self, weeks: int = 12) -> np.ndarray:
+        """(habits x weeks) completion rate for the last `weeks` Monday-based weeks, the current week
+        counted over the days so far."""
+        offset = int(weekday(np.array(self.first_day)))
+        grid = np.full((self.done.shape[0], offset + self.done.shape[1]), np.nan)
+        grid[:, offset:] = self.done
+        tail = (-grid.shape[1]) % 7
+        grid = np.pad(grid, ((0, 0), (0, tail)), constant_values=np.nan)
+        rates = np.nanmean(grid.reshape(grid.shape[0], -1, 7), axis=2)
+        return rates[:, -weeks:]
+
+    def rolling_average(self, window: int = 7) -> np.ndarray:
+        """(habits x days) share of the trailing `window` days completed, from the window-th day on."""
+        totals = np.cumsum(self.done, axis=1, dtype=np.int32)
+        totals = np.pad(totals, ((0, 0), (1, 0)))
+        return (totals[:, window:] - totals[:, :-window]) / window
+
+    # --- Heatmap ---
+
+    def heatmap(self, habit: str, years: int = CALENDAR_YEARS, cell: int = 10) -> np.ndarray:
+        """RGB image of one habit: a 7 x 53 week grid per calendar year, newest year on top."""
+        last_year = db.from_day(self.last_day).year
+        first_year = max(db.from_day(self.first_day).year, last_year - years + 1)
+        start = db.to_day(date(first_year, 1, 1))
+        days = np.arange(start, self.last_day + 1)
+        years_of = days.astype("datetime64[D]").astype("datetime64[Y]")
+        year_of = years_of.astype(np.int64) + 1970
+        year_start = years_of.astype("datetime64[D]").astype(np.int64)
+        column = (days - year_start + weekday(year_start)) // 7
+
+        # 0 = padding, 1 = missed, 2 = done; one blank row under each year as a gap
+        grid = np.zeros((last_year - first_year + 1, 8, 54), dtype=np.uint8)
+        grid[last_year - year_of, weekday(days), column] = 1 + self.row(habit)[start - self.first_day:]
+        image = _PALETTE[grid.reshape(-1, 54)]
+        return np.repeat(np.repeat(image, cell, axis=0), cell, axis=1)
+
+
+_calendars: Dict[str, HabitCalendar] = {}
+_calendars_lock = threading.Lock()
+
+
+def get_calendar(user_id: str = db.DEFAULT_USER, habits: Sequence[str] = ()) -> HabitCalendar:
+    """The user's cached calendar, brought up to date with other processes' writes; rebuilt once a day
+    rolls over or the archive cutoff moves."""
+    db.catch_up()
+    today = db.today_day()
+    with _calendars_lock:
+        calendar = _calendars.get(user_id)
+    if (calendar is None or calendar.last_day != today or calendar.cutoff != db.get_archive_cutoff()
+            or any(h not in calendar.index for h in habits)):
+        calendar = HabitCalendar.load(user_id, habits, today=today)
+        with _calendars_lock:
+            _calendars[user_id] = calendar
+    return calendar
+
+
+def forget(user_id: Optional[str] = None) -> None:
+    """Drop cached calendars (all of them by default), e.g. after archival or a bulk import."""
+    with _calendars_lock:
+        if user_id is None:
+            _calendars.clear()
+        else:
+            _calendars.pop(user_id, None)
+
+
+def _on_habit_status(user_id: str, day: int, habit: str, status: bool) -> None:
+    with _calendars_lock:
+        calendar = _calendars.get(user_id)
+    if calendar is not None:
+        calendar.set(habit, day, status)
+
+
+db.add_habit_listener(_on_habit_status)
@@ -0,0 +1,178 @@
+"""Undo, redo and past states of task and habit statuses, from the event log.
+
+Every status change made through database.set_task_status(es) /
+set_habit_status(es) appends integer events to status_events in the same
+transaction (see database "Event log"). A write that changed several rows
+(the week grids) is one group, and undo and redo act on whole groups: undo
+writes the inverse of the latest group not yet undone, redo the inverse of the
+latest undo, both through the same set_*_statuses functions with `undoes`
+naming the group they revert, so they are ordinary appended events too. A new
+change after an undo clears the redo stack, as in an editor. Changes synced
+from another device (undoes=database.EXTERNAL) are never undone, and drop the
+local groups that touched the same statuses from both stacks; so do groups
+touching days before the archive cutoff, which can no longer be written.
+
+state() rebuilds a user's completed statuses as of any event from the
+nearest snapshot plus the events after it. Reading the present state snapshots
+it again once more than SNAPSHOT_EVERY events had to be replayed, so replay
+stays short without snapshots on the write path.
+"""
+import os
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from modules import database as db
+
+SNAPSHOT_EVERY = int(os.environ.get("LIFE_OS_SNAPSHOT_EVERY", "500"))
+# Undo and redo look this many of the user's latest events back
+UNDO_WINDOW = int(os.environ.get("LIFE_OS_UNDO_WINDOW", "1000"))
+
+DEFAULT_USER = db.DEFAULT_USER
+
+
+class Change(NamedTuple):
+    seq: int
+    ts: int
+    kind: str       # 'task' or 'habit'
+    category: str   # '' for habits
+    name: str
+    day: int
+    status: int
+
+
+class Group(NamedTuple):
+    id: int                  # seq of its first event
+    undoes: Optional[int]
+    changes: List[Change]
+
+
+# --- Replay ---
+
+def _replay(user_id: str, upto: Optional[int]) -> Tuple[int, Set[int], int]:
+    """(seq reached, state keys, events replayed) as of event `upto` (default the latest)."""
+    seq, keys = db.get_status_snapshot(upto, user_id=user_id)
+    tail = db.get_status_events(user_id, after=seq, upto=upto)
+    for event in tail:
+        key = db.state_key(event.ref, event.day)
+        if event.status:
+            keys.add(key)
+        else:
+            keys.discard(key)
+    return (tail[-1].seq if tail else seq), keys, len(tail)
+
+
+def state(user_id: str = DEFAULT_USER, upto: Optional[int] = None) -> Set[Tuple[str, str, str, int]]:
+    """The user's completed (kind, category, name, day) as of event `upto` (default now)."""
+    seq, keys, replayed = _replay(user_id, upto)
+    if upto is None and replayed > SNAPSHOT_EVERY:
+        db.save_status_snapshot(seq, keys, user_id=user_id)
+    refs = db.get_event_refs(user_id)
+    mask = (1 << db.STATE_DAY_BITS) - 1
+    done = set()
+    for key in keys:
+        ref = refs[key >> db.STATE_DAY_BITS]
+        done.add((ref.kind, ref.category, ref.name, key & mask))
+    return done
+
+
+def snapshot(user_id: str = DEFAULT_USER) -> int:
+    """Snapshot the user's present state; returns the event it is as of."""
+    seq, keys, _replayed = _replay(user_id, None)
+    db.save_status_snapshot(seq, keys, user_id=user_id)
+    return seq
+
+
+def snapshot_all() -> int:
+    """Snapshot every user with events since their latest snapshot; returns how many were taken."""
+    taken = 0
+    for user_id in db.get_event_users():
+        seq, keys, replayed = _replay(user_id, None)
+        if replayed:
+            db.save_status_snapshot(seq, keys, user_id=user_id)
+            taken += 1
+    return taken
+
+
+def changes(user_id: str = DEFAULT_USER, limit: int = 50) -> List[Change]:
+    """The user's latest status changes, newest first."""
+    refs = db.get_event_refs(user_id)
+    return [_change(e, refs) for e in db.get_recent_status_events(limit, user_id=user_id)]
+
+
+def _change(event: db.StatusEvent, refs: Dict[int, db.EventRef]) -> Change:
+    ref = refs[event.ref]
+    return Change(event.seq, event.ts, ref.kind, ref.category, ref.name, event.day, event.status)
+
+
+# --- Undo / redo ---
+
+def stacks(user_id: str = DEFAULT_USER, kind: Optional[str] = None) -> Tuple[List[Group], List[Group]]:
+    """(undo stack, redo stack) of the user's changes, or only those to `kind` ('task' or 'habit'),
+    each with the next group to act on last."""
+    events = db.get_recent_status_events(UNDO_WINDOW, user_id=user_id)
+    refs = db.get_event_refs(user_id)
+    groups: "OrderedDict[int, Group]" = OrderedDict()
+    for event in reversed(events):
+        if kind is not None and refs[event.ref].kind != kind:
+            continue
+        gid = event.grp if event.grp is not None else event.seq
+        if gid not in groups:
+            groups[gid] = Group(gid, event.undoes, [])
+        groups[gid].changes.append(_change(event, refs))
+    if len(events) == UNDO_WINDOW and groups:
+        # The window may have cut the oldest group short
+        groups.popitem(last=False)
+    undo: List[Group] = []
+    redo: List[Group] = []
+    cutoff = db.get_archive_cutoff()
+    for group in groups.values():
+        if group.undoes == db.EXTERNAL:
+            touched = {_status_key(c) for c in group.changes}
+            undo = [g for g in undo if touched.isdisjoint(map(_status_key, g.changes))]
+            redo = [g for g in redo if touched.isdisjoint(map(_status_key, g.changes))]
+        elif cutoff is not None and any(c.day < cutoff for c in group.changes):
+            continue
+        elif group.undoes is None:
+            undo.append(group)
+            redo.clear()
+        elif undo and undo[-1].id == group.undoes:
+            undo.pop()
+            redo.append(group)
+        elif redo and redo[-1].id == group.undoes:
+            redo.pop()
+            undo.append(group)
+        else:
+            # Reverts something outside the window: a fresh change as far as the stacks go
+            undo.append(group)
+            redo.clear()
+    return undo, redo
+
+
+def _status_key(change: Change) -> Tuple[str, str, str, int]:
+    return change.kind, change.category, change.name, change.day
+
+
+def _revert(group: Group, user_id: str) -> List[Change]:
+    """Write the inverse of `group`; empty if that changed no row (nothing was logged, so the stacks stay put)."""
+    inverse = [c._replace(status=1 - c.status) for c in group.changes]
+    if inverse[0].kind == "task":
+        changed = db.set_task_statuses([(c.day, c.name, c.category, c.status) for c in inverse], user_id=user_id,
+                                       undoes=group.id)
+    else:
+        changed = db.set_habit_statuses([(c.day, c.name, c.status) for c in inverse], user_id=user_id,
+                                        undoes=group.id)
+    return inverse if changed else []
+
+
+def undo(user_id: str = DEFAULT_USER, kind: Optional[str] = None) -> List[Change]:
+    """Revert the latest change (to `kind`) not yet undone; returns the statuses written, empty if
+    there was nothing to undo."""
+    undo_stack, _redo = stacks(user_id, kind)
+    return _revert(undo_stack[-1], user_id) if undo_stack else []
+
+
+def redo(user_id: str = DEFAULT_USER, kind: Optional[str] = None) -> List[Change]:
+    """Revert the latest undo (of a change to `kind`); returns the statuses written, empty if there
+    was nothing to redo."""
+    _undo, redo_stack = stacks(user_id, kind)
+    return _revert(redo_stack[-1], user_id) if redo_stack else []
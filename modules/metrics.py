@@ -0,0 +1,299 @@
+"""Process metrics in the Prometheus text format, with no dependencies.
+
+Counters, gauges and histograms live in one registry per process and are
+registered by the code they measure: rerun time per view (main.py), query time
+and connection opens (database.py), servo writes (views/timer.py), the
+focus timers in the journal (focus_timer.py) and prefetch cache hits and
+misses (prefetch.py). Registering is idempotent, so a
+script that reruns gets the same metric back every time.
+
+Nothing is exported unless asked for:
+
+    LIFE_OS_METRICS_PORT=9464   serve GET /metrics on LIFE_OS_METRICS_HOST (default 127.0.0.1)
+    LIFE_OS_METRICS_FILE=path   rewrite the file every LIFE_OS_METRICS_INTERVAL seconds (default 15),
+                                atomically, e.g. for node_exporter's textfile collector
+
+LIFE_OS_METRICS=0 turns the instrumentation itself off: counters, gauges and
+histograms stay at zero and connections are plain sqlite3 ones. Metrics are per
+process: the API run on its own (python -m modules.api) exports its own.
+"""
+import bisect
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+ENABLED = os.environ.get("LIFE_OS_METRICS", "1") != "0"
+METRICS_HOST = os.environ.get("LIFE_OS_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("LIFE_OS_METRICS_PORT", "0") or 0)
+METRICS_FILE = os.environ.get("LIFE_OS_METRICS_FILE", "")
+METRICS_INTERVAL = float(os.environ.get("LIFE_OS_METRICS_INTERVAL", "15"))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; from a cached page read up to a slow first load
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str):
+        """The series for these label values, created on first use; keep it to skip the lookup."""
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} takes labels {self.label_names}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._child())
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def _selector(self, values: LabelValues, extra: str = "") -> str:
+        pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._samples(values, child))
+        return lines
+
+    def _samples(self, values: LabelValues, child) -> List[str]:
+        return [f"{self.name}{self._selector(values)} {_format(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        if not ENABLED:
+            return
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        if not ENABLED:
+            return
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        if not ENABLED:
+            return
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """A value set by the code, or read from `fn` on every export: a number, or {label values: number}."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (),
+                 fn: Optional[Callable[[], Union[float, Dict[LabelValues, float]]]] = None):
+        super().__init__(name, help, labels)
+        self.fn = fn
+
+    def _child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def render(self) -> List[str]:
+        if self.fn is not None:
+            try:
+                read = self.fn()
+            except Exception:
+                # A failing probe leaves the last values in place rather than breaking the export
+                read = {}
+            for values, value in (read.items() if isinstance(read, dict) else [((), read)]):
+                self.labels(*values).set(value)
+        return super().render()
+
+
+class _Buckets:
+    __slots__ = ("counts", "sum", "_lock")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.bounds = tuple(sorted(buckets))
+
+    def _child(self) -> _Buckets:
+        return _Buckets(len(self.bounds) + 1)
+
+    def observe(self, value: float, child: Optional[_Buckets] = None) -> None:
+        if not ENABLED:
+            return
+        child = child or self.labels()
+        index = bisect.bisect_left(self.bounds, value)
+        with child._lock:
+            child.counts[index] += 1
+            child.sum += value
+
+    def _samples(self, values: LabelValues, child: _Buckets) -> List[str]:
+        with child._lock:
+            counts, total = list(child.counts), child.sum
+        lines, cumulative = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="%s"' % _format(bound)
+            lines.append(f"{self.name}_bucket{self._selector(values, le)} {cumulative}")
+        lines.append(f"{self.name}_sum{self._selector(values)} {_format(total)}")
+        lines.append(f"{self.name}_count{self._selector(values)} {cumulative}")
+        return lines
+
+
+class Timed:
+    """`with Timed(histogram, child):` observes the block's duration, also when it raises
+    (st.rerun() leaves a view by raising). Pass `start` to count from an earlier perf_counter()."""
+    __slots__ = ("histogram", "child", "start")
+
+    def __init__(self, histogram: Histogram, child: Optional[_Buckets] = None, start: Optional[float] = None):
+        self.histogram, self.child, self.start = histogram, child, start
+
+    def __enter__(self) -> "Timed":
+        if self.start is None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, self.child)
+
+
+# --- Registry ---
+
+_registry: Dict[str, _Metric] = {}
+_registry_lock = threading.Lock()
+
+
+def _register(cls: type, name: str, *args, **kwargs):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = _registry[name] = cls(name, *args, **kwargs)
+        elif not isinstance(metric, cls):
+            raise ValueError(f"{name} is already registered as a {metric.kind}")
+    return metric
+
+
+def counter(name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+    return _register(Counter, name, help, labels)
+
+
+def gauge(name: str, help: str, labels: Sequence[str] = (), fn: Optional[Callable] = None) -> Gauge:
+    return _register(Gauge, name, help, labels, fn)
+
+
+def histogram(name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return _register(Histogram, name, help, labels, buckets)
+
+
+def render() -> str:
+    """Every registered metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+    return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+# --- Export ---
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+def write_file(path: Union[str, Path]) -> None:
+    """Write render() to `path` through a temporary file, so readers never see half of it."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    tmp.write_text(render())
+    os.replace(tmp, path)
+
+
+def _write_forever(path: str, interval: float) -> None:
+    while True:
+        try:
+            write_file(path)
+        except OSError:
+            pass
+        time.sleep(interval)
+
+
+_threads: List[threading.Thread] = []
+_threads_lock = threading.Lock()
+
+
+def start_exporter(host: str = METRICS_HOST, port: int = METRICS_PORT, path: str = METRICS_FILE,
+                   interval: float = METRICS_INTERVAL) -> None:
+    """Serve and/or write the metrics from daemon threads of this process; later calls are no-ops."""
+    with _threads_lock:
+        if _threads or not (port or path):
+            return
+        if port:
+            server = ThreadingHTTPServer((host, port), _Handler)
+            server.daemon_threads = True
+            _threads.append(threading.Thread(target=server.serve_forever, name="life-os-metrics", daemon=True))
+        if path:
+            _threads.append(threading.Thread(target=_write_forever, args=(path, interval),
+                                             name="life-os-metrics-file", daemon=True))
+        for thread in _threads:
+            thread.start()
@@ -0,0 +1,138 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from modules import metrics
+
+# How many days on each side of the selected date to load ahead of time
+PREFETCH_WINDOW = int(os.environ.get("LIFE_OS_PREFETCH_WINDOW", "2"))
+# Worker threads shared by every session in the process
+PREFETCH_WORKERS = int(os.environ.get("LIFE_OS_PREFETCH_WORKERS", "2"))
+# Entries kept per session cache before the least recently used is dropped
+PREFETCH_CACHE_SIZE = int(os.environ.get("LIFE_OS_PREFETCH_CACHE_SIZE", "16"))
+
+# The same counts as PrefetchCache.stats(), summed over every cache of a kind in the process
+LOOKUPS = metrics.counter("life_os_prefetch_lookups_total", "Prefetch cache lookups by cache and result",
+                          ("cache", "result"))
+PREFETCHED = metrics.counter("life_os_prefetch_loads_total", "Values the prefetch pool loaded ahead of time, by cache",
+                             ("cache",))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide prefetch pool, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, PREFETCH_WORKERS), thread_name_prefix="life-os-prefetch")
+    return _executor
+
+
+class PrefetchCache:
+    """Bounded LRU cache whose misses can be filled ahead of time by a worker pool.
+
+    `loader(key)` must be safe to call from a worker thread. Writers call
+    `invalidate(key)` after changing the data behind a key; a load that
+    overlapped an invalidation is never cached or counted as a hit.
+    """
+
+    def __init__(self, loader: Callable[[Hashable], Any], max_entries: int = PREFETCH_CACHE_SIZE,
+                 name: str = "default"):
+        self.loader = loader
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._pending: Dict[Hashable, Future] = {}
+        self._generation: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self._hit, self._miss = LOOKUPS.labels(name, "hit"), LOOKUPS.labels(name, "miss")
+        self._loaded = PREFETCHED.labels(name)
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self._hit.inc()
+                return self._entries[key]
+            future = self._pending.get(key)
+            generation = self._generation.get(key, 0)
+        if future is not None:
+            # Already in flight: waiting is still cheaper than a second load
+            try:
+                value = future.result()
+            except Exception:
+                pass
+            else:
+                with self._lock:
+                    # An invalidation while waiting means the value may predate the write: load again
+                    if self._generation.get(key, 0) == generation:
+                        self.hits += 1
+                        self._hit.inc()
+                        return value
+                    generation = self._generation.get(key, 0)
+        value = self.loader(key)
+        with self._lock:
+            self.misses += 1
+            self._miss.inc()
+            # Not cached if a write landed during the load; the caller still gets what it read
+            if self._generation.get(key, 0) == generation:
+                self._store(key, value)
+        return value
+
+    def prefetch(self, keys: Iterable[Hashable]) -> None:
+        executor = get_executor()
+        submitted = []
+        with self._lock:
+            for key in keys:
+                if key in self._entries or key in self._pending:
+                    continue
+                generation = self._generation.get(key, 0)
+                future = executor.submit(self.loader, key)
+                self._pending[key] = future
+                submitted.append((key, generation, future))
+        # Attached outside the lock: a future that already finished runs its callback inline
+        for key, generation, future in submitted:
+            future.add_done_callback(lambda f, k=key, g=generation: self._on_loaded(k, g, f))
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._pending.pop(key, None)
+            self._generation[key] = self._generation.get(key, 0) + 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "prefetched": self.prefetched,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _on_loaded(self, key: Hashable, generation: int, future: Future) -> None:
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+            # Drop results that raced with a write to the same key
+            if future.cancelled() or future.exception() is not None:
+                return
+            if self._generation.get(key, 0) != generation:
+                return
+            self.prefetched += 1
+            self._loaded.inc()
+            self._store(key, future.result())
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
@@ -0,0 +1,160 @@
+"""Monte Carlo projection of invested wealth from the user's own cash flows.
+
+observed_flows() reads monthly income, expense and investment totals from the
+cached ledger's monthly aggregate (modules/finance_cache.py). simulate() then
+draws, for every path and year at once:
+
+- the year's income and expenses, as the sum of twelve months drawn from
+  normals fitted to the observed months
+- the year's contribution: the investment rate times income, capped at
+  what is left after expenses
+- a lognormal market return
+
+Contributions arrive through the year, so each earns half of its year's
+log return. With L the running sum of log returns, wealth after year t is
+exp(L_t) * (W0 + sum over k <= t of C_k * exp(g_k / 2 - L_k)): two cumsums
+over the year axis, so nothing loops over paths or years in Python. Paths
+are simulated in blocks, which bounds the working arrays of a draw to
+BLOCK_PATHS columns; goal hits are counted per block. The year-end wealth of
+every path is still kept, (years + 1) x paths float32, since the percentiles
+need all of it.
+
+Results are cached by a hash of every input, seed included, so a rerun with
+the same ledger and settings costs a dict lookup.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+PROJECTION_PATHS = int(os.environ.get("LIFE_OS_PROJECTION_PATHS", "100000"))
+# Paths per block; a block's working arrays are BLOCK_PATHS x years float32
+BLOCK_PATHS = int(os.environ.get("LIFE_OS_PROJECTION_BLOCK", "65536"))
+CACHE_SIZE = 32
+PERCENTILES = (5, 25, 50, 75, 95)
+# Nifty 50-like defaults: long-run annual return and volatility
+DEFAULT_RETURN = 0.12
+DEFAULT_VOLATILITY = 0.18
+
+
+class Flows(NamedTuple):
+    months: int
+    income_mean: float
+    income_sd: float
+    expense_mean: float
+    expense_sd: float
+    invest_rate: float
+    balance: float
+
+
+class Projection(NamedTuple):
+    key: str
+    years: np.ndarray                     # 0..horizon
+    bands: Dict[int, np.ndarray]          # percentile -> wealth at each year end
+    goal_by_year: Dict[float, np.ndarray]  # goal -> share of paths at or above it by each year
+    paths: int
+    elapsed_ms: float
+
+    def goal_probability(self, goal: float) -> float:
+        return float(self.goal_by_year[goal][-1])
+
+
+def observed_flows(monthly: pd.DataFrame, balance: float, months: int = 12) -> Flows:
+    """Monthly flow statistics over the last `months` calendar months with entries (gaps count as zero).
+    `monthly` is amount per month and kind, as finance_cache.FinanceFrame.monthly."""
+    if monthly.empty:
+        return Flows(0, 0.0, 0.0, 0.0, 0.0, 0.0, balance)
+    monthly = monthly.reindex(columns=["Income", "Expense", "Invest"], fill_value=0.0)
+    span = pd.period_range(monthly.index.min(), monthly.index.max(), freq="M")
+    monthly = monthly.reindex(span, fill_value=0.0).tail(months)
+    income = monthly["Income"]
+    rate = monthly["Invest"].sum() / income.sum() if income.sum() > 0 else 0.0
+    sd = (lambda s: float(s.std(ddof=1)) if len(s) > 1 else 0.0)
+    return Flows(len(monthly), float(income.mean()), sd(income), float(monthly["Expense"].mean()),
+                 sd(monthly["Expense"]), float(rate), float(balance))
+
+
+def _simulate_block(rng: np.random.Generator, wealth: np.ndarray, flows: Flows, rate: float,
+                    annual_return: float, volatility: float) -> None:
+    """Fill `wealth`, (years + 1) x paths, with the wealth at each year end of one block of paths;
+    row 0 is today."""
+    # Year-major so the cumsums and the percentiles walk contiguous memory
+    shape = (wealth.shape[0] - 1, wealth.shape[1])
+    growth = rng.standard_normal(shape, dtype=np.float32)
+    growth *= volatility
+    growth += np.log1p(annual_return) - volatility ** 2 / 2       # g_k
+    log_wealth = np.cumsum(growth, axis=0)                          # L_k
+
+    # Twelve independent months: the year's sum has 12x the mean and sqrt(12)x the spread
+    income = rng.standard_normal(shape, dtype=np.float32)
+    income *= np.sqrt(12) * flows.income_sd
+    income += 12 * flows.income_mean
+    np.maximum(income, 0, out=income)
+    surplus = rng.standard_normal(shape, dtype=np.float32)
+    surplus *= -np.sqrt(12) * flows.expense_sd
+    surplus -= 12 * flows.expense_mean
+    surplus += income                                               # income - expenses
+    np.maximum(surplus, 0, out=surplus)
+    income *= rate
+    contribution = np.minimum(income, surplus, out=income)
+
+    growth *= 0.5
+    growth -= log_wealth
+    contribution *= np.exp(growth)                                  # C_k * exp(g_k / 2 - L_k)
+    wealth[0] = flows.balance
+    np.cumsum(contribution, axis=0, out=wealth[1:])
+    wealth[1:] += flows.balance
+    wealth[1:] *= np.exp(log_wealth)
+
+
+def cache_key(flows: Flows, years: int, rate: float, annual_return: float, volatility: float,
+              goals: Sequence[float], paths: int, seed: int) -> str:
+    payload = json.dumps([list(flows), years, rate, annual_return, volatility, sorted(goals), paths, seed])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+_cache: "OrderedDict[str, Projection]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def simulate(flows: Flows, years: int = 30, rate: float = None, annual_return: float = DEFAULT_RETURN,
+             volatility: float = DEFAULT_VOLATILITY, goals: Sequence[float] = (), paths: int = PROJECTION_PATHS,
+             seed: int = 0) -> Projection:
+    """Percentile bands of year-end wealth and goal probabilities; `rate` defaults to the observed rate."""
+    rate = flows.invest_rate if rate is None else rate
+    key = cache_key(flows, years, rate, annual_return, volatility, goals, paths, seed)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    wealth = np.empty((years + 1, paths), dtype=np.float32)
+    hits = {goal: np.zeros(years + 1, dtype=np.int64) for goal in goals}
+    for start in range(0, paths, BLOCK_PATHS):
+        block = wealth[:, start:start + BLOCK_PATHS]
+        _simulate_block(rng, block, flows, rate, annual_return, volatility)
+        # Reaching a goal in some year counts even if a later crash takes wealth back under it
+        for goal, count in hits.items():
+            count += np.logical_or.accumulate(block >= goal, axis=0).sum(axis=1)
+    bands = dict(zip(PERCENTILES, np.percentile(wealth, PERCENTILES, axis=1).astype(np.float64)))
+    goal_by_year = {goal: count / paths for goal, count in hits.items()}
+    result = Projection(key, np.arange(years + 1), bands, goal_by_year, paths, 1000 * (time.perf_counter() - t0))
+
+    with _cache_lock:
+        _cache[key] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
+
+
+def stats() -> Tuple[int, int]:
+    with _cache_lock:
+        return len(_cache), CACHE_SIZE
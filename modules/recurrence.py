@@ -0,0 +1,247 @@
+"""Recurring tasks and habits: rules stored once, occurrences expanded lazily.
+
+A rule (database.RecurringRule) says what recurs and when: daily, on
+weekdays, or every N days, from a start day until an optional last day.
+Occurrences are never written out. expand() yields them for any date range
+as it is iterated, and a tasks/habits row exists only for an occurrence whose
+status was changed (set_task_status / set_habit_status insert it on the first
+change) or for a one-off task added by hand. A day's list is the occurrences
+merged with those rows, so a query over a year reads only rows that carry
+state.
+
+Rules are cached per user for the life of the process; the app's built-in
+rules are seeded once per user with ensure_rules().
+
+    python -m modules.recurrence prune    # drop default-status rows that rules now cover
+"""
+import argparse
+import heapq
+import threading
+from datetime import date, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from modules import database as db
+
+
+class RuleSpec(NamedTuple):
+    """A rule as the views declare it, before it is stored for a user."""
+    name: str
+    start: date
+    until: Optional[date] = None
+    freq: str = "daily"
+    interval: int = 1
+
+
+def weekday(day: int) -> int:
+    """Monday=0 weekday of a day number (1970-01-01 was a Thursday)."""
+    return (day + 3) % 7
+
+
+def occurrences(rule: db.RecurringRule, first: int, last: int) -> Iterator[int]:
+    """Day numbers between first and last inclusive on which the rule falls."""
+    first = max(first, rule.start_day)
+    if rule.until_day is not None:
+        last = min(last, rule.until_day)
+    if first > last:
+        return
+    if rule.freq == "every":
+        # First day on or after `first` that is a whole number of intervals from the start
+        first += -(first - rule.start_day) % rule.interval
+        yield from range(first, last + 1, rule.interval)
+    elif rule.freq == "weekdays":
+        for day in range(first, last + 1):
+            if weekday(day) < 5:
+                yield day
+    else:
+        yield from range(first, last + 1)
+
+
+def expand(rules: Sequence[db.RecurringRule], first: int, last: int) -> Iterator[Tuple[int, db.RecurringRule]]:
+    """(day, rule) for every occurrence in the range, by day and then in rule order."""
+    def stream(i: int) -> Iterator[Tuple[int, int]]:
+        for day in occurrences(rules[i], first, last):
+            yield day, i
+
+    for day, i in heapq.merge(*(stream(i) for i in range(len(rules)))):
+        yield day, rules[i]
+
+
+def occurrence_count(rule: db.RecurringRule, first: int, last: int) -> int:
+    """len(list(occurrences(...))) without walking the days."""
+    first = max(first, rule.start_day)
+    if rule.until_day is not None:
+        last = min(last, rule.until_day)
+    if first > last:
+        return 0
+    if rule.freq == "every":
+        first += -(first - rule.start_day) % rule.interval
+        return len(range(first, last + 1, rule.interval))
+    if rule.freq == "weekdays":
+        weeks, extra = divmod(last - first + 1, 7)
+        return weeks * 5 + sum(1 for day in range(last - extra + 1, last + 1) if weekday(day) < 5)
+    return last - first + 1
+
+
+def count(rules: Sequence[db.RecurringRule], first: int, last: int) -> int:
+    return sum(occurrence_count(rule, first, last) for rule in rules)
+
+
+def rules_from_dates(schedule: Dict[str, Iterable[str]]) -> List[RuleSpec]:
+    """Turn a {date: [names]} plan into daily rules, one per run of consecutive days of the same name."""
+    days: Dict[str, List[date]] = {}
+    for iso, names in schedule.items():
+        for name in names:
+            days.setdefault(name, []).append(date.fromisoformat(iso))
+    specs = []
+    for name, dates in days.items():
+        dates.sort()
+        start = prev = dates[0]
+        for d in dates[1:] + [None]:
+            if d is not None and d - prev == timedelta(days=1):
+                prev = d
+                continue
+            specs.append(RuleSpec(name, start, prev))
+            if d is not None:
+                start = prev = d
+    specs.sort(key=lambda spec: spec.start)
+    return specs
+
+
+# --- Per-user rule cache ---
+
+_rules: Dict[Tuple[str, str], List[db.RecurringRule]] = {}
+_seeded: set = set()
+_lock = threading.Lock()
+
+
+def ensure_rules(user_id: str, kind: str, specs: Sequence[RuleSpec], category: str = "") -> None:
+    """Store the given rules for the user unless already there; after the first call per process this is free."""
+    token = (user_id, kind, category, tuple(specs))
+    with _lock:
+        if token in _seeded:
+            return
+    added = False
+    for spec in specs:
+        added |= db.add_recurring_rule(kind, spec.name, spec.freq, spec.start, spec.until, spec.interval,
+                                       category=category, user_id=user_id)
+    with _lock:
+        _seeded.add(token)
+        if added:
+            _rules.pop((user_id, kind), None)
+
+
+def get_rules(user_id: str, kind: str, category: Optional[str] = None) -> List[db.RecurringRule]:
+    with _lock:
+        rules = _rules.get((user_id, kind))
+    if rules is None:
+        rules = db.get_recurring_rules(kind, user_id=user_id)
+        with _lock:
+            _rules[(user_id, kind)] = rules
+    return rules if category is None else [r for r in rules if r.category == category]
+
+
+def forget(user_id: Optional[str] = None) -> None:
+    """Drop cached rules (all users by default) after rules were changed outside this process."""
+    with _lock:
+        if user_id is None:
+            _rules.clear()
+            _seeded.clear()
+        else:
+            for key in [k for k in _rules if k[0] == user_id]:
+                del _rules[key]
+            _seeded.difference_update({t for t in _seeded if t[0] == user_id})
+
+
+# --- A day's items ---
+
+def day_tasks(user_id: str, day: db.DayLike, category: Optional[str] = None) -> List[db.Task]:
+    """The day's recurring tasks in rule order, then one-off tasks; stored rows supply status and id."""
+    day = db.to_day(day)
+    stored = {(t.task_name, t.category): t for t in db.get_tasks(day, category=category, user_id=user_id)}
+    tasks = []
+    for _, rule in expand(get_rules(user_id, "task", category), day, day):
+        tasks.append(stored.pop((rule.name, rule.category), None) or db.Task(None, day, rule.name, rule.category, 0))
+    return tasks + list(stored.values())
+
+
+def day_habits(user_id: str, day: db.DayLike) -> List[db.Habit]:
+    day = db.to_day(day)
+    stored = {h.habit: h for h in db.get_habits(day, user_id=user_id)}
+    habits = []
+    for _, rule in expand(get_rules(user_id, "habit"), day, day):
+        habits.append(stored.pop(rule.name, None) or db.Habit(None, day, rule.name, 0))
+    return habits + list(stored.values())
+
+
+# --- Pruning materialised occurrences ---
+
+def _occurs_sql(rule: db.RecurringRule) -> Tuple[str, tuple]:
+    sql = "day >= ?"
+    params: tuple = (rule.start_day,)
+    if rule.until_day is not None:
+        sql += " AND day <= ?"
+        params += (rule.until_day,)
+    if rule.freq == "weekdays":
+        sql += " AND (day + 3) % 7 < 5"
+    elif rule.freq == "every":
+        sql += " AND (day - ?) % ? = 0"
+        params += (rule.start_day, rule.interval)
+    return sql, params
+
+
+def prune_default_rows() -> Dict[str, int]:
+    """Delete status-0 rows that only restate a rule occurrence (rows the old code inserted for every day).
+    A missing row reads as status 0, so no status changes and the event log needs no entry."""
+    conn = db.get_conn()
+    cur = conn.cursor()
+    deleted = {"tasks": 0, "habits": 0}
+    cur.execute("BEGIN")
+    # Removing a row equal to its default changes nothing for peers; keep it out of the change log
+    cur.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('suspended', '1')")
+    for row in cur.execute("SELECT * FROM recurring_rules").fetchall():
+        rule = db.RecurringRule(*row)
+        occurs, params = _occurs_sql(rule)
+        if rule.kind == "task":
+            cur.execute(
+                f"DELETE FROM tasks WHERE user_id=? AND task_name=? AND category=? AND status=0 AND {occurs}",
+                (rule.user_id, rule.name, rule.category, *params),
+            )
+            deleted["tasks"] += cur.rowcount
+        else:
+            cur.execute(
+                f"DELETE FROM habits WHERE user_id=? AND habit=? AND status=0 AND {occurs}",
+                (rule.user_id, rule.name, *params),
+            )
+            deleted["habits"] += cur.rowcount
+    cur.execute("DELETE FROM sync_state WHERE key='suspended'")
+    conn.commit()
+    conn.close()
+    return deleted
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Recurring task and habit rules")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("prune", help="delete stored occurrences that still have the default status")
+    sub.add_parser("list", help="print every stored rule")
+    db.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    db.configure_from_args(args)
+    db.init_db()
+    if args.command == "prune":
+        deleted = prune_default_rows()
+        print(", ".join(f"{n} {table}" for table, n in deleted.items()) + " rows deleted")
+    else:
+        conn = db.get_conn()
+        for row in conn.execute("SELECT * FROM recurring_rules ORDER BY user_id, kind, start_day"):
+            rule = db.RecurringRule(*row)
+            until = db.from_day(rule.until_day).isoformat() if rule.until_day is not None else "-"
+            every = f" every {rule.interval}" if rule.freq == "every" else ""
+            print(f"{rule.user_id}\t{rule.kind}\t{rule.category or '-'}\t{rule.name}\t{rule.freq}{every}\t"
+                  f"{db.from_day(rule.start_day).isoformat()}..{until}")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
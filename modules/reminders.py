@@ -0,0 +1,154 @@
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import date, datetime, timedelta
+from typing import Deque, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from modules import database as db
+
+# Reminder schedule: slot hour -> (title, message)
+REMINDERS = {
+    8: ("🌅 Morning Reminder", "Time to plan your day! Enter all your tasks for today."),
+    14: ("☀️ Afternoon Check-in", "You're halfway through the day! Complete 2-3 tasks now."),
+    18: ("🌆 Evening Reminder", "Finish another task before dinner. You're doing great!"),
+    21: ("🌙 Night Review", "How many tasks did you complete today? Time to review your progress!"),
+}
+
+# A reminder stays deliverable for the rest of its hour, like the old per-rerun check
+SLOT_WINDOW_SECONDS = 3600
+# A slot whose database update failed (e.g. "database is locked") is retried after this long
+RETRY_SECONDS = 30
+
+DEFAULT_USER = db.DEFAULT_USER
+
+log = logging.getLogger(__name__)
+
+
+class Reminder(NamedTuple):
+    slot: int
+    title: str
+    message: str
+    expires_at: int
+
+
+def _slot_start(day: date, slot: int) -> int:
+    return int(datetime.combine(day, datetime.min.time()).replace(hour=slot).timestamp())
+
+
+def _first_fire(slot: int, now: float) -> int:
+    """Today's slot if it is still inside its window, otherwise tomorrow's."""
+    today = date.fromtimestamp(now)
+    start = _slot_start(today, slot)
+    if now < start + SLOT_WINDOW_SECONDS:
+        return start
+    return _slot_start(today + timedelta(days=1), slot)
+
+
+def _next_fire(fired_ts: int, slot: int) -> int:
+    return _slot_start(date.fromtimestamp(fired_ts) + timedelta(days=1), slot)
+
+
+class ReminderScheduler:
+    """Fires each reminder slot once per user into an in-memory queue.
+
+    One daemon thread sleeps until the earliest entry of a min-heap of
+    (next_fire_ts, user_id, slot). The persisted `reminder_schedule` table is
+    advanced with a compare-and-set, so a slot is delivered once per user even
+    across restarts or several server processes. Pages only call `poll()`.
+    """
+
+    def __init__(self, reminders: Optional[Dict[int, Tuple[str, str]]] = None):
+        self.reminders = reminders or REMINDERS
+        self._heap: List[Tuple[int, str, int]] = []
+        self._pending: Dict[str, Deque[Reminder]] = defaultdict(deque)
+        self._users: Set[str] = set()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="life-os-reminders", daemon=True)
+            self._thread.start()
+
+    def subscribe(self, user_id: str = DEFAULT_USER) -> None:
+        """Register a user with the scheduler. Only the first call per user touches the database."""
+        with self._lock:
+            if user_id in self._users:
+                return
+            self._users.add(user_id)
+        now = time.time()
+        db.ensure_reminder_slots(user_id, {slot: _first_fire(slot, now) for slot in self.reminders})
+        with self._lock:
+            for row in db.get_reminder_schedule(user_id):
+                if row["slot"] in self.reminders:
+                    heapq.heappush(self._heap, (row["next_fire_ts"], user_id, row["slot"]))
+        self._wakeup.set()
+
+    def poll(self, user_id: str = DEFAULT_USER) -> List[Reminder]:
+        """Pop the user's pending reminders. Cheap enough to call on every rerun."""
+        if not self._pending.get(user_id):
+            return []
+        now = time.time()
+        with self._lock:
+            queue = self._pending[user_id]
+            due = [r for r in queue if r.expires_at > now]
+            queue.clear()
+        return due
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                now = time.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                timeout = self._heap[0][0] - now if self._heap else None
+            for fire_ts, user_id, slot in due:
+                try:
+                    self._fire(fire_ts, user_id, slot)
+                except Exception:
+                    # The thread serves every user in the process, so one failed slot must not end it.
+                    # The retry's claim fails on purpose and picks the slot up from its persisted time.
+                    log.exception("reminder slot %s for %s failed; retrying in %ss", slot, user_id, RETRY_SECONDS)
+                    with self._lock:
+                        heapq.heappush(self._heap, (int(time.time()) + RETRY_SECONDS, user_id, slot))
+            if due:
+                continue
+            self._wakeup.wait(timeout)
+            self._wakeup.clear()
+
+    def _fire(self, fire_ts: int, user_id: str, slot: int) -> None:
+        next_ts = _next_fire(fire_ts, slot)
+        expires_at = fire_ts + SLOT_WINDOW_SECONDS
+        # Slots missed while the server was down are skipped, not replayed
+        while next_ts + SLOT_WINDOW_SECONDS <= time.time():
+            next_ts = _next_fire(next_ts, slot)
+        claimed = db.advance_reminder(user_id, slot, fire_ts, next_ts)
+        if not claimed:
+            # Another process moved this slot first; follow the persisted time
+            stored = {row["slot"]: row["next_fire_ts"] for row in db.get_reminder_schedule(user_id)}
+            next_ts = stored.get(slot, next_ts)
+        with self._lock:
+            if claimed and time.time() < expires_at:
+                title, message = self.reminders[slot]
+                self._pending[user_id].append(Reminder(slot, title, message, expires_at))
+            heapq.heappush(self._heap, (next_ts, user_id, slot))
+
+
+_scheduler: Optional[ReminderScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> ReminderScheduler:
+    """Process-wide scheduler shared by all sessions, started on first use."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ReminderScheduler()
+            _scheduler.start()
+    return _scheduler
@@ -0,0 +1,297 @@
+"""Weekly and monthly review reports, written as static HTML and JSON files.
+
+A report covers one user and one period. It shows focus minutes by subject
+and by day, habit adherence, spending by category, and the investment rate
+against the 10% rule from the finance page. Jobs run on a process pool. Each
+job reads the period's rows and hashes them together with REPORT_VERSION; that
+hash names the cached result. A period whose rows have not changed is copied
+from the cache instead of being computed and rendered again.
+
+Usage:
+
+    python -m modules.reports --period week --from 2026-09-01 --to 2026-10-19
+    python -m modules.reports --period month --all-users --workers 4 --out reports
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from modules import database as db
+from modules import recurrence
+
+# Bump whenever compute() or render_html() changes, so cached reports are not reused
+REPORT_VERSION = 2
+INVESTMENT_GOAL_PCT = 10
+REPORTS_DIR = Path(os.environ.get("LIFE_OS_REPORTS_DIR", "reports"))
+
+# Only the columns a report reads; they are also what the cache key hashes
+_INPUT_SQL = {
+    "timer_sessions": "SELECT day, duration_minutes, completed, subject FROM {src} WHERE user_id=? AND day BETWEEN ? AND ?",
+    "habits": "SELECT day, habit, status FROM {src} WHERE user_id=? AND day BETWEEN ? AND ?",
+    "finance": "SELECT day, category, amount FROM {src} WHERE user_id=? AND day BETWEEN ? AND ?",
+}
+
+
+class Period(NamedTuple):
+    kind: str
+    first: int
+    last: int
+
+    @property
+    def label(self) -> str:
+        start = db.from_day(self.first)
+        if self.kind == "week":
+            year, week, _ = start.isocalendar()
+            return f"{year}-W{week:02d}"
+        if self.kind == "month":
+            return start.strftime("%Y-%m")
+        return f"{start.isoformat()}_{db.from_day(self.last).isoformat()}"
+
+
+def periods(kind: str, start: db.DayLike, end: db.DayLike) -> List[Period]:
+    """Whole weeks (Monday first) or calendar months touching start..end; "range" is the span itself."""
+    first, last = db.from_day(db.to_day(start)), db.from_day(db.to_day(end))
+    if kind == "range":
+        return [Period(kind, db.to_day(first), db.to_day(last))]
+    result = []
+    if kind == "week":
+        cursor = first - timedelta(days=first.weekday())
+        while cursor <= last:
+            result.append(Period(kind, db.to_day(cursor), db.to_day(cursor + timedelta(days=6))))
+            cursor += timedelta(days=7)
+    elif kind == "month":
+        cursor = first.replace(day=1)
+        while cursor <= last:
+            following = (cursor.replace(day=28) + timedelta(days=4)).replace(day=1)
+            result.append(Period(kind, db.to_day(cursor), db.to_day(following) - 1))
+            cursor = following
+    else:
+        raise ValueError(f"Unknown period kind: {kind!r}")
+    return result
+
+
+def get_report_users() -> List[str]:
+    conn = db.get_conn()
+    rows = conn.execute(" UNION ".join(f"SELECT DISTINCT user_id FROM {t}" for t in db.USER_TABLES)).fetchall()
+    conn.close()
+    return sorted(r[0] for r in rows)
+
+
+def load_inputs(user_id: str, period: Period) -> Dict[str, list]:
+    """Every row the report depends on, archived years included."""
+    conn = db.get_conn()
+    conn.row_factory = None
+    try:
+        inputs = {}
+        for table, sql in _INPUT_SQL.items():
+            sources = db.range_sources(conn, table, period.first, period.last)
+            query = " UNION ALL ".join(sql.format(src=src) for src in sources) + " ORDER BY 1, 2"
+            params = (user_id, period.first, period.last) * len(sources)
+            inputs[table] = [list(row) for row in conn.execute(query, params)]
+        # Days each habit was due; only the days whose status changed are stored as rows
+        rules = db.get_recurring_rules("habit", user_id=user_id)
+        inputs["habit_due"] = [[day, rule.name] for day, rule in recurrence.expand(rules, period.first, period.last)]
+        return inputs
+    finally:
+        conn.close()
+
+
+def cache_key(user_id: str, period: Period, inputs: Dict[str, list]) -> str:
+    payload = json.dumps([REPORT_VERSION, user_id, period, inputs], separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def compute(user_id: str, period: Period, inputs: Dict[str, list]) -> Dict:
+    minutes_by_subject: Dict[str, int] = {}
+    minutes_by_day: Dict[str, int] = {}
+    completed = 0
+    for day, minutes, done, subject in inputs["timer_sessions"]:
+        minutes_by_subject[subject] = minutes_by_subject.get(subject, 0) + minutes
+        iso = db.from_day(day).isoformat()
+        minutes_by_day[iso] = minutes_by_day.get(iso, 0) + minutes
+        completed += 1 if done else 0
+
+    # Adherence is counted over the days a habit was due or tracked, as in the archive rollups
+    habit_days: Dict[str, set] = {}
+    habit_done: Dict[str, set] = {}
+    for day, habit in inputs["habit_due"]:
+        habit_days.setdefault(habit, set()).add(day)
+    for day, habit, status in inputs["habits"]:
+        habit_days.setdefault(habit, set()).add(day)
+        if status:
+            habit_done.setdefault(habit, set()).add(day)
+    adherence = {
+        habit: {"done": len(habit_done.get(habit, ())), "days": len(days),
+                "rate": round(len(habit_done.get(habit, ())) / len(days), 4)}
+        for habit, days in sorted(habit_days.items())
+    }
+    tracked = sum(a["days"] for a in adherence.values())
+
+    totals = {"Income": 0.0, "Expense": 0.0, "Invest": 0.0}
+    expenses_by_category: Dict[str, float] = {}
+    for _, category, amount in inputs["finance"]:
+        kind = category.split(":", 1)[0]
+        totals[kind] = totals.get(kind, 0.0) + amount
+        if kind == "Expense":
+            expenses_by_category[category] = expenses_by_category.get(category, 0.0) + amount
+    rate = totals["Invest"] / totals["Income"] * 100 if totals["Income"] > 0 else 0.0
+
+    return {
+        "user_id": user_id,
+        "period": {"kind": period.kind, "label": period.label,
+                   "first": db.from_day(period.first).isoformat(), "last": db.from_day(period.last).isoformat()},
+        "focus": {
+            "total_minutes": sum(minutes_by_subject.values()),
+            "sessions": len(inputs["timer_sessions"]),
+            "completed_sessions": completed,
+            "minutes_by_subject": dict(sorted(minutes_by_subject.items(), key=lambda kv: -kv[1])),
+            "minutes_by_day": dict(sorted(minutes_by_day.items())),
+        },
+        "habits": {
+            "adherence": adherence,
+            "overall_rate": round(sum(a["done"] for a in adherence.values()) / tracked, 4) if tracked else 0.0,
+        },
+        "finance": {
+            "income": round(totals["Income"], 2),
+            "expenses": round(totals["Expense"], 2),
+            "invested": round(totals["Invest"], 2),
+            "investment_rate_pct": round(rate, 2),
+            "goal_pct": INVESTMENT_GOAL_PCT,
+            "goal_met": rate >= INVESTMENT_GOAL_PCT,
+            "expenses_by_category": {k: round(v, 2) for k, v in sorted(expenses_by_category.items(), key=lambda kv: -kv[1])},
+        },
+    }
+
+
+def render_html(summary: Dict, plotlyjs="cdn") -> str:
+    """Standalone page for one summary; plotlyjs is "cdn" or True to inline plotly.js."""
+    import plotly.graph_objects as go
+
+    def figure(trace, title: str, **layout) -> "go.Figure":
+        # graph_objects directly: plotly.express costs tens of ms per figure
+        return go.Figure(trace, layout=dict(title=title, margin=dict(t=50, b=40), **layout))
+
+    charts = []
+    focus, habits, finance = summary["focus"], summary["habits"], summary["finance"]
+    if focus["minutes_by_subject"]:
+        subjects = focus["minutes_by_subject"]
+        charts.append(figure(go.Bar(x=list(subjects), y=list(subjects.values())), "Focus by subject", yaxis_title="Minutes"))
+        days = focus["minutes_by_day"]
+        charts.append(figure(go.Bar(x=list(days), y=list(days.values())), "Focus by day", yaxis_title="Minutes"))
+    if habits["adherence"]:
+        rates = {h: a["rate"] * 100 for h, a in habits["adherence"].items()}
+        charts.append(figure(go.Bar(x=list(rates.values()), y=list(rates), orientation="h"), "Habit adherence",
+                             xaxis=dict(title="% of tracked days", range=[0, 100])))
+    if finance["expenses_by_category"]:
+        spent = finance["expenses_by_category"]
+        charts.append(figure(go.Pie(labels=list(spent), values=list(spent.values()), hole=0.5), "Where the money went"))
+    chart_html = "\n".join(
+        fig.to_html(full_html=False, include_plotlyjs=plotlyjs if i == 0 else False) for i, fig in enumerate(charts)
+    )
+
+    period = summary["period"]
+    goal = "met" if finance["goal_met"] else "not met"
+    title = html.escape(f"{summary['user_id']} · {period['label']}")
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Life OS review · {title}</title>
+<style>body{{font-family:-apple-system,Segoe UI,sans-serif;max-width:960px;margin:2rem auto;color:#1d1d1f}}
+.stats{{display:flex;gap:1rem;flex-wrap:wrap}}.stat{{background:#f5f5f7;border-radius:12px;padding:1rem;min-width:160px}}
+.stat b{{display:block;font-size:1.6rem}}</style></head>
+<body><h1>Review · {title}</h1><p>{period['first']} to {period['last']}</p>
+<div class="stats">
+<div class="stat"><b>{focus['total_minutes']}m</b>focus in {focus['sessions']} sessions ({focus['completed_sessions']} completed)</div>
+<div class="stat"><b>{habits['overall_rate'] * 100:.0f}%</b>habit adherence</div>
+<div class="stat"><b>{finance['expenses']:.2f}</b>spent of {finance['income']:.2f} income</div>
+<div class="stat"><b>{finance['investment_rate_pct']:.1f}%</b>invested, {finance['goal_pct']}% goal {goal}</div>
+</div>
+{chart_html or "<p>No activity in this period.</p>"}
+</body></html>
+"""
+
+
+def _init_worker(db_path: str, pragmas: Dict[str, str], archive_cutoff: Optional[int]) -> None:
+    db.configure(db_path, pragmas)
+    db.set_archive_cutoff(archive_cutoff)
+
+
+def build_report(user_id: str, period: Period, out_dir: Path, cache_dir: Path, plotlyjs="cdn") -> Tuple[str, bool]:
+    """Write out_dir/<user>/<label>.{json,html}; returns (cache key, whether it was a cache hit)."""
+    inputs = load_inputs(user_id, period)
+    key = cache_key(user_id, period, inputs)
+    cached_json, cached_html = cache_dir / f"{key}.json", cache_dir / f"{key}.html"
+    hit = cached_json.exists() and cached_html.exists()
+    if not hit:
+        summary = compute(user_id, period, inputs)
+        # Written under a temporary name first so a concurrent job never reads half a file
+        for path, text in ((cached_json, json.dumps(summary, indent=2)), (cached_html, render_html(summary, plotlyjs))):
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(text, encoding="utf-8")
+            os.replace(tmp, path)
+    target = out_dir / user_id
+    target.mkdir(parents=True, exist_ok=True)
+    shutil.copyfile(cached_json, target / f"{period.label}.json")
+    shutil.copyfile(cached_html, target / f"{period.label}.html")
+    return key, hit
+
+
+def _build_job(job: tuple) -> Tuple[str, str, str, bool]:
+    user_id, period, out_dir, cache_dir, plotlyjs = job
+    key, hit = build_report(user_id, period, out_dir, cache_dir, plotlyjs)
+    return user_id, period.label, key, hit
+
+
+def generate(user_ids: Sequence[str], report_periods: Sequence[Period], out_dir: Path = REPORTS_DIR,
+             workers: Optional[int] = None, plotlyjs="cdn") -> List[Tuple[str, str, str, bool]]:
+    """Build every (user, period) report on a process pool and write an index page."""
+    if db.is_memory():
+        raise ValueError("Reports are built in worker processes, which cannot see an in-memory database")
+    cache_dir = out_dir / ".cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    jobs = [(u, p, out_dir, cache_dir, plotlyjs) for u in user_ids for p in report_periods]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(str(db.DB_PATH), db.PRAGMAS, db.get_archive_cutoff())) as pool:
+        results = list(pool.map(_build_job, jobs, chunksize=max(1, len(jobs) // (4 * (workers or os.cpu_count() or 1)))))
+
+    links = "\n".join(
+        f'<li><a href="{html.escape(u)}/{label}.html">{html.escape(u)} · {label}</a></li>' for u, label, _, _ in results
+    )
+    (out_dir / "index.html").write_text(
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Life OS reviews</title></head>'
+        f"<body><h1>Reviews</h1><ul>\n{links}\n</ul></body></html>\n",
+        encoding="utf-8",
+    )
+    return results
+
+
+def main() -> None:
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Generate Life OS review reports")
+    parser.add_argument("--period", choices=("week", "month", "range"), default="week")
+    parser.add_argument("--from", dest="start", default=(today - timedelta(days=27)).isoformat())
+    parser.add_argument("--to", dest="end", default=today.isoformat())
+    parser.add_argument("--users", default=db.DEFAULT_USER, help="comma-separated user ids")
+    parser.add_argument("--all-users", action="store_true")
+    parser.add_argument("--out", type=Path, default=REPORTS_DIR)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--offline", action="store_true", help="inline plotly.js instead of loading it from the CDN")
+    db.add_arguments(parser)
+    args = parser.parse_args()
+
+    db.configure_from_args(args)
+    db.init_db()
+    user_ids = get_report_users() if args.all_users else [db.normalize_user_id(u) for u in args.users.split(",")]
+    results = generate(user_ids, periods(args.period, args.start, args.end), args.out, args.workers,
+                       True if args.offline else "cdn")
+    hits = sum(1 for *_, hit in results if hit)
+    print(f"{len(results)} reports in {args.out}/ ({hits} from cache, {len(results) - hits} rebuilt)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Full-text search over task names, finance notes and habit names.
+
+Tasks and finance use the external-content FTS5 indexes created by
+database.init_db(). Habits are a handful of names per user, taken from their
+recurrence rules, streaks and archived rollups rather than from habit rows:
+a recurring habit has no rows until it is ticked, and archived years have none
+left in the hot table. They are matched directly. Rows moved to yearly archives
+leave the FTS index with them.
+"""
+import re
+from typing import List, NamedTuple, Optional, Sequence
+
+from modules import database as db
+
+KINDS = ("task", "finance", "habit")
+PAGE_SIZE = 20
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_TASK_SQL = """
+    SELECT t.id, t.day, highlight(tasks_fts, 0, '**', '**'), t.category, t.status, bm25(tasks_fts, 1.0, 0.0) AS score
+    FROM tasks_fts JOIN tasks t ON t.id = tasks_fts.rowid
+    WHERE tasks_fts MATCH ? AND t.user_id = ?
+    ORDER BY score LIMIT ?
+"""
+
+_FINANCE_SQL = """
+    SELECT f.id, f.day, highlight(finance_fts, 0, '**', '**'), f.category, f.amount, bm25(finance_fts, 1.0, 0.5, 0.0) AS score
+    FROM finance_fts JOIN finance f ON f.id = finance_fts.rowid
+    WHERE finance_fts MATCH ? AND f.user_id = ?
+    ORDER BY score LIMIT ?
+"""
+
+_HABIT_NAMES_SQL = """
+    SELECT name FROM recurring_rules WHERE user_id = :user AND kind = 'habit'
+    UNION SELECT key FROM streak_state WHERE user_id = :user AND kind = 'habit'
+    UNION SELECT key FROM archive_rollups WHERE user_id = :user AND kind = 'habit'
+"""
+
+# Latest completed day and completed days, hot and archived; only run for names that matched
+_HABIT_STATS_SQL = """
+    SELECT (SELECT last_day FROM streak_state WHERE user_id = :user AND kind = 'habit' AND key = :habit),
+           (SELECT COUNT(*) FROM habits WHERE user_id = :user AND habit = :habit AND status = 1)
+           + (SELECT COALESCE(SUM(done), 0) FROM archive_rollups WHERE user_id = :user AND kind = 'habit' AND key = :habit)
+"""
+
+
+class SearchHit(NamedTuple):
+    kind: str
+    id: Optional[int]
+    day: Optional[int]
+    title: str
+    detail: str
+    amount: Optional[float]
+    rank: float
+
+    @property
+    def date(self) -> Optional[str]:
+        return db.from_day(self.day).isoformat() if self.day is not None else None
+
+
+class SearchPage(NamedTuple):
+    hits: List[SearchHit]
+    page: int
+    has_more: bool
+
+
+def build_match(query: str, text_columns: str, user_id: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match one of `text_columns` as a prefix,
+    and the row must belong to `user_id`."""
+    words = _WORD.findall(query.lower())
+    if not words:
+        return None
+    terms = " ".join(f'"{w}"*' for w in words)
+    owner = '"' + user_id.replace('"', '""') + '"'
+    return f"user_id : {owner} AND {{{text_columns}}} : ({terms})"
+
+
+def _habit_hits(conn, words: List[str], user_id: str) -> List[SearchHit]:
+    hits = []
+    for (habit,) in conn.execute(_HABIT_NAMES_SQL, {"user": user_id}).fetchall():
+        name_words = _WORD.findall(habit.lower())
+        if all(any(n.startswith(w) for n in name_words) for w in words):
+            last_day, done = conn.execute(_HABIT_STATS_SQL, {"user": user_id, "habit": habit}).fetchone()
+            # Few and exact, so they rank above text matches
+            hits.append(SearchHit("habit", None, last_day, f"**{habit}**", f"{done} days completed", None, float("-inf")))
+    return hits
+
+
+def search(query: str, user_id: str = db.DEFAULT_USER, kinds: Sequence[str] = KINDS,
+           page: int = 0, page_size: int = PAGE_SIZE) -> SearchPage:
+    """Ranked results for `query` (best first), one page at a time."""
+    if not _WORD.search(query):
+        return SearchPage([], page, False)
+    # Each source returns its best `want` rows; merging them gives the first `want` overall
+    want = (page + 1) * page_size + 1
+    hits: List[SearchHit] = []
+    conn = db.get_conn()
+    conn.row_factory = None
+    try:
+        if "task" in kinds:
+            match = build_match(query, "task_name", user_id)
+            for id_, day, title, category, status, score in conn.execute(_TASK_SQL, (match, user_id, want)):
+                detail = f"{category} · {'done' if status else 'open'}"
+                hits.append(SearchHit("task", id_, day, title, detail, None, score))
+        if "finance" in kinds:
+            match = build_match(query, "note category", user_id)
+            for id_, day, note, category, amount, score in conn.execute(_FINANCE_SQL, (match, user_id, want)):
+                hits.append(SearchHit("finance", id_, day, note or category, category, amount, score))
+        if "habit" in kinds:
+            hits.extend(_habit_hits(conn, _WORD.findall(query.lower()), user_id))
+    finally:
+        conn.close()
+    hits.sort(key=lambda h: h.rank)
+    start = page * page_size
+    return SearchPage(hits[start:start + page_size], page, len(hits) > start + page_size)
@@ -0,0 +1,134 @@
+"""Bounded per-session widget keys: namespaced, grouped by scope, evicted LRU.
+
+Views that render one widget per item per date would otherwise mint a new
+session-state key for every date ever shown. Here a view asks for its keys
+through key(state, namespace, scope, name), which returns
+"namespace:scope:name" and records the key under its scope (the date on
+screen). Each namespace keeps its MAX_SCOPES most recently used scopes; when
+another scope is touched the least recently used one is evicted and all of
+its keys are deleted.
+
+Evicted keys are deleted through the state's public mapping interface only
+(del st.session_state[key]). A widget not rendered in a run has already had
+its value dropped by Streamlit; only Streamlit's own small key -> widget id
+entry is left of it, which no public API removes.
+
+Nothing here imports Streamlit at module level: `state` is any mutable
+mapping, st.session_state in the app and a dict in benchmarks.
+"""
+import os
+import sys
+import threading
+import types
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Any, Dict, Hashable, MutableMapping, NamedTuple, Set
+
+# Scopes (dates) per namespace whose widget keys are kept
+MAX_SCOPES = int(os.environ.get("LIFE_OS_STATE_SCOPES", "4"))
+REGISTRY_KEY = "_scoped_keys"
+SESSION_KEY = "_session"
+SEPARATOR = ":"
+
+
+class StateSize(NamedTuple):
+    keys: int
+    bytes: int
+    by_namespace: Dict[str, int]   # namespace (or unscoped key) -> bytes
+
+
+def _registry(state: MutableMapping) -> Dict[str, "OrderedDict[str, Set[str]]"]:
+    if REGISTRY_KEY not in state:
+        state[REGISTRY_KEY] = {}
+    return state[REGISTRY_KEY]
+
+
+def key(state: MutableMapping, namespace: str, scope: Hashable, name: Hashable) -> str:
+    """The session-state key for `name` under `scope`, marking the scope most recently used."""
+    scopes = _registry(state).setdefault(namespace, OrderedDict())
+    scope = str(scope)
+    full = f"{namespace}{SEPARATOR}{scope}{SEPARATOR}{name}"
+    if scope in scopes:
+        scopes.move_to_end(scope)
+    else:
+        scopes[scope] = set()
+        while len(scopes) > MAX_SCOPES:
+            _, stale = scopes.popitem(last=False)
+            evict(state, stale)
+    scopes[scope].add(full)
+    return full
+
+
+def reset(state: MutableMapping, namespace: str) -> None:
+    """Evict every scope of `namespace`, so its widgets start again from the values they are given."""
+    for keys in _registry(state).pop(namespace, {}).values():
+        evict(state, keys)
+
+
+def evict(state: MutableMapping, keys: Set[str]) -> None:
+    for k in keys:
+        if k in state:
+            del state[k]
+
+
+# --- Live sessions ---
+
+class _Session:
+    """Held only by one session's state, so it is collected when Streamlit drops that session."""
+
+
+_sessions: "weakref.WeakSet[_Session]" = weakref.WeakSet()
+_sessions_lock = threading.Lock()
+
+
+def track(state: MutableMapping) -> None:
+    """Count the session owning `state` in live_sessions(); call on every run."""
+    if SESSION_KEY not in state:
+        session = state[SESSION_KEY] = _Session()
+        with _sessions_lock:
+            _sessions.add(session)
+
+
+def live_sessions() -> int:
+    """Sessions of this process whose state is still held."""
+    with _sessions_lock:
+        return len(_sessions)
+
+
+# --- Size report ---
+
+# Shared infrastructure a value may point at but does not own
+_OPAQUE = (type, types.ModuleType, types.FunctionType, types.MethodType, types.BuiltinFunctionType,
+           Executor, threading.Thread, type(threading.Lock()), type(threading.RLock()))
+
+
+def _deep_size(obj: Any, seen: Set[int]) -> int:
+    if id(obj) in seen or isinstance(obj, _OPAQUE):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_deep_size(k, seen) + _deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(_deep_size(v, seen) for v in obj)
+    elif hasattr(obj, "__dict__") and type(obj).__sizeof__ is object.__sizeof__:
+        # Objects that size themselves (DataFrames, arrays) already include what they hold
+        size += _deep_size(vars(obj), seen)
+    return size
+
+
+def size(state: MutableMapping) -> StateSize:
+    """Keys and approximate deep size in bytes of everything the session holds."""
+    seen: Set[int] = set()
+    by_namespace: Dict[str, int] = {}
+    count = 0
+    for k in list(state.keys()):
+        try:
+            value = state[k]
+        except KeyError:
+            continue
+        count += 1
+        namespace = k.split(SEPARATOR, 1)[0]
+        by_namespace[namespace] = by_namespace.get(namespace, 0) + _deep_size(k, seen) + _deep_size(value, seen)
+    return StateSize(count, sum(by_namespace.values()), by_namespace)
@@ -0,0 +1,331 @@
+"""Delta sync between two copies of life_os.db, e.g. a laptop and a phone.
+
+Every database keeps an ordered change_log, filled by triggers (see
+database.SYNC_TRIGGERS), and a random device id. A peer that has already seen
+this device's changes up to some seq only asks for the entries after it, so
+a day of use transfers a few kilobytes instead of the whole file.
+
+Conflicts:
+- tasks and habits rows are matched by their natural key. Status changes
+  are last-writer-wins: one only applies when it is newer than the last
+  local status change of that row, ties broken by device id. A recurring
+  occurrence's first change arrives as an insert carrying the new status;
+  an insert with the default status (a custom task, or a row materialised
+  by older versions) never overrides a row that already exists.
+- finance and timer_sessions rows are matched by sync_key. Inserting one
+  twice is a no-op; edits and deletes are last-writer-wins against any local
+  change to that row.
+- Changes to days that are already archived locally are skipped.
+- Applied task and habit statuses go into the event log as EXTERNAL groups
+  (see database "Event log"): history sees them, and undo here never
+  reverts them or the local changes they overwrote.
+
+"Newer" compares the writing devices' clocks, so keep them roughly right.
+A database copied from another device must run `reset-device` before its
+first sync; otherwise both copies share an id and ignore each other's
+changes. Task rows and habit statuses applied to this process's database
+reach its task and habit listeners (database.add_task_listener /
+add_habit_listener), so in-process caches such as the habit calendar and
+the Academics task cache stay current.
+
+    python -m modules.sync sync other_copy.db
+    python -m modules.sync export --since 120 --out changes.json.gz
+    python -m modules.sync apply changes.json.gz
+    python -m modules.sync reset-device
+"""
+import argparse
+import gzip
+import json
+import sqlite3
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from modules import database as db
+
+def _connect(path: Optional[Path] = None) -> sqlite3.Connection:
+    if path is None:
+        return db.get_conn()
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE name='change_log'").fetchone():
+        conn.close()
+        raise ValueError(f"{path} has no change log; open it with this version of Life OS first")
+    return conn
+
+
+def device_id(conn: Optional[sqlite3.Connection] = None) -> str:
+    own = conn is None
+    conn = conn or _connect()
+    row = conn.execute("SELECT value FROM sync_state WHERE key='device'").fetchone()
+    if own:
+        conn.close()
+    return row[0]
+
+
+def peer_seq(peer: str, conn: Optional[sqlite3.Connection] = None) -> int:
+    """Last change_log seq of `peer` already applied here."""
+    own = conn is None
+    conn = conn or _connect()
+    row = conn.execute("SELECT value FROM sync_state WHERE key=?", (f"peer:{peer}",)).fetchone()
+    if own:
+        conn.close()
+    return int(row[0]) if row else 0
+
+
+def reset_device() -> str:
+    """Give this database a fresh device id, for a file copied from another device."""
+    conn = _connect()
+    conn.execute("UPDATE sync_state SET value=lower(hex(randomblob(8))) WHERE key='device'")
+    conn.commit()
+    new_id = device_id(conn)
+    conn.close()
+    return new_id
+
+
+# --- Export ---
+
+def export_changes(since_seq: int = 0, exclude_origin: Optional[str] = None,
+                   conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+    """Changes after `since_seq`, leaving out those that came from `exclude_origin` (the receiver)."""
+    own = conn is None
+    conn = conn or _connect()
+    rows = conn.execute(
+        "SELECT seq, tbl, op, row_key, data, origin, ts FROM change_log WHERE seq > ? ORDER BY seq",
+        (since_seq,),
+    ).fetchall()
+    payload = {
+        "device": device_id(conn),
+        # The receiver resumes after the last seq scanned, even when that entry was left out
+        "last_seq": rows[-1][0] if rows else since_seq,
+        "changes": [
+            [row[0], row[1], row[2], row[3], json.loads(row[4]) if row[4] is not None else None, row[5], row[6]]
+            for row in rows if row[5] != exclude_origin
+        ],
+    }
+    if own:
+        conn.close()
+    return payload
+
+
+def dumps(payload: Dict[str, Any]) -> bytes:
+    return gzip.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+
+def loads(blob: bytes) -> Dict[str, Any]:
+    return json.loads(gzip.decompress(blob))
+
+
+# --- Apply ---
+
+# Inserts with the default status say nothing about the row's state
+_STATUS_CHANGE = "(op = 'U' OR (op = 'I' AND json_extract(data, '$.status') != 0))"
+
+
+def _newer(cur: sqlite3.Cursor, table: str, row_key: str, ts: int, origin: str, which: str) -> bool:
+    """Whether (ts, origin) beats the latest local change of the row matching `which`."""
+    local = cur.execute(
+        f"SELECT ts, origin FROM change_log WHERE tbl=? AND row_key=? AND {which} ORDER BY seq DESC LIMIT 1",
+        (table, row_key),
+    ).fetchone()
+    return local is None or (ts, origin) > (local[0], local[1])
+
+
+def _status(cur: sqlite3.Cursor, table: str, values: tuple) -> int:
+    """Stored status of a tasks/habits row by natural key; a missing row reads as its default 0."""
+    where = " AND ".join(f"{name}=?" for name in db.SYNC_NATURAL_KEYS[table])
+    row = cur.execute(f"SELECT status FROM {table} WHERE {where}", values).fetchone()
+    return row[0] if row else 0
+
+
+def _log_statuses(cur: sqlite3.Cursor, statuses: Dict[Tuple[str, str], List[Tuple[tuple, int]]]) -> None:
+    """Put the status changes applied from a peer in the event log, one EXTERNAL group per user and kind."""
+    for (user_id, table), changed in statuses.items():
+        if table == "tasks":
+            db.log_external_status_events(cur, user_id, "task", [(day, category, name, status)
+                                                                 for (_u, day, name, category), status in changed])
+        else:
+            db.log_external_status_events(cur, user_id, "habit", [(day, "", habit, status)
+                                                                  for (_u, day, habit), status in changed])
+
+
+def _apply_one(cur: sqlite3.Cursor, table: str, op: str, row_key: str, data: Optional[Dict], origin: str, ts: int,
+               cutoff: int) -> bool:
+    if table in db.SYNC_NATURAL_KEYS:
+        names = db.SYNC_NATURAL_KEYS[table]
+        values = tuple(json.loads(row_key))
+        if table in db.ARCHIVED_TABLES and values[names.index("day")] < cutoff:
+            return False
+        where = " AND ".join(f"{name}=?" for name in names)
+        if op == "I" and not cur.execute(f"SELECT 1 FROM {table} WHERE {where}", values).fetchone():
+            cur.execute(
+                f"INSERT INTO {table} ({', '.join(names)}, status) VALUES ({', '.join('?' * len(names))}, ?)",
+                (*values, data["status"]),
+            )
+            return True
+        if op in ("I", "U"):
+            if (op == "I" and not data["status"]) or not _newer(cur, table, row_key, ts, origin, _STATUS_CHANGE):
+                return False
+            cur.execute(f"UPDATE {table} SET status=? WHERE {where} AND status IS NOT ?",
+                        (data["status"], *values, data["status"]))
+        else:
+            if not _newer(cur, table, row_key, ts, origin, "1"):
+                return False
+            cur.execute(f"DELETE FROM {table} WHERE {where}", values)
+        return cur.rowcount > 0
+
+    columns = db.SYNC_COLUMNS[table]
+    if op == "I":
+        if table in db.ARCHIVED_TABLES and data["day"] < cutoff:
+            return False
+        cur.execute(
+            f"INSERT OR IGNORE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            tuple(data[c] for c in columns),
+        )
+    elif not _newer(cur, table, row_key, ts, origin, "1"):
+        return False
+    elif op == "U":
+        edited = [c for c in columns if c != "sync_key"]
+        cur.execute(
+            f"UPDATE {table} SET {', '.join(f'{c}=?' for c in edited)} WHERE sync_key=?",
+            (*(data[c] for c in edited), row_key),
+        )
+    else:
+        cur.execute(f"DELETE FROM {table} WHERE sync_key=?", (row_key,))
+    return cur.rowcount > 0
+
+
+def apply_changes(payload: Dict[str, Any], conn: Optional[sqlite3.Connection] = None,
+                  local_db: bool = True) -> Dict[str, int]:
+    """Apply another device's export in one transaction; returns applied/skipped counts.
+    `local_db` says `conn` is this process's database, whose task and habit listeners hear of the changes."""
+    own = conn is None
+    conn = conn or _connect()
+    cur = conn.cursor()
+    local = device_id(conn)
+    peer = payload["device"]
+    if peer == local:
+        if own:
+            conn.close()
+        raise ValueError("Both databases have the same device id; run `reset-device` on the copy")
+
+    applied = skipped = 0
+    streaks = []
+    statuses: Dict[Tuple[str, str], List[Tuple[tuple, int]]] = {}
+    # Every applied task row, also inserts and deletes that leave the status alone, for the task listeners
+    tasks: Dict[str, List[Tuple[int, str, str, int]]] = {}
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        # Days before this database's own archive cutoff are closed
+        row = cur.execute("SELECT cutoff_day FROM archive_state WHERE id=1").fetchone()
+        archive_cutoff = row[0] if row else None
+        cutoff = row[0] if row else -sys.maxsize
+        for _seq, table, op, row_key, data, origin, ts in payload["changes"]:
+            if origin == local or table not in db.SYNC_COLUMNS:
+                skipped += 1
+                continue
+            # The triggers log the change with its original device and time
+            cur.executemany(
+                "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                (("apply_origin", origin), ("apply_ts", str(ts))),
+            )
+            if table == "timer_sessions" and data is None:
+                owner = cur.execute("SELECT user_id FROM timer_sessions WHERE sync_key=?", (row_key,)).fetchone()
+            natural = table in db.SYNC_NATURAL_KEYS
+            if natural:
+                values = tuple(json.loads(row_key))
+                before = _status(cur, table, values)
+            if _apply_one(cur, table, op, row_key, data, origin, ts, cutoff):
+                applied += 1
+                if natural:
+                    after = _status(cur, table, values)
+                    if after != before:
+                        statuses.setdefault((values[0], table), []).append((values, after))
+                    if table == "tasks":
+                        user_id, day, name, category = values
+                        tasks.setdefault(user_id, []).append((day, name, category, after))
+                # Rows written here bypass database's streak bookkeeping; recompute what they touched
+                if table == "habits":
+                    user_id, _day, habit = json.loads(row_key)
+                    streaks.append((user_id, "habit", habit))
+                elif table == "timer_sessions":
+                    streaks.append((data["user_id"] if data is not None else owner[0], "focus", ""))
+            else:
+                skipped += 1
+        db.refresh_streaks(cur, streaks, archive_cutoff)
+        _log_statuses(cur, statuses)
+        cur.execute("DELETE FROM sync_state WHERE key IN ('apply_origin', 'apply_ts')")
+        cur.execute(
+            "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = MAX(CAST(value AS INTEGER), CAST(excluded.value AS INTEGER))",
+            (f"peer:{peer}", payload["last_seq"]),
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if own:
+            conn.close()
+    if local_db:
+        for (user_id, table), changed in statuses.items():
+            if table == "habits":
+                db.notify_habit_listeners(user_id, [(day, habit, status) for (_u, day, habit), status in changed])
+        for user_id, changed in tasks.items():
+            db.notify_task_listeners(user_id, changed)
+    return {"applied": applied, "skipped": skipped}
+
+
+def sync_files(other: Path) -> Dict[str, Dict[str, int]]:
+    """Exchange deltas both ways between this database and another copy of it."""
+    here = _connect()
+    there = _connect(other)
+    result = {}
+    try:
+        for name, src, dst in (("pull", there, here), ("push", here, there)):
+            payload = export_changes(peer_seq(device_id(src), dst), exclude_origin=device_id(dst), conn=src)
+            result[name] = {"bytes": len(dumps(payload)), **apply_changes(payload, conn=dst, local_db=dst is here)}
+    finally:
+        here.close()
+        there.close()
+    return result
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Sync Life OS databases by exchanging change-log deltas")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sync_cmd = sub.add_parser("sync", help="pull from and push to another copy of the database")
+    sync_cmd.add_argument("other", type=Path)
+    export_cmd = sub.add_parser("export", help="write changes after a seq as gzipped JSON")
+    export_cmd.add_argument("--since", type=int, default=0)
+    export_cmd.add_argument("--exclude-origin", default=None)
+    export_cmd.add_argument("--out", type=Path, default=None, help="file to write (default: stdout)")
+    apply_cmd = sub.add_parser("apply", help="apply an export from another device")
+    apply_cmd.add_argument("file", type=Path)
+    sub.add_parser("device", help="print this database's device id")
+    sub.add_parser("reset-device", help="give a copied database its own device id")
+    db.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    db.configure_from_args(args)
+    db.init_db()
+    if args.command == "sync":
+        for direction, stats in sync_files(args.other).items():
+            print(f"{direction}: {stats['applied']} applied, {stats['skipped']} skipped, {stats['bytes']:,} bytes")
+    elif args.command == "export":
+        blob = dumps(export_changes(args.since, args.exclude_origin))
+        if args.out:
+            args.out.write_bytes(blob)
+        else:
+            sys.stdout.buffer.write(blob)
+    elif args.command == "apply":
+        stats = apply_changes(loads(args.file.read_bytes()))
+        print(f"{stats['applied']} applied, {stats['skipped']} skipped")
+    elif args.command == "device":
+        print(device_id())
+    else:
+        print(reset_device())
+
+
+if __name__ == "__main__":
+    main()
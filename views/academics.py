@@ -1,33 +1,29 @@
+import json
+import threading
+import weakref
+import pandas as pd
 import streamlit as st
-from datetime import date, datetime
+from datetime import date, timedelta
 from modules import database as db
+from modules import history, prefetch, recurrence, reminders, session_state
 
-def check_and_send_reminders():
-    """Check time and send task reminders throughout the day"""
-    current_hour = datetime.now().hour
-    
-    # Reminder schedule
-    reminders = {
-        8: ("🌅 Morning Reminder", "Time to plan your day! Enter all your tasks for today."),
-        14: ("☀️ Afternoon Check-in", "You're halfway through the day! Complete 2-3 tasks now."),
-        18: ("🌆 Evening Reminder", "Finish another task before dinner. You're doing great!"),
-        21: ("🌙 Night Review", "How many tasks did you complete today? Time to review your progress!")
-    }
-    
-    if current_hour in reminders:
-        title, message = reminders[current_hour]
-        
+def show_pending_reminders(user_id):
+    """Show reminders the background scheduler has queued for this user"""
+    scheduler = reminders.get_scheduler()
+    scheduler.subscribe(user_id)
+
+    for reminder in scheduler.poll(user_id):
         # Show in-app notification
-        st.toast(f"{title}: {message}", icon="🔔")
-        
+        st.toast(f"{reminder.title}: {reminder.message}", icon="🔔")
+
         # Browser notification
         st.markdown(f"""
         <script>
             if (Notification.permission === "granted") {{
-                var notification = new Notification("{title}", {{
-                    body: "{message}",
+                var notification = new Notification({json.dumps(reminder.title)}, {{
+                    body: {json.dumps(reminder.message)},
                     icon: "📚",
-                    tag: "task-reminder-{current_hour}"
+                    tag: "task-reminder-{reminder.slot}"
                 }});
                 setTimeout(() => notification.close(), 15000);
             }}
@@ -97,22 +93,132 @@ SCHEDULE = {
     "2026-01-16": ["Review Day / Buffer"],
 }
 
+# The schedule as recurrence rules: one daily rule per run of consecutive days
+SCHEDULE_RULES = recurrence.rules_from_dates(SCHEDULE)
+
+
+
+def seed_rules(user_id):
+    """Store the schedule as the user's Academics task rules; main.py calls this once per session"""
+    recurrence.ensure_rules(user_id, "task", SCHEDULE_RULES, category="Academics")
+
+
+FIRST_DAY = date(2026, 1, 2)
+LAST_DAY = date(2026, 2, 28)
+
+
+def load_tasks(key):
+    """A (user, day) pair's scheduled and custom tasks (runs on prefetch workers too)"""
+    user_id, date_str = key
+    return recurrence.day_tasks(user_id, date_str, category="Academics")
+
+
+# Every session's task cache. The database's task listeners invalidate the day a write touched: writes in
+# this process (this view, other tabs, an API or sync run in-process) as they commit, and those of other
+# processes (python -m modules.sync, a standalone API) when get_task_cache() calls db.catch_up()
+_task_caches = weakref.WeakSet()
+_task_caches_lock = threading.Lock()
+
+
+def get_task_cache():
+    """Per-session cache of loaded days, filled ahead of time for neighbouring dates"""
+    if "acad_prefetch" not in st.session_state:
+        cache = prefetch.PrefetchCache(load_tasks, name="academics")
+        with _task_caches_lock:
+            _task_caches.add(cache)
+        st.session_state.acad_prefetch = cache
+    db.catch_up()
+    return st.session_state.acad_prefetch
+
+
+def _on_task_change(user_id, day, task_name, category, status):
+    if category != "Academics":
+        return
+    with _task_caches_lock:
+        caches = list(_task_caches)
+    for cache in caches:
+        cache.invalidate((user_id, db.from_day(day).isoformat()))
+
 
-def render():
+db.add_task_listener(_on_task_change)
+
+
+def prefetch_neighbours(cache, user_id, selected):
+    window = prefetch.PREFETCH_WINDOW
+    neighbours = []
+    for offset in range(1, window + 1):
+        for d in (selected + timedelta(days=offset), selected - timedelta(days=offset)):
+            if FIRST_DAY <= d <= LAST_DAY:
+                neighbours.append((user_id, d.isoformat()))
+    cache.prefetch(neighbours)
+
+
+def _apply_grid(editor_key, rows_key, user_id):
+    """Submit callback: every edited row goes to the database in one transaction, before the rerun reads"""
+    rows = st.session_state[rows_key]
+    edits = st.session_state[editor_key].get("edited_rows", {})
+    changes = [(*rows[int(row)], bool(cells["Done"])) for row, cells in edits.items() if "Done" in cells]
+    try:
+        changed = db.set_task_statuses(changes, user_id=user_id)
+    except ValueError as e:
+        st.toast(f"Not saved: {e}")
+        return
+    # A fresh editor for the saved state instead of the old one replaying its edits
+    st.session_state.acad_grid_version = st.session_state.get("acad_grid_version", 0) + 1
+    st.toast(f"Saved {changed} change{'s' if changed != 1 else ''}")
+
+
+def _undo_redo(action, user_id):
+    """Undo / Redo callback: reverts the latest task change (a whole grid save at once) before the rerun reads"""
+    applied = action(user_id=user_id, kind="task")
+    if not applied:
+        st.toast(f"Nothing to {action.__name__}")
+        return
+    # The checkboxes and the grid still hold the old values; rebuild them from the database
+    session_state.reset(st.session_state, "acad")
+    st.session_state.acad_grid_version = st.session_state.get("acad_grid_version", 0) + 1
+    c = applied[0]
+    what = f"{c.name} on {db.from_day(c.day):%b %d}" if len(applied) == 1 else f"{len(applied)} changes"
+    st.toast(f"{'Undid' if action is history.undo else 'Redid'}: {what}")
+
+
+def render_week_grid(task_cache, user_id, selected):
+    """The selected date's week (Monday to Sunday) as one editable table, saved with a single commit"""
+    monday = selected - timedelta(days=selected.weekday())
+    days = [d for d in (monday + timedelta(days=i) for i in range(7)) if FIRST_DAY <= d <= LAST_DAY]
+    rows, table = [], []
+    for d in days:
+        for t in task_cache.get((user_id, d.isoformat())):
+            rows.append((d.isoformat(), t.task_name, t.category))
+            table.append({"Date": d.strftime("%a %d %b"), "Task": t.task_name, "Done": bool(t.status)})
+    if not rows:
+        st.info("No tasks this week.")
+        return
+
+    scope = f"{monday.isoformat()}.{st.session_state.get('acad_grid_version', 0)}"
+    editor_key = session_state.key(st.session_state, "acad_grid", scope, "editor")
+    # Row positions in the editor's edits map back to tasks through this list
+    rows_key = session_state.key(st.session_state, "acad_grid", scope, "rows")
+    st.session_state[rows_key] = rows
+    with st.form("acad_grid_form"):
+        st.data_editor(pd.DataFrame(table), key=editor_key, disabled=["Date", "Task"], hide_index=True,
+                       use_container_width=True)
+        st.form_submit_button("Save week", on_click=_apply_grid, args=(editor_key, rows_key, user_id))
+
+
+def render(user_id=db.DEFAULT_USER):
     st.header(" Academics ? Exam Plan")
     
-    # Check and send reminders
-    check_and_send_reminders()
-    
-    # Calculate overall progress
-    total_days = 15
-    all_completed = 0
-    all_total = 0
-    for d in SCHEDULE.keys():
-        tasks = db.get_tasks(d, category="Academics")
-        if tasks:
-            all_total += len(tasks)
-            all_completed += sum(1 for t in tasks if t["status"])
+    # Pick up reminders fired by the background scheduler
+    show_pending_reminders(user_id)
+
+    # Calculate overall progress: scheduled occurrences plus the stored rows that carry a status
+    first, last = db.to_day(FIRST_DAY), db.to_day(LAST_DAY)
+    rules = recurrence.get_rules(user_id, "task", category="Academics")
+    scheduled = {(day, rule.name) for day, rule in recurrence.expand(rules, first, last)}
+    states = {(day, name): status for day, name, status in db.get_task_states(first, last, "Academics", user_id=user_id)}
+    all_total = len(scheduled | states.keys())
+    all_completed = sum(1 for status in states.values() if status)
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -128,7 +234,7 @@ def render():
             st.metric(" Status", "Need Focus", delta="Let's do this!")
     
     with col3:
-        total_tasks = sum(len(SCHEDULE.get(d, [])) for d in SCHEDULE.keys())
+        total_tasks = len(scheduled)
         st.metric(" Total Tasks", total_tasks, delta="to track")
     
     st.write("---")
@@ -138,24 +244,34 @@ def render():
     selected = st.date_input(
         "Select date",
         value=min(today, date(2026, 1, 16)),
-        min_value=date(2026, 1, 2),
-        max_value=date(2026, 2, 28),
+        min_value=FIRST_DAY,
+        max_value=LAST_DAY,
     )
     date_str = selected.isoformat()
+    task_cache = get_task_cache()
+    cache_key = (user_id, date_str)
+    # Archived days are read-only
+    archived = db.is_archived(db.to_day(selected))
 
     # Quick add
     with st.expander(" Quick Add Task"):
         new_task = st.text_input("Task name")
-        if st.button("Add", key="add_custom_task") and new_task.strip():
-            db.add_custom_task(date_str, new_task.strip(), category="Academics")
+        if st.button("Add", key="add_custom_task", disabled=archived) and new_task.strip():
+            db.add_custom_task(date_str, new_task.strip(), category="Academics", user_id=user_id)
             st.success(" Task added")
             st.rerun()
 
-    # Ensure hardcoded tasks exist
-    for task in SCHEDULE.get(date_str, []):
-        db.upsert_task(date_str, task, "Academics", status=0)
+    col_undo, col_redo, _ = st.columns([1, 1, 4])
+    col_undo.button("↩️ Undo", key="acad_undo", on_click=_undo_redo, args=(history.undo, user_id), use_container_width=True)
+    col_redo.button("↪️ Redo", key="acad_redo", on_click=_undo_redo, args=(history.redo, user_id), use_container_width=True)
+
+    # Grid mode: edit the whole week and save every change in one commit
+    if st.toggle("Edit the week as a grid", key="acad_grid_mode"):
+        render_week_grid(task_cache, user_id, selected)
+        return
 
-    tasks = db.get_tasks(date_str, category="Academics")
+    tasks = task_cache.get(cache_key)
+    prefetch_neighbours(task_cache, user_id, selected)
     if not tasks:
         st.info("No tasks for this date.")
         return
@@ -163,13 +279,14 @@ def render():
     completed = 0
     total = len(tasks)
     for idx, t in enumerate(tasks):
-        key = f"acad_{date_str}_{idx}"
-        checked = bool(t["status"])
+        # Keys are scoped to the date; dates no longer in use are evicted with their keys
+        key = session_state.key(st.session_state, "acad", date_str, idx)
+        checked = bool(t.status)
 
-        def _on_change(ds=date_str, tn=t["task_name"], cat=t["category"], k=key):
-            db.set_task_status(ds, tn, cat, bool(st.session_state.get(k, False)))
+        def _on_change(ds=date_str, tn=t.task_name, cat=t.category, k=key):
+            db.set_task_status(ds, tn, cat, bool(st.session_state.get(k, False)), user_id=user_id)
 
-        st.checkbox(t["task_name"], value=checked, key=key, on_change=_on_change)
+        st.checkbox(t.task_name, value=checked, key=key, on_change=_on_change, disabled=archived)
         if st.session_state.get(key, checked):
             completed += 1
 
@@ -1,8 +1,12 @@
 ﻿import streamlit as st
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
 from datetime import date
+from functools import partial
 from modules import database as db
+from modules import finance_cache
+from modules import projection
 
 CATEGORIES = [
     "Income: Dad",
@@ -16,18 +20,24 @@ CATEGORIES = [
 ]
 
 
-def render():
+def render(user_id=db.DEFAULT_USER):
     st.header(" Finance — The 10% Rule")
     
-    records = db.get_finance(limit=500)
+    # The ledger is cached per user for the whole process (only rows added since the last
+    # rerun are fetched); it refreshes alongside the recent-transactions read
+    recent_columns = ("day", "category", "amount", "note")
+    reads = db.fetch_many({
+        "ledger": partial(finance_cache.get_frame, user_id),
+        "recent": partial(db.get_recent_finance, limit=5, columns=recent_columns, user_id=user_id),
+    })
+    ledger = reads["ledger"]
+    has_entries = ledger.max_id > 0
     
     # Motivational stats at top
-    if records:
-        df = pd.DataFrame(records, columns=["id", "date", "category", "amount", "note"])
-        
-        total_income = df[df["category"].str.startswith("Income")]["amount"].sum()
-        total_expenses = df[df["category"].str.startswith("Expense")]["amount"].sum()
-        total_invested = df[df["category"].str.startswith("Invest")]["amount"].sum()
+    if has_entries:
+        total_income = ledger.totals["Income"]
+        total_expenses = ledger.totals["Expense"]
+        total_invested = ledger.totals["Invest"]
         
         investment_rate = (total_invested / total_income * 100) if total_income > 0 else 0
         
@@ -68,7 +78,7 @@ def render():
             st.write("")
             submitted = st.form_submit_button("✅ Add Income", use_container_width=True)
             if submitted and amount > 0:
-                db.add_finance_entry(date.today().isoformat(), f"Income: {income_category}", float(amount), note)
+                db.add_finance_entry(date.today().isoformat(), f"Income: {income_category}", float(amount), note, user_id=user_id)
                 st.success("💰 Income added!")
                 st.rerun()
     
@@ -83,7 +93,7 @@ def render():
             st.write("")
             submitted = st.form_submit_button("❌ Add Expense", use_container_width=True)
             if submitted and amount > 0:
-                db.add_finance_entry(date.today().isoformat(), f"Expense: {expense_category}", float(amount), note)
+                db.add_finance_entry(date.today().isoformat(), f"Expense: {expense_category}", float(amount), note, user_id=user_id)
                 st.success("✅ Expense recorded!")
                 st.rerun()
     
@@ -98,34 +108,32 @@ def render():
             st.write("")
             submitted = st.form_submit_button("📊 Add Investment", use_container_width=True)
             if submitted and amount > 0:
-                db.add_finance_entry(date.today().isoformat(), f"Invest: {investment_category}", float(amount), note)
+                db.add_finance_entry(date.today().isoformat(), f"Invest: {investment_category}", float(amount), note, user_id=user_id)
                 st.success("📈 Investment added!")
                 st.rerun()
 
-    if not records:
+    if not has_entries:
         st.write("")
         st.info(" Add your first transaction to start tracking your finances!")
         return
 
-    df = pd.DataFrame(records, columns=["id", "date", "category", "amount", "note"])
-
     # Donut: expenses only
     st.write("")
     st.write("")
     st.divider()
     st.subheader(" Expense Breakdown")
     st.write("")
-    exp_df = df[df["category"].str.startswith("Expense")]
-    if not exp_df.empty:
-        fig_exp = px.pie(exp_df, names="category", values="amount", hole=0.5, 
+    by_category = ledger.expenses_by_category
+    if not by_category.empty:
+        fig_exp = px.pie(names=by_category.index, values=by_category.values, hole=0.5, 
                          title="Where Your Money Goes",
                          color_discrete_sequence=px.colors.qualitative.Set3)
         st.plotly_chart(fig_exp, width='stretch')
         
         st.write("")
         # Top expense
-        top_expense = exp_df.groupby("category")["amount"].sum().idxmax()
-        top_amount = exp_df.groupby("category")["amount"].sum().max()
+        top_expense = by_category.index[0]
+        top_amount = by_category.iloc[0]
         st.info(f" Biggest expense: **{top_expense}** ({top_amount:.2f})")
     else:
         st.info("Add expense entries to see the breakdown.")
@@ -136,10 +144,9 @@ def render():
     st.divider()
     st.subheader(" Investment Growth")
     st.write("")
-    inv_df = df[df["category"].str.startswith("Invest")].copy()
-    if not inv_df.empty:
-        inv_df["date_only"] = pd.to_datetime(inv_df["date"]).dt.date
-        trend = inv_df.groupby("date_only")["amount"].sum().cumsum().reset_index()
+    invested = ledger.invested_cumulative
+    if not invested.empty:
+        trend = pd.DataFrame({"date_only": invested.index.date, "amount": invested.values})
         fig_inv = px.line(trend, x="date_only", y="amount", markers=True, 
                           title="Your Wealth Journey",
                           labels={"amount": "Total Invested", "date_only": "Date"})
@@ -152,11 +159,55 @@ def render():
     else:
         st.info("Add investment entries to see the trend.")
 
+    # Monte Carlo: where the 10% habit leads, from this ledger's own monthly flows
+    st.write("")
+    st.write("")
+    st.divider()
+    st.subheader(" Projection")
+    st.write("")
+    flows = projection.observed_flows(ledger.monthly, ledger.totals["Invest"])
+    if flows.income_mean > 0:
+        col1, col2 = st.columns(2)
+        with col1:
+            years = st.slider("Years", 1, 40, 30, key="projection_years")
+            rate = st.slider("Investment rate (%)", 0.0, 50.0, round(min(flows.invest_rate * 100, 50.0), 1), 0.5,
+                             key="projection_rate")
+            goal = st.number_input("Goal (₹)", min_value=1.0, value=10_000_000.0, step=100_000.0, format="%.0f",
+                                   key="projection_goal")
+        with col2:
+            annual_return = st.slider("Expected return (%)", 0.0, 20.0, projection.DEFAULT_RETURN * 100, 0.5,
+                                      key="projection_return")
+            volatility = st.slider("Volatility (%)", 0.0, 40.0, projection.DEFAULT_VOLATILITY * 100, 0.5,
+                                   key="projection_volatility")
+        result = projection.simulate(flows, years, rate / 100, annual_return / 100, volatility / 100, goals=(goal,))
+
+        x = [date.today().year + int(y) for y in result.years]
+        fig_proj = go.Figure()
+        for low, high, alpha in ((5, 95, 0.15), (25, 75, 0.3)):
+            fig_proj.add_trace(go.Scatter(x=x, y=result.bands[high], line_width=0, showlegend=False, hoverinfo="skip"))
+            fig_proj.add_trace(go.Scatter(x=x, y=result.bands[low], line_width=0, fill="tonexty",
+                                          fillcolor=f"rgba(0,122,255,{alpha})", name=f"{low}–{high}th percentile"))
+        fig_proj.add_trace(go.Scatter(x=x, y=result.bands[50], line=dict(color="#007aff", width=3), name="Median"))
+        fig_proj.add_hline(y=goal, line_dash="dash", annotation_text="Goal")
+        fig_proj.update_layout(title="Possible Futures", xaxis_title="Year", yaxis_title="Invested wealth")
+        st.plotly_chart(fig_proj, width='stretch')
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric(" Median in " + str(x[-1]), f"{result.bands[50][-1]:,.0f}")
+        with col2:
+            st.metric(" Chance of reaching goal", f"{result.goal_probability(goal) * 100:.1f}%")
+        st.caption(f"{result.paths:,} simulated paths from {flows.months} months of history "
+                   f"in {result.elapsed_ms:.0f} ms (cached until the inputs change)")
+    else:
+        st.info("Add income entries to see a projection.")
+
     st.write("")
     st.write("")
     st.divider()
     st.subheader(" Recent Transactions")
     st.write("")
-    recent = db.get_recent_finance(limit=5)
-    recent_df = pd.DataFrame(recent, columns=["id", "date", "category", "amount", "note"])
-    st.dataframe(recent_df[["date", "category", "amount", "note"]], use_container_width=True, hide_index=True)
+    recent = reads["recent"]
+    recent_df = pd.DataFrame.from_records(recent, columns=recent_columns)
+    recent_df.insert(0, "date", pd.to_datetime(recent_df.pop("day"), unit="D").dt.date)
+    st.dataframe(recent_df, use_container_width=True, hide_index=True)
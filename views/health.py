@@ -1,6 +1,10 @@
 import streamlit as st
+import time
+import pandas as pd
 from datetime import date, timedelta
+from functools import partial
 from modules import database as db
+from modules import habit_calendar, history, recurrence, session_state
 
 HABITS = [
     "Peanut Butter",
@@ -9,40 +13,88 @@ HABITS = [
     "Night Cream",
     "Workout",
 ]
+# Every habit is due daily; only the days whose status changed are stored
+HABIT_RULES = [recurrence.RuleSpec(h, date(2026, 1, 1)) for h in HABITS]
 
 
-def compute_streak(habit: str) -> int:
-    # Walk back in time until a miss
-    today = date.today()
-    streak = 0
-    day = today
-    while True:
-        rows = db.get_habits(day.isoformat())
-        status = None
-        for r in rows:
-            if r["habit"] == habit:
-                status = bool(r["status"])
-                break
-        if status:
-            streak += 1
-            day -= timedelta(days=1)
-        else:
-            break
-    return streak
+def seed_rules(user_id):
+    """Store the protocol as the user's habit rules; main.py calls this once per session"""
+    recurrence.ensure_rules(user_id, "habit", HABIT_RULES)
+# Days shown by the week grid, ending today
+GRID_DAYS = 7
+
+
+def week_grid(user_id, today):
+    """Habits x the last GRID_DAYS days as a bool frame; columns are ISO dates"""
+    last = date.fromisoformat(today)
+    first = last - timedelta(days=GRID_DAYS - 1)
+    done = set(db.get_completed_habit_days(first, last, user_id=user_id))
+    days = [first + timedelta(days=i) for i in range(GRID_DAYS)]
+    return pd.DataFrame({d.isoformat(): [(h, db.to_day(d)) in done for h in HABITS] for d in days}, index=HABITS)
+
+
+def _apply_grid(editor_key, user_id):
+    """Submit callback: every edited cell goes to the database in one transaction, before the rerun reads"""
+    edits = st.session_state[editor_key].get("edited_rows", {})
+    changes = [(day, HABITS[int(row)], bool(value)) for row, cells in edits.items() for day, value in cells.items()]
+    try:
+        changed = db.set_habit_statuses(changes, user_id=user_id)
+    except ValueError as e:
+        st.toast(f"Not saved: {e}")
+        return
+    # A fresh editor for the saved state instead of the old one replaying its edits
+    st.session_state.habit_grid_version = st.session_state.get("habit_grid_version", 0) + 1
+    st.toast(f"Saved {changed} change{'s' if changed != 1 else ''}")
+
 
+def _undo_redo(action, user_id):
+    """Undo / Redo callback: reverts the latest habit change (a whole grid save at once) before the rerun reads"""
+    applied = action(user_id=user_id, kind="habit")
+    if not applied:
+        st.toast(f"Nothing to {action.__name__}")
+        return
+    # The checkboxes and the grid still hold the old values; rebuild them from the database
+    session_state.reset(st.session_state, "habit")
+    st.session_state.habit_grid_version = st.session_state.get("habit_grid_version", 0) + 1
+    c = applied[0]
+    what = f"{c.name} on {db.from_day(c.day):%b %d}" if len(applied) == 1 else f"{len(applied)} changes"
+    st.toast(f"{'Undid' if action is history.undo else 'Redid'}: {what}")
 
-def render():
+
+def render_week_grid(user_id, today):
+    version = st.session_state.get("habit_grid_version", 0)
+    editor_key = session_state.key(st.session_state, "habit_grid", f"{today}.{version}", "editor")
+    grid = week_grid(user_id, today)
+    with st.form("habit_grid_form"):
+        st.data_editor(
+            grid,
+            key=editor_key,
+            column_config={
+                day: st.column_config.CheckboxColumn(date.fromisoformat(day).strftime("%a %d")) for day in grid.columns
+            },
+            use_container_width=True,
+        )
+        st.form_submit_button("Save week", on_click=_apply_grid, args=(editor_key, user_id))
+
+
+def render(user_id=db.DEFAULT_USER):
     st.header("Health - Daily Protocol")
     
     # Motivational header with overall completion
     today = date.today().isoformat()
     
-    # Ensure habits exist
-    for h in HABITS:
-        db.upsert_habit(today, h, status=0)
-    
-    current_rows = db.get_habits(today)
-    completed_today = sum(1 for r in current_rows if r["status"])
+    # Today's rows, the history calendar and every habit's streak (one streak_state
+    # lookup, kept current by each status write) load side by side
+    reads = db.fetch_many({
+        "today": partial(recurrence.day_habits, user_id, today),
+        "calendar": partial(habit_calendar.get_calendar, user_id, HABITS),
+        "streaks": partial(db.get_streaks, "habit", today, user_id=user_id),
+    })
+    current_rows = reads["today"]
+    calendar = reads["calendar"]
+    stored = reads["streaks"]
+    streaks = {h: stored[h].current if h in stored else 0 for h in calendar.habits}
+    completed_today = sum(1 for r in current_rows if r.status)
     total_habits = len(HABITS)
     
     col1, col2, col3 = st.columns(3)
@@ -51,7 +103,7 @@ def render():
         st.metric(" Today's Progress", f"{completed_today}/{total_habits}", delta=f"{completion_pct}%")
     
     with col2:
-        max_streak = max([compute_streak(h) for h in HABITS])
+        max_streak = max(streaks[h] for h in HABITS)
         st.metric(" Best Streak", f"{max_streak} days", delta="Keep Going!")
     
     with col3:
@@ -65,29 +117,37 @@ def render():
     st.write("---")
     st.write("Stay consistent. Track your daily checklist and streaks.")
 
-    # Checkboxes with visual feedback
-    for idx, h in enumerate(HABITS):
-        key = f"habit_{today}_{idx}"
-        current_rows_h = [r for r in current_rows if r["habit"] == h]
-        checked = bool(current_rows_h[0]["status"]) if current_rows_h else False
+    col_undo, col_redo, _ = st.columns([1, 1, 4])
+    col_undo.button("↩️ Undo", key="habit_undo", on_click=_undo_redo, args=(history.undo, user_id), use_container_width=True)
+    col_redo.button("↪️ Redo", key="habit_redo", on_click=_undo_redo, args=(history.redo, user_id), use_container_width=True)
+
+    # Grid mode: edit the whole week and save every change in one commit
+    if st.toggle("Edit the week as a grid", key="habit_grid_mode"):
+        render_week_grid(user_id, today)
+    else:
+        # Checkboxes with visual feedback
+        for idx, h in enumerate(HABITS):
+            key = session_state.key(st.session_state, "habit", today, idx)
+            current_rows_h = [r for r in current_rows if r.habit == h]
+            checked = bool(current_rows_h[0].status) if current_rows_h else False
 
-        def _on_change(ds=today, habit=h, k=key):
-            db.set_habit_status(ds, habit, bool(st.session_state.get(k, False)))
+            def _on_change(ds=today, habit=h, k=key):
+                db.set_habit_status(ds, habit, bool(st.session_state.get(k, False)), user_id=user_id)
 
-        # Get streak for this habit
-        streak = compute_streak(h)
+            # Get streak for this habit
+            streak = streaks[h]
         
-        # Add emoji based on streak
-        if streak >= 30:
-            icon = ""
-        elif streak >= 14:
-            icon = ""
-        elif streak >= 7:
-            icon = ""
-        else:
-            icon = ""
+            # Add emoji based on streak
+            if streak >= 30:
+                icon = ""
+            elif streak >= 14:
+                icon = ""
+            elif streak >= 7:
+                icon = ""
+            else:
+                icon = ""
         
-        st.checkbox(f"{icon} {h} - {streak} day streak", value=checked, key=key, on_change=_on_change)
+            st.checkbox(f"{icon} {h} - {streak} day streak", value=checked, key=key, on_change=_on_change)
 
     # Progress bar
     st.write("---")
@@ -102,7 +162,7 @@ def render():
     # Streak visualization
     st.write("---")
     st.subheader(" Streak Leaderboard")
-    streak_data = [(h, compute_streak(h)) for h in HABITS]
+    streak_data = [(h, streaks[h]) for h in HABITS]
     streak_data.sort(key=lambda x: x[1], reverse=True)
     
     for habit, streak in streak_data:
@@ -119,4 +179,38 @@ def render():
         with col1:
             st.write(f"**{habit}**")
         with col2:
-            st.write(f"{badge}  {streak}d")
\ No newline at end of file
+            st.write(f"{badge}  {streak}d")
+
+    # Calendar heatmap
+    st.write("---")
+    st.subheader(" History")
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        shown = st.selectbox("Habit", ["All habits"] + HABITS, key="habit_heatmap_habit")
+    with col2:
+        years = st.slider("Years", 1, habit_calendar.CALENDAR_YEARS, 1, key="habit_heatmap_years")
+
+    t0 = time.perf_counter()
+    longest = {h: stored[h].longest if h in stored else 0 for h in calendar.habits}
+    weekly = calendar.weekly_rates(weeks=1)[:, -1]
+    monthly = calendar.rolling_average(30)[:, -1]
+    selected = HABITS if shown == "All habits" else [shown]
+    images = [(h, calendar.heatmap(h, years=years)) for h in selected]
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    for habit, image in images:
+        st.caption(habit)
+        st.image(image)
+
+    st.dataframe(
+        pd.DataFrame({
+            "Habit": calendar.habits,
+            "Current": [streaks.get(h, 0) for h in calendar.habits],
+            "Longest": [longest[h] for h in calendar.habits],
+            "This week": (weekly * 100).round().astype(int).astype(str) + "%",
+            "30-day avg": (monthly * 100).round().astype(int).astype(str) + "%",
+        }),
+        hide_index=True,
+        use_container_width=True,
+    )
+    st.caption(f"Newest year on top, weeks start Monday • {elapsed_ms:.1f} ms")
@@ -0,0 +1,45 @@
+import streamlit as st
+import time
+from datetime import date
+from modules import database as db
+
+
+def render(user_id=db.DEFAULT_USER):
+    t0 = time.perf_counter()
+    st.header("🏠 Today")
+
+    # Every number on this page comes from one query
+    q0 = time.perf_counter()
+    day = db.get_day_overview(date.today(), user_id=user_id)
+    query_ms = (time.perf_counter() - q0) * 1000
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("📚 Tasks", f"{day.tasks_done}/{day.tasks_due}",
+                  delta="All done!" if day.tasks_due and day.tasks_done >= day.tasks_due else None)
+    with col2:
+        st.metric("💪 Habits", f"{day.habits_done}/{day.habits_due}",
+                  delta=f"Best streak {day.best_habit_streak}d" if day.best_habit_streak else None)
+    with col3:
+        st.metric("⏱️ Focus", f"{day.focus_minutes}m", delta=f"{day.focus_completed}/{day.focus_sessions} sessions")
+    with col4:
+        st.metric("💰 Spent Today", f"{day.spent:.2f}",
+                  delta=f"{day.invested:.2f} invested" if day.invested else None)
+
+    st.write("---")
+    due = day.tasks_due + day.habits_due
+    done = day.tasks_done + day.habits_done
+    st.subheader(" Day Progress")
+    st.progress(min(done / due, 1.0) if due else 0)
+    if due and done >= due:
+        st.success(" Everything checked off today!")
+    elif due:
+        st.info(f" {due - done} items left today")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("🔥 Focus Streak", f"{day.focus_streak} days")
+    with col2:
+        st.metric(" Earned Today", f"{day.earned:.2f}")
+
+    st.caption(f"1 query {query_ms:.1f} ms • page {(time.perf_counter() - t0) * 1000:.1f} ms")
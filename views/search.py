@@ -0,0 +1,65 @@
+import streamlit as st
+import time
+from modules import database as db
+from modules import search
+
+KIND_FILTERS = {
+    "All": search.KINDS,
+    "📚 Tasks": ("task",),
+    "💰 Finance": ("finance",),
+    "💪 Habits": ("habit",),
+}
+
+KIND_ICONS = {"task": "📚", "finance": "💰", "habit": "💪"}
+
+
+def render(user_id=db.DEFAULT_USER):
+    st.header("🔎 Search")
+
+    col1, col2 = st.columns([3, 2])
+    with col1:
+        query = st.text_input(
+            "Search",
+            placeholder="e.g. TIG MIG, swiggy, workout",
+            label_visibility="collapsed",
+            key="search_query",
+        )
+    with col2:
+        kind_filter = st.radio("Show", list(KIND_FILTERS.keys()), horizontal=True, label_visibility="collapsed", key="search_kind")
+
+    # Start from the first page whenever the search changes
+    search_key = (query, kind_filter)
+    if st.session_state.get("search_key") != search_key:
+        st.session_state.search_key = search_key
+        st.session_state.search_page = 0
+
+    if not query.strip():
+        st.info("Type a word or the start of one to search task names, habits and finance notes.")
+        return
+
+    t0 = time.perf_counter()
+    results = search.search(query, user_id=user_id, kinds=KIND_FILTERS[kind_filter], page=st.session_state.search_page)
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    if not results.hits:
+        st.info("No matches.")
+        return
+
+    st.caption(f"Page {results.page + 1} • {elapsed_ms:.1f} ms")
+    for hit in results.hits:
+        line = f"{KIND_ICONS[hit.kind]} {hit.title}"
+        if hit.amount is not None:
+            line += f" — ₹{hit.amount:.2f}"
+        meta = f"{hit.date} • {hit.detail}" if hit.date else hit.detail
+        st.markdown(line)
+        st.caption(meta)
+
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        if results.page > 0 and st.button("← Previous", use_container_width=True):
+            st.session_state.search_page -= 1
+            st.rerun()
+    with col_next:
+        if results.has_more and st.button("Next →", use_container_width=True):
+            st.session_state.search_page += 1
+            st.rerun()
@@ -1,6 +1,9 @@
 import streamlit as st
-from datetime import date, datetime, timedelta
+from datetime import date
+from functools import partial
 from modules import database as db
+from modules import focus_timer
+from modules import metrics
 import time
 
 # Optional serial import (for Arduino support)
@@ -15,6 +18,10 @@ except ImportError:
 ARDUINO_PORT = 'COM9'
 BAUD_RATE = 9600
 
+# Opening the port resets most boards, so a write can hold up the rerun for a while
+ARDUINO_WRITES = metrics.histogram("life_os_arduino_write_seconds", "Servo writes from the timer by result and time taken",
+                                   ("result",), buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.0, 5.0))
+
 # Calibration table for non-linear gauge (from CPU meter)
 CALIBRATION_TABLE = [
     (0, 180),
@@ -77,15 +84,19 @@ def test_arduino_connection(port=ARDUINO_PORT):
 def send_to_arduino(percentage, port=ARDUINO_PORT):
     """Send angle to Arduino servo"""
     if not SERIAL_AVAILABLE:
+        ARDUINO_WRITES.observe(0.0, ARDUINO_WRITES.labels("unavailable"))
         return False
     
+    started = time.perf_counter()
     try:
         arduino = serial.Serial(port, BAUD_RATE, timeout=1)
         angle = get_calibrated_angle(percentage)
         arduino.write(bytes([angle]))
         arduino.close()
+        ARDUINO_WRITES.observe(time.perf_counter() - started, ARDUINO_WRITES.labels("ok"))
         return True
     except:
+        ARDUINO_WRITES.observe(time.perf_counter() - started, ARDUINO_WRITES.labels("error"))
         return False
 
 def list_available_ports():
@@ -191,7 +202,81 @@ PRESETS = {
 }
 
 
-def render():
+@st.fragment(run_every=1)
+def running_timer(user_id):
+    """Countdown and controls of the running session, redrawn every second on their own
+    rather than by rerunning the whole page"""
+    active = db.get_active_session(user_id=user_id)
+    if active is None:
+        # Stopped elsewhere (another tab, the API): back to the start controls
+        st.rerun()
+    subject = active.subject
+    remaining = focus_timer.remaining(active)
+    mins = int(remaining // 60)
+    secs = int(remaining % 60)
+    
+    # Check if timer has completed; the page reruns to show it with fresh stats and history
+    if remaining == 0:
+        recorded = focus_timer.stop(True, user_id=user_id, session=active)
+        if recorded is not None:
+            if "Focus with Rev Meter" in st.session_state.focus_mode and st.session_state.arduino_connected:
+                send_to_arduino(0, st.session_state.arduino_port)
+            st.session_state.timer_completed = (recorded.duration_minutes, subject)
+        st.rerun()
+    
+    # Calculate percentage for servo (100% at start, 0% at end)
+    percentage = (remaining / (active.duration_minutes * 60)) * 100
+    
+    # Send to Arduino if using Rev Meter mode and connected
+    if "Focus with Rev Meter" in st.session_state.focus_mode and st.session_state.arduino_connected:
+        send_to_arduino(percentage, st.session_state.arduino_port)
+    
+    # Picture-in-Picture floating timer
+    pip_html = create_pip_timer(mins, secs, subject, active.duration_minutes)
+    st.markdown(pip_html, unsafe_allow_html=True)
+    
+    # Large timer display
+    st.markdown(f"""
+    <div style="text-align: center; padding: 40px; background: rgba(10, 132, 255, 0.1); border-radius: 16px; border: 2px solid rgba(10, 132, 255, 0.3);">
+        <div style="font-size: 4.5em; font-weight: 300; color: #0a84ff; letter-spacing: -2px; font-variant-numeric: tabular-nums;">
+            {mins:02d}:{secs:02d}
+        </div>
+        <div style="font-size: 1.2em; color: #86868b; margin-top: 10px;">
+            {subject} • {active.duration_minutes}m Focus{" • Paused" if active.paused else ""}
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Control buttons; each is one journal write, then the whole page reruns
+    col_btn1, col_btn2, col_btn3 = st.columns(3)
+    
+    with col_btn1:
+        if st.button("⏸️ Pause" if not active.paused else "▶️ Resume", use_container_width=True, key="pause_timer"):
+            if active.paused:
+                focus_timer.resume(user_id=user_id)
+            else:
+                focus_timer.pause(user_id=user_id)
+            st.rerun()
+    
+    with col_btn2:
+        if st.button("⏹️ Stop", use_container_width=True, key="stop_timer"):
+            # Recorded as an incomplete session with the time actually focused
+            focus_timer.stop(False, user_id=user_id, session=active)
+            st.rerun()
+    
+    with col_btn3:
+        if st.button("✅ Finish", use_container_width=True, key="finish_timer"):
+            # Move servo to 0% (timer complete) if using Rev Meter
+            if "Focus with Rev Meter" in st.session_state.focus_mode and st.session_state.arduino_connected:
+                send_to_arduino(0, st.session_state.arduino_port)
+            # Save completed session; it records the minutes actually run, which is what to report
+            recorded = focus_timer.stop(True, user_id=user_id, session=active)
+            if recorded is not None:
+                st.session_state.timer_finished = recorded.duration_minutes
+            st.rerun()
+
+
+def render(user_id=db.DEFAULT_USER):
     st.header("⏱️ Focus Timer")
     
     # Request notification permission on load
@@ -254,17 +339,22 @@ def render():
     
     today = date.today().isoformat()
     
-    # Initialize session state for timer
-    if 'timer_running' not in st.session_state:
-        st.session_state.timer_running = False
-        st.session_state.timer_start_time = None
+    # Duration picked for the next session; a running one lives in the active_sessions journal
+    if 'timer_duration' not in st.session_state:
         st.session_state.timer_duration = 25
-        st.session_state.timer_paused = False
-        st.session_state.timer_pause_time = 0
     
-    # Display stats
-    stats = db.get_timer_stats(today)
-    focus_streak = db.get_focus_streak()
+    # Display stats (the reads are independent, so they run side by side)
+    session_columns = ("start_ts", "duration_minutes", "completed", "subject")
+    reads = db.fetch_many({
+        "stats": partial(db.get_timer_stats, today, user_id=user_id),
+        "streak": partial(db.get_focus_streak, user_id=user_id),
+        "sessions": partial(db.get_timer_sessions, today, columns=session_columns, user_id=user_id),
+        "active": partial(db.get_active_session, user_id=user_id),
+    })
+    stats = reads["stats"]
+    focus_streak = reads["streak"]
+    sessions = reads["sessions"]
+    active = reads["active"]
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -317,104 +407,32 @@ def render():
     with col1:
         st.write("")  # spacing
         
-        # Timer display
-        if st.session_state.timer_running:
-            elapsed = time.time() - st.session_state.timer_start_time
-            if st.session_state.timer_paused:
-                elapsed = st.session_state.timer_pause_time
-            
-            remaining = max(0, st.session_state.timer_duration * 60 - elapsed)
-            mins = int(remaining // 60)
-            secs = int(remaining % 60)
-            
-            # Check if timer has completed
-            if remaining == 0 and not st.session_state.get('timer_completed', False):
-                st.session_state.timer_completed = True
-                st.session_state.timer_running = False
-                
-                if "Focus with Rev Meter" in st.session_state.focus_mode and st.session_state.arduino_connected:
-                    send_to_arduino(0, st.session_state.arduino_port)
-                
-                start_time = datetime.fromtimestamp(st.session_state.timer_start_time).strftime("%H:%M")
-                db.add_timer_session(date.today(), start_time, st.session_state.timer_duration, subject, completed=1)
-                
-                st.toast("⏰ Focus Session Complete! Great work!", icon="🎉")
-                st.markdown(f"""
-                <script>
-                    if (Notification.permission === "granted") {{
-                        var notification = new Notification("🎯 Focus Session Complete!", {{
-                            body: "Amazing! Your {subject} session is done. Time for a break!",
-                            requireInteraction: true,
-                            tag: "timer-complete"
-                        }});
-                        setTimeout(() => notification.close(), 10000);
-                    }}
-                </script>
-                """, unsafe_allow_html=True)
-                
-                st.success(f"🎉 Awesome! {st.session_state.timer_duration}m {subject} session completed!")
-                st.balloons()
-            
-            # Calculate percentage for servo (100% at start, 0% at end)
-            percentage = (remaining / (st.session_state.timer_duration * 60)) * 100
-            
-            # Send to Arduino if using Rev Meter mode and connected
-            if "Focus with Rev Meter" in st.session_state.focus_mode and st.session_state.arduino_connected:
-                send_to_arduino(percentage, st.session_state.arduino_port)
-            
-            # Picture-in-Picture floating timer
-            pip_html = create_pip_timer(mins, secs, subject, st.session_state.timer_duration)
-            st.markdown(pip_html, unsafe_allow_html=True)
-            
-            # Large timer display
+        # A session that ended in the timer's last run
+        completed = st.session_state.pop("timer_completed", None)
+        if completed is not None:
+            minutes, done_subject = completed
+            st.toast("⏰ Focus Session Complete! Great work!", icon="🎉")
             st.markdown(f"""
-            <div style="text-align: center; padding: 40px; background: rgba(10, 132, 255, 0.1); border-radius: 16px; border: 2px solid rgba(10, 132, 255, 0.3);">
-                <div style="font-size: 4.5em; font-weight: 300; color: #0a84ff; letter-spacing: -2px; font-variant-numeric: tabular-nums;">
-                    {mins:02d}:{secs:02d}
-                </div>
-                <div style="font-size: 1.2em; color: #86868b; margin-top: 10px;">
-                    {subject} • {st.session_state.timer_duration}m Focus
-                </div>
-            </div>
+            <script>
+                if (Notification.permission === "granted") {{
+                    var notification = new Notification("🎯 Focus Session Complete!", {{
+                        body: "Amazing! Your {done_subject} session is done. Time for a break!",
+                        requireInteraction: true,
+                        tag: "timer-complete"
+                    }});
+                    setTimeout(() => notification.close(), 10000);
+                }}
+            </script>
             """, unsafe_allow_html=True)
-            
-            # Control buttons
-            col_btn1, col_btn2, col_btn3 = st.columns(3)
-            
-            with col_btn1:
-                if st.button("⏸️ Pause" if not st.session_state.timer_paused else "▶️ Resume", use_container_width=True):
-                    if st.session_state.timer_paused:
-                        # Resume
-                        st.session_state.timer_start_time = time.time() - st.session_state.timer_pause_time
-                        st.session_state.timer_paused = False
-                    else:
-                        # Pause
-                        st.session_state.timer_paused = True
-                        st.session_state.timer_pause_time = time.time() - st.session_state.timer_start_time
-                    st.rerun()
-            
-            with col_btn2:
-                if st.button("⏹️ Stop", use_container_width=True):
-                    st.session_state.timer_running = False
-                    st.rerun()
-            
-            with col_btn3:
-                if st.button("✅ Finish", use_container_width=True):
-                    # Move servo to 0% (timer complete) if using Rev Meter
-                    if "Focus with Rev Meter" in st.session_state.focus_mode and st.session_state.arduino_connected:
-                        send_to_arduino(0, st.session_state.arduino_port)
-                    # Save completed session
-                    start_time = datetime.fromtimestamp(st.session_state.timer_start_time).strftime("%H:%M")
-                    db.add_timer_session(today, start_time, st.session_state.timer_duration, subject, completed=1)
-                    st.session_state.timer_running = False
-                    st.success(f"🎉 Great! {st.session_state.timer_duration}m focus session completed!")
-                    time.sleep(2)
-                    st.rerun()
-            
-            # Auto-rerun for timer updates (only if still running)
-            if st.session_state.timer_running and not st.session_state.get('timer_completed', False):
-                time.sleep(0.1)
-                st.rerun()
+            st.success(f"🎉 Awesome! {minutes}m {done_subject} session completed!")
+            st.balloons()
+        finished = st.session_state.pop("timer_finished", None)
+        if finished is not None:
+            st.success(f"🎉 Great! {finished}m focus session completed!")
+        
+        # Timer display, derived from the journal's stamps rather than counted by reruns
+        if active is not None:
+            running_timer(user_id)
         
         else:
             # Start button
@@ -427,23 +445,18 @@ def render():
                     if "Focus with Rev Meter" in st.session_state.focus_mode and st.session_state.arduino_connected:
                         send_to_arduino(100, st.session_state.arduino_port)
                     
-                    st.session_state.timer_running = True
-                    st.session_state.timer_start_time = time.time()
-                    st.session_state.timer_paused = False
-                    st.session_state.timer_pause_time = 0
-                    st.session_state.timer_completed = False  # Reset completion flag
+                    focus_timer.start(subject, st.session_state.timer_duration, user_id=user_id)
                     st.rerun()
     
     st.write("---")
     
     # Session history
     st.subheader("📜 Today's Sessions")
-    sessions = db.get_timer_sessions(today)
     
     if sessions:
         for session in sessions:
-            status = "✅ Completed" if session["completed"] else "⏸️ Incomplete"
-            st.caption(f"{status} • {session['start_time']} • {session['duration_minutes']}m • {session['subject']}")
+            status = "✅ Completed" if session.completed else "⏸️ Incomplete"
+            st.caption(f"{status} • {session.start_time} • {session.duration_minutes}m • {session.subject}")
     else:
         st.info("No focus sessions yet. Start one above! 🚀")
     